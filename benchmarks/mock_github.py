@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GitHub REST API, serving a synthetic organization
+
+The organization is generated deterministically from its size, so every
+run of a benchmark sees the same data. Repositories, teams, members,
+collaborators and CODEOWNERS files are produced on demand per request, so
+organizations of 50,000 repositories need no setup time.
+
+The server paginates list endpoints with Link headers like GitHub (30 items
+per page by default, at most 100), answers If-None-Match with 304, sends
+X-RateLimit-* headers from a simulated budget, and can add a fixed latency
+to every response. GET /_stats returns the number of requests per endpoint
+and POST /_reset clears it.
+
+Run it standalone with:
+
+    python benchmarks/mock_github.py --repositories 1000 --port 8765
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class SyntheticOrganization:
+    """Deterministic synthetic organization
+
+    Repository i has `collaborators` collaborators and access for team
+    i % teams. Team k has `team_members` members, the first of which is a
+    maintainer, and team k > 0 is a child of team (k - 1) // 4. Users are
+    drawn round-robin from a pool of `users` logins. About
+    `codeowners_ratio` of the repositories have a .github/CODEOWNERS file
+    naming the repository's team.
+    """
+
+    def __init__(
+        self,
+        name="bench",
+        repositories=100,
+        teams=20,
+        team_members=10,
+        collaborators=5,
+        users=1000,
+        codeowners_ratio=0.5,
+    ):
+        self.name = name
+        self.repositories = repositories
+        self.teams = max(1, teams)
+        self.team_members = team_members
+        self.collaborators = collaborators
+        self.users = max(1, users)
+        self.codeowners_ratio = codeowners_ratio
+
+    def organization(self, url):
+        return {
+            "login": self.name,
+            "id": 1,
+            "url": f"{url}/orgs/{self.name}",
+            "name": self.name.title(),
+            "description": "Synthetic organization",
+            "email": None,
+            "billing_email": None,
+            "company": None,
+            "location": None,
+            "blog": "",
+            "created_at": "2020-01-01T00:00:00Z",
+            "updated_at": "2020-01-02T00:00:00Z",
+            "public_repos": self.repositories // 2,
+            "total_private_repos": self.repositories - self.repositories // 2,
+            "followers": 0,
+            "following": 0,
+            "default_repository_permission": "read",
+            "members_can_create_repositories": False,
+            "two_factor_requirement_enabled": True,
+            "has_organization_projects": True,
+            "has_repository_projects": True,
+        }
+
+    def repository_name(self, index):
+        return f"repo-{index:05d}"
+
+    def repository_index(self, name):
+        match = re.fullmatch(r"repo-(\d+)", name)
+        if match is None or int(match.group(1)) >= self.repositories:
+            return None
+        return int(match.group(1))
+
+    def repository(self, url, index, detail=False):
+        name = self.repository_name(index)
+        private = index % 2 == 0
+        repo = {
+            "id": 1000 + index,
+            "name": name,
+            "full_name": f"{self.name}/{name}",
+            "url": f"{url}/repos/{self.name}/{name}",
+            "owner": {"login": self.name, "id": 1, "type": "Organization"},
+            "description": f"Synthetic repository {index}",
+            "private": private,
+            "visibility": "private" if private else "public",
+            "archived": index % 10 == 9,
+            "disabled": False,
+            "default_branch": "main",
+            "has_issues": True,
+            "has_projects": index % 2 == 1,
+            "has_wiki": index % 5 == 0,
+            "has_downloads": True,
+            "created_at": "2020-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "pushed_at": "2024-01-01T00:00:00Z",
+        }
+        if detail:
+            # Like GitHub, only the single-repository endpoint has the merge settings
+            repo["allow_merge_commit"] = True
+            repo["allow_squash_merge"] = True
+            repo["allow_rebase_merge"] = index % 3 != 0
+            repo["delete_branch_on_merge"] = index % 4 == 0
+        return repo
+
+    def has_codeowners(self, index):
+        return (index * 7919) % 1000 < self.codeowners_ratio * 1000
+
+    def codeowners(self, index):
+        team = self.team_slug(index % self.teams)
+        return f"* @{self.name}/{team}\n/docs/ @user-{index % self.users:05d}\n"
+
+    def team_slug(self, k):
+        return f"team-{k:03d}"
+
+    def team_index(self, slug):
+        match = re.fullmatch(r"team-(\d+)", slug)
+        if match is None or int(match.group(1)) >= self.teams:
+            return None
+        return int(match.group(1))
+
+    def team(self, url, k, detail=False):
+        slug = self.team_slug(k)
+        team = {
+            "id": 10 + k,
+            "name": f"Team {k}",
+            "slug": slug,
+            "url": f"{url}/orgs/{self.name}/teams/{slug}",
+            "description": f"Synthetic team {k}",
+            "privacy": "closed",
+            "permission": "pull",
+            "parent": None,
+        }
+        if k > 0:
+            parent = (k - 1) // 4
+            team["parent"] = {
+                "id": 10 + parent,
+                "slug": self.team_slug(parent),
+                "name": f"Team {parent}",
+            }
+        if detail:
+            team["members_count"] = self.team_members
+            team["repos_count"] = len(range(k, self.repositories, self.teams))
+        return team
+
+    def user(self, url, number):
+        login = f"user-{number % self.users:05d}"
+        return {
+            "login": login,
+            "id": 100000 + number % self.users,
+            "url": f"{url}/users/{login}",
+            "type": "User",
+        }
+
+    def members_of(self, url, k, role):
+        members = [self.user(url, k * self.team_members + j) for j in range(self.team_members)]
+        return members[:1] if role == "maintainer" else members
+
+    def collaborators_of(self, url, index):
+        levels = [
+            ("admin", dict(admin=True, maintain=True, push=True, triage=True, pull=True)),
+            ("write", dict(admin=False, maintain=False, push=True, triage=True, pull=True)),
+            ("read", dict(admin=False, maintain=False, push=False, triage=False, pull=True)),
+        ]
+        collaborators = []
+        for j in range(self.collaborators):
+            role_name, permissions = levels[0] if j == 0 else levels[1 + j % 2]
+            collaborator = self.user(url, index * self.collaborators + j)
+            collaborator.update({"permissions": permissions, "role_name": role_name})
+            collaborators.append(collaborator)
+        return collaborators
+
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    """Request handler of MockGitHubServer"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, Nagle's
+    # algorithm delays keep-alive responses by the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if urlparse(self.path).path == "/_reset":
+            self.server.reset()
+            return self.respond({})
+        self.respond({"message": "Not Found"}, 404)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if path.startswith("/api/v3"):
+            path = path[len("/api/v3"):]
+        if path == "/_stats":
+            return self.respond(self.server.stats())
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        org = self.server.organization
+        url = f"http://{self.headers['Host']}"
+
+        for pattern, endpoint, handler in ROUTES:
+            match = re.fullmatch(pattern.replace("{org}", re.escape(org.name)), path)
+            if match:
+                if not self.server.count(endpoint):
+                    return self.respond({"message": "API rate limit exceeded"}, 403)
+                return handler(self, org, url, query, *match.groups())
+
+        self.server.count("other")
+        self.respond({"message": "Not Found"}, 404)
+
+    def respond(self, data, status=200, items=None, query=None):
+        """Send a JSON response, paginating list endpoints"""
+        link = None
+        if items is not None:
+            per_page = min(int(query.get("per_page", 30)), 100)
+            page = int(query.get("page", 1))
+            total = len(items)
+            data = items[(page - 1) * per_page:page * per_page]
+            if page * per_page < total:
+                last = (total + per_page - 1) // per_page
+                link = ", ".join(
+                    f'<{self._page_url(query, number)}>; rel="{rel}"'
+                    for rel, number in (("next", page + 1), ("last", last))
+                )
+            data = [item() if callable(item) else item for item in data]
+
+        body = json.dumps(data).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        for name, value in self.server.rate_limit_headers().items():
+            self.send_header(name, value)
+        if link:
+            self.send_header("Link", link)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _page_url(self, query, page):
+        parsed = urlparse(self.path)
+        return f"http://{self.headers['Host']}{parsed.path}?{urlencode(dict(query, page=page))}"
+
+    def organization(self, org, url, query):
+        self.respond(org.organization(url))
+
+    def repositories(self, org, url, query):
+        items = _LazyList(org.repositories, lambda i: org.repository(url, i))
+        self.respond(None, items=items, query=query)
+
+    def repository(self, org, url, query, name):
+        index = org.repository_index(name)
+        if index is None:
+            return self.respond({"message": "Not Found"}, 404)
+        self.respond(org.repository(url, index, detail=True))
+
+    def collaborators(self, org, url, query, name):
+        index = org.repository_index(name)
+        if index is None:
+            return self.respond({"message": "Not Found"}, 404)
+        self.respond(None, items=org.collaborators_of(url, index), query=query)
+
+    def repository_teams(self, org, url, query, name):
+        index = org.repository_index(name)
+        if index is None:
+            return self.respond({"message": "Not Found"}, 404)
+        team = org.team(url, index % org.teams)
+        team["permission"] = "push"
+        self.respond(None, items=[team], query=query)
+
+    def tree(self, org, url, query, name, ref):
+        index = org.repository_index(name)
+        if index is None:
+            return self.respond({"message": "Not Found"}, 404)
+        if ref in ("main", f"root-{index}"):
+            entries = [
+                {"path": "README.md", "type": "blob", "sha": f"readme-{index}"},
+                {"path": ".github", "type": "tree", "sha": f"github-{index}"},
+                {"path": "src", "type": "tree", "sha": f"src-{index}"},
+            ]
+            return self.respond({"sha": f"root-{index}", "tree": entries, "truncated": False})
+        if ref == f"github-{index}":
+            entries = [{"path": "workflows", "type": "tree", "sha": f"workflows-{index}"}]
+            if org.has_codeowners(index):
+                entries.append({"path": "CODEOWNERS", "type": "blob", "sha": f"codeowners-{index}"})
+            return self.respond({"sha": ref, "tree": entries, "truncated": False})
+        if ref == f"src-{index}":
+            return self.respond({"sha": ref, "tree": [], "truncated": False})
+        self.respond({"message": "Not Found"}, 404)
+
+    def blob(self, org, url, query, name, sha):
+        index = org.repository_index(name)
+        if index is None or sha != f"codeowners-{index}" or not org.has_codeowners(index):
+            return self.respond({"message": "Not Found"}, 404)
+        content = org.codeowners(index).encode()
+        self.respond({
+            "sha": sha,
+            "size": len(content),
+            "encoding": "base64",
+            "content": base64.b64encode(content).decode() + "\n",
+        })
+
+    def contents(self, org, url, query, name, path):
+        index = org.repository_index(name)
+        if index is None or path != ".github/CODEOWNERS" or not org.has_codeowners(index):
+            return self.respond({"message": "Not Found"}, 404)
+        content = org.codeowners(index).encode()
+        self.respond({
+            "type": "file",
+            "name": "CODEOWNERS",
+            "path": path,
+            "sha": f"codeowners-{index}",
+            "size": len(content),
+            "encoding": "base64",
+            "content": base64.b64encode(content).decode(),
+        })
+
+    def teams(self, org, url, query):
+        items = _LazyList(org.teams, lambda k: org.team(url, k))
+        self.respond(None, items=items, query=query)
+
+    def team(self, org, url, query, slug):
+        k = org.team_index(slug)
+        if k is None:
+            return self.respond({"message": "Not Found"}, 404)
+        self.respond(org.team(url, k, detail=True))
+
+    def team_members(self, org, url, query, slug):
+        k = org.team_index(slug)
+        if k is None:
+            return self.respond({"message": "Not Found"}, 404)
+        self.respond(None, items=org.members_of(url, k, query.get("role", "all")), query=query)
+
+    def user(self, org, url, query, login):
+        match = re.fullmatch(r"user-(\d+)", login)
+        if match is None:
+            return self.respond({"message": "Not Found"}, 404)
+        user = org.user(url, int(match.group(1)))
+        user["name"] = f"User {int(match.group(1))}"
+        self.respond(user)
+
+
+# Path patterns, endpoint names for the request counts, and handlers
+ROUTES = [
+    (r"/orgs/{org}", "/orgs/{org}", MockGitHubHandler.organization),
+    (r"/orgs/{org}/repos", "/orgs/{org}/repos", MockGitHubHandler.repositories),
+    (r"/orgs/{org}/teams", "/orgs/{org}/teams", MockGitHubHandler.teams),
+    (r"/orgs/{org}/teams/([^/]+)", "/orgs/{org}/teams/{team}", MockGitHubHandler.team),
+    (
+        r"/orgs/{org}/teams/([^/]+)/members",
+        "/orgs/{org}/teams/{team}/members",
+        MockGitHubHandler.team_members,
+    ),
+    (r"/repos/{org}/([^/]+)", "/repos/{owner}/{repo}", MockGitHubHandler.repository),
+    (
+        r"/repos/{org}/([^/]+)/collaborators",
+        "/repos/{owner}/{repo}/collaborators",
+        MockGitHubHandler.collaborators,
+    ),
+    (
+        r"/repos/{org}/([^/]+)/teams",
+        "/repos/{owner}/{repo}/teams",
+        MockGitHubHandler.repository_teams,
+    ),
+    (
+        r"/repos/{org}/([^/]+)/git/trees/([^/]+)",
+        "/repos/{owner}/{repo}/git/trees/{sha}",
+        MockGitHubHandler.tree,
+    ),
+    (
+        r"/repos/{org}/([^/]+)/git/blobs/([^/]+)",
+        "/repos/{owner}/{repo}/git/blobs/{sha}",
+        MockGitHubHandler.blob,
+    ),
+    (
+        r"/repos/{org}/([^/]+)/contents/(.+)",
+        "/repos/{owner}/{repo}/contents/{path}",
+        MockGitHubHandler.contents,
+    ),
+    (r"/users/([^/]+)", "/users/{user}", MockGitHubHandler.user),
+]
+
+
+class _LazyList:
+    """Sequence building its items only when a page of them is sliced"""
+
+    def __init__(self, length, build):
+        self.length = length
+        self.build = build
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, window):
+        return [self.build(i) for i in range(*window.indices(self.length))]
+
+
+class MockGitHubServer(ThreadingHTTPServer):
+    """Threaded HTTP server for a SyntheticOrganization
+
+    Args:
+        organization: Organization to serve
+        port: Port to listen on; 0 picks a free port
+        latency: Seconds added to every API response
+        rate_limit: Requests allowed per rate limit window
+        rate_window: Length of the rate limit window in seconds
+    """
+
+    daemon_threads = True
+
+    def __init__(self, organization, port=0, latency=0.0, rate_limit=1000000, rate_window=3600):
+        super().__init__(("127.0.0.1", port), MockGitHubHandler)
+        self.organization = organization
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self):
+        """Clear the request counts and restart the rate limit window"""
+        with self._lock:
+            self.requests = {}
+            self.used = 0
+            self.window_reset = int(time.time()) + self.rate_window
+
+    def count(self, endpoint):
+        """Count a request; returns False once the rate limit is exhausted"""
+        with self._lock:
+            now = time.time()
+            if now >= self.window_reset:
+                self.used = 0
+                self.window_reset = int(now) + self.rate_window
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if self.used >= self.rate_limit:
+                return False
+            self.used += 1
+            return True
+
+    def rate_limit_headers(self):
+        with self._lock:
+            return {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(max(0, self.rate_limit - self.used)),
+                "X-RateLimit-Used": str(self.used),
+                "X-RateLimit-Reset": str(self.window_reset),
+                "X-RateLimit-Resource": "core",
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "endpoints": dict(sorted(self.requests.items())),
+            }
+
+    def start(self):
+        """Serve requests from a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def add_organization_arguments(parser):
+    """Add the options describing a synthetic organization to a parser"""
+    parser.add_argument(
+        "--organization", default="bench", help="Organization login (default: bench)"
+    )
+    parser.add_argument("--teams", type=int, default=20, help="Number of teams (default: 20)")
+    parser.add_argument(
+        "--team-members", type=int, default=10, help="Members per team (default: 10)"
+    )
+    parser.add_argument(
+        "--collaborators", type=int, default=5, help="Collaborators per repository (default: 5)"
+    )
+    parser.add_argument(
+        "--users", type=int, default=1000, help="Size of the user pool (default: 1000)"
+    )
+    parser.add_argument(
+        "--codeowners-ratio",
+        type=float,
+        default=0.5,
+        help="Fraction of repositories with a CODEOWNERS file (default: 0.5)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Milliseconds added to every response (default: 0)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=1000000,
+        help="Requests allowed per rate limit window before 403 responses (default: 1000000)",
+    )
+    parser.add_argument(
+        "--rate-window",
+        type=int,
+        default=3600,
+        help="Length of the rate limit window in seconds (default: 3600)",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--repositories", type=int, default=100, help="Number of repositories (default: 100)"
+    )
+    parser.add_argument(
+        "--port", type=int, default=0, help="Port to listen on (default: any free port)"
+    )
+    add_organization_arguments(parser)
+    args = parser.parse_args()
+
+    organization = SyntheticOrganization(
+        name=args.organization,
+        repositories=args.repositories,
+        teams=args.teams,
+        team_members=args.team_members,
+        collaborators=args.collaborators,
+        users=args.users,
+        codeowners_ratio=args.codeowners_ratio,
+    )
+    server = MockGitHubServer(
+        organization,
+        port=args.port,
+        latency=args.latency / 1000,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+    )
+    # The benchmark harness reads the address from the first line
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks of the audit clients against a local mock GitHub API
+
+For every organization size, a mock server (benchmarks/mock_github.py) is
+started in its own process, and every scenario runs in a fresh worker
+process against it, so each measurement starts from a cold client and its
+peak memory is not mixed with the server's or other scenarios'. Wall time,
+peak RSS and the requests the server received per endpoint are written to
+a JSON file, which a later run can be compared against:
+
+    python benchmarks/run.py --sizes 100,1000 --output baseline.json
+    python benchmarks/run.py --sizes 100,1000 --output after.json --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_github import add_organization_arguments  # noqa: E402
+
+
+SCENARIOS = ["audit", "codeowners", "permissions"]
+BACKENDS = ["rest", "lean", "async"]
+
+
+def run_scenario(scenario, backend, url, organization, concurrency, config=None):
+    """Run one scenario in this process and measure it"""
+    from github_org_audit.auditor import GitHubOrgAuditor
+
+    client = create_client(backend, url, concurrency)
+    start = time.perf_counter()
+    if backend == "async":
+        result = asyncio.run(run_async(client, scenario, organization, config))
+    elif scenario == "audit":
+        result = GitHubOrgAuditor(client, config).audit(organization)
+    elif scenario == "codeowners":
+        result = client.get_all_codeowners(organization)
+    else:
+        result = client.get_org_permissions(organization)
+    seconds = time.perf_counter() - start
+
+    return {
+        "seconds": round(seconds, 3),
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            / (1024 * 1024 if sys.platform == "darwin" else 1024),
+            1,
+        ),
+        "items": count_items(scenario, result),
+        "errors": len(client.errors),
+    }
+
+
+async def run_async(client, scenario, organization, config=None):
+    """Run one scenario with the asynchronous client"""
+    from github_org_audit.auditor import GitHubOrgAuditor
+
+    try:
+        if scenario == "audit":
+            return await GitHubOrgAuditor(client, config).audit_async(organization)
+        if scenario == "codeowners":
+            return await client.get_all_codeowners(organization)
+        return await client.get_org_permissions(organization)
+    finally:
+        await client.close()
+
+
+def create_client(backend, url, concurrency):
+    """Create a client of a backend talking to the mock server"""
+    options = {"concurrency": concurrency, "base_url": url}
+    if backend == "async":
+        from github_org_audit.async_client import AsyncGitHubAuditClient
+
+        return AsyncGitHubAuditClient("benchmark", **options)
+    if backend == "lean":
+        from github_org_audit.lean_client import LeanGitHubAuditClient
+
+        return LeanGitHubAuditClient("benchmark", **options)
+    from github_org_audit.client import GitHubAuditClient
+
+    return GitHubAuditClient("benchmark", **options)
+
+
+def count_items(scenario, result):
+    """Count what a scenario produced, to check runs did the same work"""
+    if scenario == "audit":
+        return {
+            section: len(result[section])
+            for section in ("teams", "repositories", "permissions", "codeowners")
+            if section in result
+        }
+    return {scenario: len(result)}
+
+
+def start_server(size, args):
+    """Start a mock server process for an organization size"""
+    command = [
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_github.py"),
+        "--repositories", str(size),
+        "--organization", args.organization,
+        "--teams", str(args.teams),
+        "--team-members", str(args.team_members),
+        "--collaborators", str(args.collaborators),
+        "--users", str(args.users),
+        "--codeowners-ratio", str(args.codeowners_ratio),
+        "--latency", str(args.latency),
+        "--rate-limit", str(args.rate_limit),
+        "--rate-window", str(args.rate_window),
+    ]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    return server, server.stdout.readline().strip()
+
+
+def server_call(url, path, method="GET"):
+    """Call a control endpoint of the mock server"""
+    data = b"" if method == "POST" else None
+    request = urllib.request.Request(f"{url}{path}", method=method, data=data)
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def run_worker(scenario, backend, url, args):
+    """Run a scenario in a fresh worker process"""
+    command = [
+        sys.executable, os.path.abspath(__file__), "--worker",
+        "--scenarios", scenario,
+        "--backends", backend,
+        "--url", url,
+        "--organization", args.organization,
+        "--concurrency", str(args.concurrency),
+    ]
+    if args.config:
+        command += ["--config", args.config]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every measurement against a baseline
+
+    Returns:
+        Number of scenarios slower than the baseline by more than threshold
+    """
+    def key(entry):
+        return (entry["size"], entry["scenario"], entry["backend"])
+
+    previous = {key(entry): entry for entry in baseline["results"]}
+    regressions = 0
+    print(
+        f"\n{'size':>6} {'scenario':<12} {'backend':<7} "
+        f"{'seconds':>17} {'requests':>17} {'peak MB':>15}"
+    )
+    for entry in results:
+        old = previous.get(key(entry))
+        if old is None:
+            continue
+        ratio = entry["seconds"] / old["seconds"] if old["seconds"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = "  slower"
+        print(
+            f"{entry['size']:>6} {entry['scenario']:<12} {entry['backend']:<7} "
+            f"{old['seconds']:>7.2f} -> {entry['seconds']:>7.2f} "
+            f"{old['requests']:>7} -> {entry['requests']:>7} "
+            f"{old['peak_rss_mb']:>6.0f} -> {entry['peak_rss_mb']:>6.0f}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="100,1000",
+        help="Comma-separated organization sizes in repositories (default: 100,1000; "
+        "the suite is designed for 100,1000,10000,50000)",
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})",
+    )
+    parser.add_argument(
+        "--backends",
+        default="rest",
+        help=f"Comma-separated client backends ({', '.join(BACKENDS)}; default: rest)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Client concurrency (default: 8)"
+    )
+    parser.add_argument(
+        "--config",
+        help="Audit configuration file (YAML) for the audit scenario, "
+        "e.g. to include team members",
+    )
+    parser.add_argument(
+        "--output", default="benchmark-results.json", help="File to write the results to"
+    )
+    parser.add_argument("--compare", help="Results file of an earlier run to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown reported as a regression by --compare (default: 0.2)",
+    )
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    add_organization_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    backends = args.backends.split(",")
+    for name, allowed in ((scenarios, SCENARIOS), (backends, BACKENDS)):
+        unknown = set(name) - set(allowed)
+        if unknown:
+            parser.error(f"unknown choice {sorted(unknown)[0]}")
+
+    if args.worker:
+        config = None
+        if args.config:
+            with open(args.config) as f:
+                config = yaml.safe_load(f) or {}
+        measurement = run_scenario(
+            scenarios[0], backends[0], args.url, args.organization, args.concurrency, config
+        )
+        print(json.dumps(measurement))
+        return 0
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        server, url = start_server(size, args)
+        try:
+            for scenario in scenarios:
+                for backend in backends:
+                    server_call(url, "/_reset", method="POST")
+                    measurement = run_worker(scenario, backend, url, args)
+                    stats = server_call(url, "/_stats")
+                    entry = {
+                        "size": size,
+                        "scenario": scenario,
+                        "backend": backend,
+                        **measurement,
+                        "requests": stats["requests"],
+                        "requests_by_endpoint": stats["endpoints"],
+                    }
+                    results.append(entry)
+                    print(
+                        f"{size:>6} {scenario:<12} {backend:<7} {entry['seconds']:>8.2f}s "
+                        f"{entry['requests']:>8} requests {entry['peak_rss_mb']:>7.1f} MB peak",
+                        flush=True,
+                    )
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("worker", "url", "output", "compare", "threshold")
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(
+                f"{regressions} scenarios slower than the baseline "
+                f"by more than {args.threshold:.0%}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark of writing audit results with each serializer and compression
+
+A synthetic result of a large organization is written once with the code
+path the CLI used before the serializer layer (json.dumps with indent=2 and
+yaml.dump, written as text) and once per format and compression of
+github_org_audit.serializers. Formats or compressions whose optional
+dependency is not installed are skipped.
+
+    python benchmarks/serializers.py --repositories 50000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from github_org_audit import serializers  # noqa: E402
+from github_org_audit.records import (  # noqa: E402
+    CollaboratorGrant,
+    PermissionsRecord,
+    RepositoryRecord,
+    TeamGrant,
+    TeamRecord,
+    to_builtin,
+)
+
+
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def build_results(repositories, collaborators, teams):
+    """Build audit results of a synthetic organization"""
+    names = [f"repo-{index:05d}" for index in range(repositories)]
+    levels = [
+        {"admin": False, "push": False, "pull": True},
+        {"admin": False, "push": True, "pull": True},
+        {"admin": True, "push": True, "pull": True},
+    ]
+    return {
+        "organization": "bench",
+        "audit_timestamp": None,
+        "settings": {"login": "bench", "name": "Bench", "two_factor_requirement_enabled": True},
+        "teams": [
+            TeamRecord(
+                name=f"Team {index}",
+                slug=f"team-{index:03d}",
+                description="Synthetic team",
+                privacy="closed",
+                permission="pull",
+                members_count=10,
+                repos_count=repositories // teams,
+            )
+            for index in range(teams)
+        ],
+        "repositories": [
+            RepositoryRecord(
+                name=name,
+                full_name=f"bench/{name}",
+                description=f"Synthetic repository {name}",
+                private=index % 2 == 0,
+                archived=index % 20 == 0,
+                disabled=False,
+                default_branch="main",
+                visibility="private" if index % 2 == 0 else "public",
+                allow_merge_commit=True,
+                allow_squash_merge=True,
+                allow_rebase_merge=False,
+                delete_branch_on_merge=True,
+                has_issues=True,
+                has_projects=False,
+                has_wiki=False,
+                has_downloads=True,
+                updated_at="2024-01-01 00:00:00+00:00",
+                pushed_at="2024-01-02 00:00:00+00:00",
+            )
+            for index, name in enumerate(names)
+        ],
+        "permissions": [
+            PermissionsRecord(
+                repository=name,
+                collaborators=[
+                    CollaboratorGrant(
+                        login=f"user-{(index + offset) % 5000:04d}",
+                        permissions=levels[offset % 3],
+                        role_name=["read", "write", "admin"][offset % 3],
+                    )
+                    for offset in range(collaborators)
+                ],
+                teams=[TeamGrant(name=f"Team {index % teams}", permission="push")],
+            )
+            for index, name in enumerate(names)
+        ],
+        "codeowners": {
+            name: f"* @bench/team-{index % teams:03d}\n/docs/ @bench/docs\n"
+            for index, name in enumerate(names)
+            if index % 3 == 0
+        },
+    }
+
+
+def write_previous(results, output, path):
+    """Write results the way the CLI did before the serializer layer"""
+    with open(path, "w") as f:
+        if output == "yaml":
+            f.write(yaml.dump(results, default_flow_style=False))
+        else:
+            f.write(json.dumps(results, indent=2, default=to_builtin))
+
+
+def measure(write, path, repeat):
+    """Get the best time of several writes and the size of the file"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        write(path)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--repositories", type=int, default=50000, help="Number of repositories (default: 50000)"
+    )
+    parser.add_argument(
+        "--collaborators", type=int, default=5, help="Collaborators per repository (default: 5)"
+    )
+    parser.add_argument("--teams", type=int, default=200, help="Number of teams (default: 200)")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Writes per measurement; the best is kept (default: 3)",
+    )
+    parser.add_argument(
+        "--formats", default="json,yaml,msgpack", help="Comma-separated formats (default: all)"
+    )
+    args = parser.parse_args()
+
+    results = build_results(args.repositories, args.collaborators, args.teams)
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for output in args.formats.split(","):
+            if output in ("json", "yaml"):
+                path = os.path.join(directory, f"previous.{output}")
+                seconds, size = measure(
+                    lambda p: write_previous(results, output, p), path, args.repeat
+                )
+                rows.append((f"{output} (previous)", "none", seconds, size))
+
+            for compression, suffix in COMPRESSIONS.items():
+                path = os.path.join(directory, f"results.{output}{suffix}")
+                try:
+                    serializers.check_available(output, path)
+                except ImportError as e:
+                    print(f"Skipping {output} with {compression}: {e}", file=sys.stderr)
+                    continue
+                seconds, size = measure(
+                    lambda p: serializers.write_results(results, p, output), path, args.repeat
+                )
+                rows.append((output, compression, seconds, size))
+
+    baseline = {row[0]: row[2] for row in rows if row[0].endswith("(previous)")}
+    print(f"{args.repositories} repositories, {args.collaborators} collaborators each")
+    print(f"{'format':<16} {'compression':<12} {'seconds':>8} {'speedup':>8} {'MB':>8}")
+    for output, compression, seconds, size in rows:
+        previous = baseline.get(f"{output.split()[0]} (previous)")
+        speedup = f"{previous / seconds:.1f}x" if previous else ""
+        print(f"{output:<16} {compression:<12} {seconds:>8.2f} {speedup:>8} {size / 1e6:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
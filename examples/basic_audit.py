@@ -7,9 +7,9 @@ programmatically (without using the CLI).
 """
 
 import os
-import json
 from github_org_audit.client import GitHubAuditClient
 from github_org_audit.auditor import GitHubOrgAuditor
+from github_org_audit.serializers import write_results
 
 
 def main():
@@ -58,10 +58,10 @@ def main():
         
         print("\n" + "=" * 80)
         
-        # Save full results to JSON
+        # Save full results to JSON; the results hold record objects,
+        # which the serializers write as mappings
         output_file = f"audit-{org_name}.json"
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        write_results(results, output_file, "json")
         
         print(f"\nFull audit results saved to: {output_file}")
         
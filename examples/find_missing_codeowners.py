@@ -3,41 +3,35 @@
 Example: Find repositories missing CODEOWNERS
 
 This script identifies all repositories in an organization that don't have
-a CODEOWNERS file.
+a CODEOWNERS file. Set GITHUB_AUDIT_CACHE_DIR to remember the results between
+runs, so that only repositories that changed are checked again.
 """
 
 import os
 import sys
+from github_org_audit.cache import HTTPCache
 from github_org_audit.client import GitHubAuditClient
 
 
-def find_missing_codeowners(org_name, token):
+def find_missing_codeowners(org_name, token, cache_dir=None):
     """Find repositories without CODEOWNERS files"""
-    client = GitHubAuditClient(token)
+    cache = HTTPCache(cache_dir) if cache_dir else None
+    client = GitHubAuditClient(token, concurrency=8, cache=cache)
     
     print(f"Checking CODEOWNERS for: {org_name}")
     print("=" * 80)
     
-    # Get all repositories
-    repos = client.get_repositories(org_name)
-    
-    # Filter out archived repositories
-    active_repos = [r for r in repos if not r.get("archived")]
+    # Get all repositories, filtering out archived ones
+    repos = client.list_repositories(org_name)
+    active_repos = [r for r in repos if not r.archived]
     
     print(f"\nTotal active repositories: {len(active_repos)}")
     
-    # Check for CODEOWNERS
-    missing_codeowners = []
-    has_codeowners = []
-    
-    for repo in active_repos:
-        repo_name = repo["name"]
-        codeowners = client.get_codeowners(org_name, repo_name)
-        
-        if codeowners:
-            has_codeowners.append(repo_name)
-        else:
-            missing_codeowners.append(repo_name)
+    # Locate CODEOWNERS with one tree listing per repository, without
+    # downloading the files
+    locations = client.get_codeowners_locations(org_name, repos=active_repos)
+    missing_codeowners = [name for name, path in locations.items() if path is None]
+    has_codeowners = [name for name, path in locations.items() if path is not None]
     
     print(f"Repositories with CODEOWNERS: {len(has_codeowners)}")
     print(f"Repositories without CODEOWNERS: {len(missing_codeowners)}")
@@ -49,7 +43,7 @@ def find_missing_codeowners(org_name, token):
             print(f"  - {repo_name}")
     
     # Calculate coverage percentage
-    coverage = (len(has_codeowners) / len(active_repos) * 100) if active_repos else 0
+    coverage = (len(has_codeowners) / len(locations) * 100) if locations else 0
     print(f"\nCODEOWNERS coverage: {coverage:.1f}%")
     
     return 0
@@ -68,7 +62,7 @@ def main():
     org_name = sys.argv[1]
     
     try:
-        return find_missing_codeowners(org_name, token)
+        return find_missing_codeowners(org_name, token, os.getenv("GITHUB_AUDIT_CACHE_DIR"))
     except Exception as e:
         print(f"Error: {e}")
         return 1
@@ -0,0 +1,247 @@
+"""Effective repository access of organization users"""
+
+from typing import Dict, Iterable, List, Optional
+
+
+# Repository permission levels, lowest first
+PERMISSION_LEVELS = ["read", "triage", "write", "maintain", "admin"]
+
+# Names the API uses for the same levels in team and organization settings
+PERMISSION_ALIASES = {"pull": "read", "push": "write"}
+
+
+def permission_rank(permission: Optional[str]) -> int:
+    """Get the rank of a permission level
+
+    Args:
+        permission: Permission name, such as "read", "push" or "maintain"
+
+    Returns:
+        Position in PERMISSION_LEVELS counted from 1, or 0 for no access
+        and unknown names
+    """
+    permission = PERMISSION_ALIASES.get(permission, permission)
+    if permission in PERMISSION_LEVELS:
+        return PERMISSION_LEVELS.index(permission) + 1
+    return 0
+
+
+class AccessIndex:
+    """Highest permission of every user on every repository
+
+    Combines the repository collaborators, the repository grants of teams
+    expanded to their members, and the organization's default repository
+    permission for its members into one permission per user and repository,
+    indexed both by user and by repository.
+
+    The default permission is not stored per repository; it is applied when
+    a user or repository is looked up, so an organization with a read
+    default does not hold one entry per member and repository.
+    """
+
+    def __init__(
+        self,
+        permissions: List[Dict],
+        team_members: Optional[Dict[str, List[str]]] = None,
+        team_slugs: Optional[Dict[str, str]] = None,
+        members: Iterable[str] = (),
+        default_permission: Optional[str] = None,
+    ):
+        """Build the index
+
+        Args:
+            permissions: Per-repository permissions from get_org_permissions
+            team_members: Optional dictionary mapping team slugs to the
+                logins of their members
+            team_slugs: Optional dictionary mapping team names, as used in
+                the permissions, to their slugs
+            members: Logins of the organization's members
+            default_permission: Organization default repository permission
+        """
+        self.repositories = sorted(p["repository"] for p in permissions)
+        self._repository_set = set(self.repositories)
+        self.members = set(members)
+        self.default_rank = permission_rank(default_permission)
+        self._by_user = {}
+        self._by_repo = {}
+        team_members = team_members or {}
+        team_slugs = team_slugs or {}
+
+        for perms in permissions:
+            repository = perms["repository"]
+            for collaborator in perms.get("collaborators", []):
+                # role_name carries triage and maintain, which the flags do not
+                rank = max(
+                    permission_rank(collaborator.get("permissions")),
+                    permission_rank(collaborator.get("role_name")),
+                )
+                self._grant(collaborator["login"], repository, rank, "collaborator")
+            for team in perms.get("teams", []):
+                slug = team_slugs.get(team["name"], team["name"])
+                rank = permission_rank(team.get("permission"))
+                for login in team_members.get(slug, []):
+                    self._grant(login, repository, rank, f"team:{slug}")
+
+        self.users = sorted(set(self._by_user) | self.members)
+
+    @classmethod
+    def from_results(cls, results: Dict) -> "AccessIndex":
+        """Build the index of an audit
+
+        Team grants are only expanded if the audit included team members
+        (include_team_members), and the default permission only applies to
+        users known to be members, that is members of at least one team.
+
+        Args:
+            results: Results from GitHubOrgAuditor.audit
+
+        Returns:
+            AccessIndex
+        """
+        teams = results.get("teams", [])
+        team_members = {
+            t["slug"]: [m["login"] for m in t["members"]]
+            for t in teams
+            if "members" in t
+        }
+        members = {login for logins in team_members.values() for login in logins}
+        return cls(
+            results.get("permissions", []),
+            team_members=team_members,
+            team_slugs={t["name"]: t["slug"] for t in teams},
+            members=members,
+            default_permission=results.get("settings", {}).get("default_repository_permission"),
+        )
+
+    def permission(self, login: str, repository: str) -> Optional[str]:
+        """Get the highest permission of a user on a repository
+
+        Args:
+            login: Login of the user
+            repository: Name of the repository
+
+        Returns:
+            Permission name, or None without access
+        """
+        entry = self._by_user.get(login, {}).get(repository)
+        rank, _ = self._effective(login, entry)
+        return PERMISSION_LEVELS[rank - 1] if rank else None
+
+    def user_access(self, login: str, minimum: Optional[str] = None) -> List[Dict]:
+        """List the repositories a user can access
+
+        Args:
+            login: Login of the user
+            minimum: Only list repositories with at least this permission
+
+        Returns:
+            Dictionaries with repository, permission and the sources of the
+            access, by repository name
+        """
+        granted = self._by_user.get(login, {})
+        if login in self.members and self.default_rank:
+            repositories = self.repositories
+        else:
+            repositories = sorted(granted)
+        return self._report("repository", repositories, minimum, lambda r: (login, granted.get(r)))
+
+    def repo_access(self, repository: str, minimum: Optional[str] = None) -> List[Dict]:
+        """List the users who can access a repository
+
+        Args:
+            repository: Name of the repository
+            minimum: Only list users with at least this permission
+
+        Returns:
+            Dictionaries with user, permission and the sources of the access,
+            by login
+        """
+        granted = self._by_repo.get(repository, {})
+        if self.default_rank and repository in self._repository_set:
+            users = sorted(set(granted) | self.members)
+        else:
+            users = sorted(granted)
+        return self._report("user", users, minimum, lambda u: (u, granted.get(u)))
+
+    def summary(self) -> List[Dict]:
+        """Count the repositories of every user per permission level
+
+        Returns:
+            Dictionaries with user and one count per permission level
+        """
+        summary = []
+        for login in self.users:
+            counts = dict.fromkeys(PERMISSION_LEVELS, 0)
+            granted = self._by_user.get(login, {})
+            for entry in granted.values():
+                rank, _ = self._effective(login, entry)
+                counts[PERMISSION_LEVELS[rank - 1]] += 1
+            # Repositories without a grant only have the default permission
+            if login in self.members and self.default_rank:
+                default = PERMISSION_LEVELS[self.default_rank - 1]
+                counts[default] += len(self.repositories) - len(granted)
+            summary.append({"user": login, **counts})
+        return summary
+
+    def _grant(self, login: str, repository: str, rank: int, source: str) -> None:
+        """Record one grant, keeping the highest permission
+
+        The same entry is shared by the user and repository indexes.
+
+        Args:
+            login: Login of the user
+            repository: Name of the repository
+            rank: Rank of the granted permission
+            source: What grants the permission
+        """
+        if not rank:
+            return
+        entry = self._by_user.setdefault(login, {}).get(repository)
+        if entry is None:
+            entry = [rank, [source]]
+            self._by_user[login][repository] = entry
+            self._by_repo.setdefault(repository, {})[login] = entry
+        else:
+            entry[0] = max(entry[0], rank)
+            entry[1].append(source)
+
+    def _effective(self, login: str, entry: Optional[list]):
+        """Combine a stored grant with the default permission
+
+        Args:
+            login: Login of the user
+            entry: Stored [rank, sources] entry, or None
+
+        Returns:
+            Tuple of the effective rank and the sources
+        """
+        rank, sources = entry if entry is not None else (0, [])
+        if login in self.members and self.default_rank:
+            if self.default_rank > rank:
+                rank = self.default_rank
+            sources = sources + ["organization"]
+        return rank, sources
+
+    def _report(self, key: str, names: List[str], minimum: Optional[str], lookup) -> List[Dict]:
+        """Build the entries of a user or repository listing
+
+        Args:
+            key: Name of the listed field ("repository" or "user")
+            names: Repositories or users to report
+            minimum: Only report entries with at least this permission
+            lookup: Function returning the login and stored entry of a name
+
+        Returns:
+            List of report entries
+        """
+        threshold = max(permission_rank(minimum), 1)
+        report = []
+        for name in names:
+            rank, sources = self._effective(*lookup(name))
+            if rank >= threshold:
+                report.append({
+                    key: name,
+                    "permission": PERMISSION_LEVELS[rank - 1],
+                    "sources": sources,
+                })
+        return report
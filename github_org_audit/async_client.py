@@ -0,0 +1,795 @@
+"""Asynchronous GitHub API client for auditing"""
+
+import asyncio
+import base64
+import json
+import time
+from typing import AsyncIterator, Callable, Optional
+from urllib.parse import urlencode
+from .cache import HTTPCache, MemoMixin, cache_key, replay_headers
+from .credentials import DEFAULT_BASE_URL, CredentialPool
+from .metrics import AuditMetrics
+from .projections import (
+    add_team_hierarchy,
+    codeowners_blob,
+    codeowners_candidates,
+    collaborator_permissions,
+    next_link,
+    org_settings,
+    repo_timestamps,
+    repository_info,
+    team_error,
+    team_info,
+)
+from .ratelimit import RateLimitScheduler
+from .records import PermissionsRecord, TeamGrant, TeamMember
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is an optional dependency
+    aiohttp = None
+
+
+class AsyncGitHubAuditClient(MemoMixin):
+    """Asynchronous client for auditing GitHub organizations
+
+    Provides the same methods as GitHubAuditClient as coroutines. Requests
+    go through a single keep-alive connection pool, a semaphore bounds
+    how many are in flight and a RateLimitScheduler paces them, so several
+    organizations can be audited from one event loop.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        concurrency: int = 50,
+        base_url: str = DEFAULT_BASE_URL,
+        per_page: int = 100,
+        scheduler: Optional[RateLimitScheduler] = None,
+        max_rate_limit_retries: int = 5,
+        credentials: Optional[CredentialPool] = None,
+        cache: Optional[HTTPCache] = None,
+        affiliation: Optional[str] = None,
+        metrics: Optional[AuditMetrics] = None,
+    ):
+        """Initialize the client with authentication token
+
+        Args:
+            token: GitHub personal access token; not needed when
+                credentials is given
+            concurrency: Maximum number of requests in flight
+            base_url: Base URL of the GitHub REST API
+            per_page: Page size used for list endpoints
+            scheduler: Optional rate limit scheduler, e.g. to share one
+                budget between several clients
+            max_rate_limit_retries: Maximum retries of a rate-limited request
+            credentials: Optional pool of tokens or GitHub App
+                installations to spread requests across
+            cache: Optional HTTP cache; unchanged resources are then
+                revalidated with conditional requests
+            affiliation: Optional collaborator affiliation to audit
+                ("all", "direct" or "outside"); defaults to all
+            metrics: Optional metrics to count and time every request in
+
+        Raises:
+            ValueError: If neither token nor credentials is given
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncGitHubAuditClient requires aiohttp; "
+                "install it with: pip install 'github-org-audit[async]'"
+            )
+        if credentials is None:
+            if not token:
+                raise ValueError("A token or a credential pool is required")
+            credentials = CredentialPool.from_tokens([token])
+        self.credentials = credentials
+        self.cache = cache
+        self.affiliation = affiliation
+        self.metrics = metrics
+        self.concurrency = max(1, concurrency)
+        self.base_url = base_url.rstrip("/")
+        self.per_page = per_page
+        self.scheduler = scheduler or RateLimitScheduler(max_concurrency=self.concurrency)
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.errors = []
+        self._organizations = {}
+        self._memo = {}
+        self._user_names = {}
+        self._user_lookups = {}
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the underlying HTTP session
+
+        The session is recreated on the next request, so the client can be
+        reused from a new event loop.
+        """
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+
+    def _get_session(self):
+        """Get the HTTP session, creating it in the running event loop
+
+        Returns:
+            aiohttp client session
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Accept": "application/vnd.github+json"},
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def _request(self, path: str, params: Optional[dict] = None):
+        """Perform a GET request against the API
+
+        Args:
+            path: API path or absolute URL
+            params: Optional query parameters
+
+        Returns:
+            Tuple of (decoded JSON body, next page URL or None)
+
+        Raises:
+            aiohttp.ClientResponseError: If the API returns an error status
+        """
+        session = self._get_session()
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        attempt = 0
+
+        key = entry = None
+        full_url = f"{url}?{urlencode(params)}" if params else url
+
+        async with self._semaphore:
+            while True:
+                credential = self.credentials.select("core")
+                authorization = await self._authorization(credential)
+                headers = {}
+                if self.cache is not None:
+                    key = cache_key("GET", full_url, "application/vnd.github+json", credential.key)
+                    entry = self.cache.lookup(key)
+                    if entry:
+                        headers.update(self.cache.conditional_headers(entry))
+                await self.scheduler.acquire_async("core", credential.key)
+                started = time.monotonic()
+                try:
+                    async with session.get(
+                        url, params=params, headers=dict(headers, Authorization=authorization)
+                    ) as response:
+                        body = await response.read()
+                except Exception:
+                    elapsed = time.monotonic() - started
+                    self.scheduler.release("core", None, {}, elapsed, credential=credential.key)
+                    if self.metrics is not None:
+                        self.metrics.record_request("GET", url, None, elapsed)
+                    raise
+
+                elapsed = time.monotonic() - started
+                if self.metrics is not None:
+                    self.metrics.record_request("GET", url, response.status, elapsed)
+                self.credentials.record(credential, "core", response.headers)
+                retry = self.scheduler.release(
+                    "core",
+                    response.status,
+                    response.headers,
+                    elapsed,
+                    body,
+                    credential=credential.key,
+                )
+                if not retry or attempt >= self.max_rate_limit_retries:
+                    break
+                attempt += 1
+                self.scheduler.record_retry()
+
+        response_headers = response.headers
+        if response.status == 304 and entry is not None:
+            self.cache.hit(key)
+            body = entry["body"]
+            response_headers = replay_headers(entry["headers"], response.headers)
+        else:
+            response.raise_for_status()
+            if key is not None and response.status == 200:
+                self.cache.store(key, response.headers, body)
+
+        data = json.loads(body)
+        return data, next_link(response_headers)
+
+    async def _authorization(self, credential) -> str:
+        """Get the Authorization header value for a credential
+
+        Token refreshes perform a blocking request, so they run in the
+        default executor instead of on the event loop.
+
+        Args:
+            credential: Credential from the pool
+
+        Returns:
+            Authorization header value
+        """
+        if credential.needs_refresh():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, credential.authorization)
+        return credential.authorization()
+
+    async def _get(self, path: str) -> dict:
+        """Get a single API resource
+
+        Args:
+            path: API path
+
+        Returns:
+            Decoded JSON body
+        """
+        data, _ = await self._request(path)
+        return data
+
+    async def _paginate(self, path: str, params: Optional[dict] = None) -> list:
+        """Get every item of a paginated list endpoint
+
+        Args:
+            path: API path
+            params: Optional query parameters
+
+        Returns:
+            List of items from all pages
+        """
+        params = dict(params or {}, per_page=self.per_page)
+        items, next_url = await self._request(path, params)
+
+        while next_url:
+            page, next_url = await self._request(next_url)
+            items.extend(page)
+
+        return items
+
+    async def get_organization(self, org_name: str) -> dict:
+        """Get organization data
+
+        The organization is fetched once and cached for the lifetime of
+        the client.
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Organization JSON object
+        """
+        if org_name not in self._organizations:
+            self._organizations[org_name] = await self._get(f"/orgs/{org_name}")
+        return self._organizations[org_name]
+
+    async def get_org_settings(self, org_name: str) -> dict:
+        """Get organization settings
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Dictionary containing organization settings
+        """
+        return org_settings(await self.get_organization(org_name))
+
+    async def get_teams(self, org_name: str, include_members: bool = False) -> list:
+        """Get all teams in the organization
+
+        With include_members, every team also gets its members, the slug
+        of its parent team and the slugs of its child teams, and each
+        user's display name is fetched only once. Teams whose members could
+        not be listed are recorded in self.errors.
+
+        Args:
+            org_name: Name of the organization
+            include_members: Whether to add members and the team hierarchy
+
+        Returns:
+            List of TeamRecord
+        """
+        listing = await self._paginate(f"/orgs/{org_name}/teams")
+
+        # The listing omits member and repository counts
+        details = await asyncio.gather(*[
+            self._get(f"/orgs/{org_name}/teams/{team['slug']}") for team in listing
+        ])
+
+        teams = [team_info(team) for team in details]
+
+        if include_members:
+            add_team_hierarchy(teams, listing)
+            members = await asyncio.gather(
+                *[self.get_team_members(org_name, team["slug"]) for team in teams],
+                return_exceptions=True,
+            )
+            for team, team_members in zip(teams, members):
+                if isinstance(team_members, Exception):
+                    self.errors.append(team_error(org_name, team["slug"], team_members))
+                else:
+                    team["members"] = team_members
+
+        return teams
+
+    async def get_team_members(self, org_name: str, team_slug: str) -> list:
+        """Get members of a specific team
+
+        Two listings give the roles of all members: the maintainers and
+        everyone, instead of one membership request per member.
+
+        Args:
+            org_name: Name of the organization
+            team_slug: Slug of the team
+
+        Returns:
+            List of team member information
+        """
+        path = f"/orgs/{org_name}/teams/{team_slug}/members"
+        maintainers, listing = await asyncio.gather(
+            self._paginate(path, {"role": "maintainer"}),
+            self._paginate(path, {"role": "all"}),
+        )
+        maintainer_logins = {member["login"] for member in maintainers}
+
+        # The listing omits display names
+        names = await self.get_user_names([member["login"] for member in listing])
+
+        return [
+            TeamMember(
+                member["login"],
+                names.get(member["login"]),
+                "maintainer" if member["login"] in maintainer_logins else "member",
+            )
+            for member in listing
+        ]
+
+    async def get_user_names(self, logins: list) -> dict:
+        """Get the display names of users
+
+        Lookups are shared for the lifetime of the client, so each user is
+        fetched once however many teams they belong to, even when several
+        teams are fetched at the same time.
+
+        Args:
+            logins: Logins of the users
+
+        Returns:
+            Dictionary mapping logins to display names
+        """
+        for login in logins:
+            if login not in self._user_names and login not in self._user_lookups:
+                self._user_lookups[login] = asyncio.ensure_future(self._lookup_user_name(login))
+
+        lookups = {self._user_lookups[login] for login in logins if login in self._user_lookups}
+        await asyncio.gather(*lookups)
+        return {login: self._user_names.get(login) for login in logins}
+
+    async def _lookup_user_name(self, login: str) -> None:
+        """Fetch and remember the display name of a user
+
+        Args:
+            login: Login of the user
+        """
+        try:
+            user = await self._get(f"/users/{login}")
+            self._user_names[login] = user.get("name")
+        except Exception:
+            self._user_names[login] = None
+        finally:
+            del self._user_lookups[login]
+
+    async def list_repositories(self, org_name: str) -> list:
+        """List repository objects in the organization
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            List of repository JSON objects
+        """
+        return await self._paginate(f"/orgs/{org_name}/repos")
+
+    async def get_repo(self, org_name: str, repo_name: str) -> dict:
+        """Get a single repository object
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+
+        Returns:
+            Repository JSON object
+        """
+        return await self._get(f"/repos/{org_name}/{repo_name}")
+
+    async def get_repositories(self, org_name: str, repos: Optional[list] = None) -> list:
+        """Get all repositories in the organization
+
+        The repository listing omits the merge settings, so each repository
+        is also fetched once. Failures are recorded in self.errors, and the
+        repository keeps the fields of the listing.
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+
+        Returns:
+            List of RepositoryRecord
+        """
+        if repos is None:
+            repos = await self.list_repositories(org_name)
+
+        details = await self._gather_repos(
+            org_name, "repositories", lambda repo: self._get(f"/repos/{repo['full_name']}"), repos
+        )
+        return [repository_info(detail or repo) for repo, detail in details]
+
+    async def get_repository_permissions(self, org_name: str, repo_name: str, repo=None) -> dict:
+        """Get permissions for a specific repository
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Unused; accepted for parity with GitHubAuditClient
+
+        Returns:
+            PermissionsRecord of the repository
+        """
+        path = f"/repos/{org_name}/{repo_name}"
+        params = {"affiliation": self.affiliation} if self.affiliation else None
+        collaborators, teams = await asyncio.gather(
+            self._paginate(f"{path}/collaborators", params),
+            self._paginate(f"{path}/teams"),
+        )
+
+        permissions = PermissionsRecord(
+            repository=repo_name,
+            collaborators=[collaborator_permissions(collab) for collab in collaborators],
+            teams=[TeamGrant(team.get("name"), team.get("permission")) for team in teams],
+        )
+
+        return permissions
+
+    async def get_org_permissions(self, org_name: str, repos: Optional[list] = None) -> list:
+        """Get permissions across all repositories in the organization
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+
+        Returns:
+            List of permission information for all repositories
+        """
+        if repos is None:
+            repos = await self.list_repositories(org_name)
+        results = await self._gather_repos(
+            org_name,
+            "permissions",
+            lambda repo: self.get_repository_permissions(org_name, repo["name"], repo=repo),
+            repos,
+        )
+
+        return [perms for _, perms in results if perms is not None]
+
+    async def iter_org_permissions(
+        self, org_name: str, repos: Optional[list] = None
+    ) -> AsyncIterator[dict]:
+        """Yield permissions of each repository as soon as they are fetched
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+
+        Yields:
+            Permission information of one repository, in completion order
+        """
+        if repos is None:
+            repos = await self.list_repositories(org_name)
+        results = self._iter_repos(
+            org_name,
+            "permissions",
+            lambda repo: self.get_repository_permissions(org_name, repo["name"], repo=repo),
+            repos,
+        )
+
+        async for _, perms in results:
+            if perms is not None:
+                yield perms
+
+    async def find_codeowners(self, org_name: str, repo_name: str, repo=None) -> Optional[dict]:
+        """Locate the CODEOWNERS file of a repository without downloading it
+
+        Works like GitHubAuditClient.find_codeowners: one request lists the
+        root tree of the default branch, and answers are remembered by tree
+        SHA.
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Optional repository dictionary already fetched for repo_name
+
+        Returns:
+            Dictionary with the path and blob sha of the CODEOWNERS file, or
+            None if the repository has none
+        """
+        if repo is None:
+            repo = await self.get_repo(org_name, repo_name)
+
+        path = f"/repos/{org_name}/{repo_name}/git/trees"
+        try:
+            tree = await self._get(f"{path}/{repo['default_branch']}")
+        except aiohttp.ClientResponseError as e:
+            # Missing branches and empty repositories have no tree
+            if e.status in (404, 409):
+                return None
+            raise
+
+        key = f"codeowners:{repo['full_name']}"
+        known = self._recall(key)
+        if known is not None and known["tree"] == tree["sha"]:
+            return known["location"]
+
+        entries = {entry["path"]: (entry["type"], entry["sha"]) for entry in tree["tree"]}
+        location = None
+        for candidate, blob_sha, subtree_sha in codeowners_candidates(entries):
+            if subtree_sha:
+                blob_sha = await self._codeowners_in_tree(path, subtree_sha)
+            if blob_sha:
+                location = {"path": candidate, "sha": blob_sha}
+                break
+
+        self._remember(key, {"tree": tree["sha"], "location": location})
+        return location
+
+    async def _codeowners_in_tree(self, trees_path: str, tree_sha: str) -> Optional[str]:
+        """Get the blob sha of a CODEOWNERS file directly inside a tree
+
+        Args:
+            trees_path: API path of the repository's git trees
+            tree_sha: SHA of the tree to look in
+
+        Returns:
+            Blob sha, or None if the tree has no CODEOWNERS file
+        """
+        key = f"codeowners-tree:{tree_sha}"
+        known = self._recall(key)
+        if known is None:
+            tree = await self._get(f"{trees_path}/{tree_sha}")
+            entries = {entry["path"]: (entry["type"], entry["sha"]) for entry in tree["tree"]}
+            known = {"sha": codeowners_blob(entries)}
+            self._remember(key, known)
+        return known["sha"]
+
+    async def get_codeowners(self, org_name: str, repo_name: str, repo=None) -> Optional[str]:
+        """Get CODEOWNERS file content for a repository
+
+        The file is located with find_codeowners and its content is only
+        downloaded when the blob has not been seen before.
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Optional repository dictionary already fetched for repo_name
+
+        Returns:
+            Content of CODEOWNERS file or None if not found
+        """
+        location = await self.find_codeowners(org_name, repo_name, repo=repo)
+        if location is None:
+            return None
+
+        key = f"blob:{location['sha']}"
+        content = self._recall(key)
+        if content is None:
+            blob = await self._get(f"/repos/{org_name}/{repo_name}/git/blobs/{location['sha']}")
+            content = base64.b64decode(blob["content"]).decode("utf-8")
+            self._remember(key, content)
+
+        return content
+
+    async def get_codeowners_locations(self, org_name: str, repos: Optional[list] = None) -> dict:
+        """Locate CODEOWNERS files for all repositories without downloading them
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository dictionaries from list_repositories;
+                fetched when not provided
+
+        Returns:
+            Dictionary mapping repository names to the CODEOWNERS path, or
+            None for repositories without one
+        """
+        if repos is None:
+            repos = await self.list_repositories(org_name)
+
+        async def locate(repo):
+            location = await self.find_codeowners(org_name, repo["name"], repo=repo)
+            return (location["path"] if location else None,)
+
+        results = await self._gather_repos(org_name, "codeowners", locate, repos)
+
+        return {repo["name"]: result[0] for repo, result in results if result is not None}
+
+    async def get_all_codeowners(self, org_name: str, repos: Optional[list] = None) -> dict:
+        """Get CODEOWNERS files for all repositories
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+
+        Returns:
+            Dictionary mapping repository names to CODEOWNERS content
+        """
+        if repos is None:
+            repos = await self.list_repositories(org_name)
+        results = await self._gather_repos(
+            org_name,
+            "codeowners",
+            lambda repo: self.get_codeowners(org_name, repo["name"], repo=repo),
+            repos,
+        )
+
+        return {repo["name"]: content for repo, content in results if content}
+
+    async def iter_codeowners(
+        self, org_name: str, repos: Optional[list] = None, include_missing: bool = False
+    ) -> AsyncIterator[tuple]:
+        """Yield CODEOWNERS files as soon as they are fetched
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+            include_missing: Also yield repositories without a CODEOWNERS
+                file, with None as the content
+
+        Yields:
+            (repository name, CODEOWNERS content) tuples for repositories
+            that have a CODEOWNERS file, in completion order. Repositories
+            that failed are never yielded.
+        """
+        async def fetch(repo):
+            # Wrapped so that failures can be told apart from missing files
+            return (await self.get_codeowners(org_name, repo["name"], repo=repo),)
+
+        if repos is None:
+            repos = await self.list_repositories(org_name)
+        results = self._iter_repos(org_name, "codeowners", fetch, repos)
+
+        async for repo, result in results:
+            content = result[0] if result is not None else None
+            if content or (include_missing and result is not None):
+                yield repo["name"], content
+
+    def repository_names(self, repos: list) -> list:
+        """Get the names of repository dictionaries
+
+        Args:
+            repos: Repository dictionaries from list_repositories
+
+        Returns:
+            List of repository names in the order of repos
+        """
+        return [repo["name"] for repo in repos]
+
+    def repository_timestamps(self, repos: list) -> dict:
+        """Get when each repository last changed
+
+        The timestamps come from the repository listing, so no requests
+        are made.
+
+        Args:
+            repos: Repository dictionaries from list_repositories
+
+        Returns:
+            Dictionary mapping repository names, in the order of repos, to
+            their updated_at and pushed_at timestamps
+        """
+        return {repo["name"]: repo_timestamps(repo) for repo in repos}
+
+    @staticmethod
+    def _repo_name(repo) -> str:
+        """Get the name of a repository dictionary
+
+        Args:
+            repo: Repository dictionary
+
+        Returns:
+            Name of the repository
+        """
+        return repo["name"]
+
+    async def _gather_repos(self, org_name: str, section: str, func: Callable, repos: list) -> list:
+        """Run a per-repository coroutine across repositories
+
+        Failures are recorded in self.errors rather than raised.
+
+        Args:
+            org_name: Name of the organization
+            section: Audit section name used when recording errors
+            func: Coroutine function called with each repository object
+            repos: Repository objects to process
+
+        Returns:
+            List of (repository, result) tuples in the order of repos, with
+            None as the result for repositories that failed
+        """
+        outcomes = await asyncio.gather(
+            *[func(repo) for repo in repos], return_exceptions=True
+        )
+
+        results = []
+        for repo, outcome in zip(repos, outcomes):
+            if isinstance(outcome, Exception):
+                self.errors.append({
+                    "organization": org_name,
+                    "section": section,
+                    "repository": repo["name"],
+                    "error": str(outcome),
+                })
+                outcome = None
+            results.append((repo, outcome))
+
+        return results
+
+    async def _iter_repos(
+        self, org_name: str, section: str, func: Callable, repos: list
+    ) -> AsyncIterator[tuple]:
+        """Run a per-repository coroutine across repositories lazily
+
+        Like _gather_repos, but results are yielded as soon as they are
+        ready. At most two repositories per connection are in progress
+        ahead of the consumer, so results do not pile up in memory.
+
+        Args:
+            org_name: Name of the organization
+            section: Audit section name used when recording errors
+            func: Coroutine function called with each repository object
+            repos: Repository objects to process
+
+        Yields:
+            (repository, result) tuples in completion order, with None as
+            the result for repositories that failed
+        """
+        remaining = iter(repos)
+        running = {}
+
+        def fill():
+            while len(running) < 2 * self.concurrency:
+                repo = next(remaining, None)
+                if repo is None:
+                    return
+                running[asyncio.ensure_future(func(repo))] = repo
+
+        fill()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    repo = running.pop(task)
+                    outcome = task.exception()
+                    if outcome is not None:
+                        self.errors.append({
+                            "organization": org_name,
+                            "section": section,
+                            "repository": repo["name"],
+                            "error": str(outcome),
+                        })
+                        yield repo, None
+                    else:
+                        yield repo, task.result()
+                fill()
+        finally:
+            for task in running:
+                task.cancel()
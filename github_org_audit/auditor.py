@@ -1,22 +1,59 @@
 """Audit functions for GitHub organizations"""
 
+import asyncio
+import contextlib
+import inspect
 import yaml
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+from .checkpoint import AuditJournal
 from .client import GitHubAuditClient
+from .metrics import AuditMetrics
+from .records import RepositoryRecord, as_records
+
+
+# Record type of each section in streamed output, and whether the
+# section holds a list of records rather than a single one
+RECORD_TYPES = {
+    "settings": ("settings", False),
+    "teams": ("team", True),
+    "repositories": ("repository", True),
+    "permissions": ("permissions", True),
+    "codeowners": ("codeowners", True),
+}
 
 
 class GitHubOrgAuditor:
     """Auditor for GitHub organizations"""
 
-    def __init__(self, client: GitHubAuditClient, config: Optional[Dict] = None):
+    def __init__(
+        self,
+        client: GitHubAuditClient,
+        config: Optional[Dict] = None,
+        snapshot: Optional[Dict] = None,
+        checkpoint_dir: Optional[str] = None,
+        metrics: Optional[AuditMetrics] = None,
+    ):
         """Initialize the auditor
         
         Args:
-            client: GitHubAuditClient instance
+            client: GitHubAuditClient or AsyncGitHubAuditClient instance
             config: Optional configuration dictionary
+            snapshot: Optional results of a previous audit; repositories
+                that have not changed since then keep their permissions
+                and CODEOWNERS from it instead of being fetched again
+            checkpoint_dir: Optional directory for checkpoint journals;
+                audit() records its progress there and an interrupted
+                audit resumes where it stopped
+            metrics: Optional metrics to time each audit section in;
+                defaults to the client's metrics
         """
         self.client = client
         self.config = config or self._default_config()
+        self.snapshot = snapshot
+        self.checkpoint_dir = checkpoint_dir
+        self.metrics = metrics if metrics is not None else getattr(client, "metrics", None)
+        self.incremental = None
+        self.resumed = False
     
     @staticmethod
     def _default_config() -> Dict:
@@ -43,68 +80,766 @@ class GitHubOrgAuditor:
         Returns:
             Dictionary containing all audit results
         """
+        if self._is_async():
+            return asyncio.run(self._audit_and_close(org_name))
+        
         results = {
             "organization": org_name,
             "audit_timestamp": None,
         }
+        errors_start = len(self.client.errors)
+        journal = self._open_journal(org_name)
+        
+        # List repositories once and share them between sections
+        repos = None
+        if self._needs_repositories():
+            with self._timed("list_repositories"):
+                repos = self.client.list_repositories(org_name)
+            results["repository_timestamps"] = self.client.repository_timestamps(repos)
         
         # Audit organization settings
         if self.config.get("audit_settings", True):
-            results["settings"] = self.client.get_org_settings(org_name)
+            with self._timed("settings"):
+                results["settings"] = self._checkpointed(
+                    journal, "settings", lambda: self.client.get_org_settings(org_name)
+                )
         
         # Audit teams
         if self.config.get("audit_teams", True):
-            results["teams"] = self.audit_teams(org_name)
+            with self._timed("teams"):
+                results["teams"] = self._checkpointed(
+                    journal, "teams", lambda: self.audit_teams(org_name)
+                )
         
         # Audit repositories
         if self.config.get("audit_repositories", True):
-            results["repositories"] = self.audit_repositories(org_name)
+            with self._timed("repositories"):
+                results["repositories"] = self._checkpointed(
+                    journal, "repositories", lambda: self.audit_repositories(org_name, repos=repos)
+                )
         
         # Audit permissions
         if self.config.get("audit_permissions", True):
-            results["permissions"] = self.client.get_org_permissions(org_name)
+            with self._timed("permissions"):
+                changed, unchanged = self._split_unchanged(
+                    org_name, "permissions", repos, results["repository_timestamps"]
+                )
+                fresh = self._fetch_permissions(org_name, changed, journal)
+                results["permissions"] = self._merge_snapshot(
+                    "permissions", fresh, unchanged, results["repository_timestamps"]
+                )
         
         # Audit CODEOWNERS
         if self.config.get("audit_codeowners", True):
-            results["codeowners"] = self.client.get_all_codeowners(org_name)
+            with self._timed("codeowners"):
+                changed, unchanged = self._split_unchanged(
+                    org_name, "codeowners", repos, results["repository_timestamps"]
+                )
+                fresh = self._fetch_codeowners(org_name, changed, journal)
+                results["codeowners"] = self._merge_snapshot(
+                    "codeowners", fresh, unchanged, results["repository_timestamps"]
+                )
+        
+        self._add_errors(results, errors_start)
+        if journal is not None:
+            journal.finish()
         
         return results
     
-    def audit_teams(self, org_name: str) -> List[Dict]:
-        """Audit all teams in the organization
+    async def audit_async(self, org_name: str) -> Dict:
+        """Perform full audit of organization with an asynchronous client
+        
+        Sections run concurrently on the client's connection pool, so
+        several organizations can be audited from one event loop.
+        
+        Args:
+            org_name: Name of the organization to audit
+            
+        Returns:
+            Dictionary containing all audit results
+        """
+        results = {
+            "organization": org_name,
+            "audit_timestamp": None,
+        }
+        errors_start = len(self.client.errors)
+        journal = self._open_journal(org_name)
+        
+        # List repositories once and share them between sections
+        repos = None
+        if self._needs_repositories():
+            with self._timed("list_repositories"):
+                repos = await self.client.list_repositories(org_name)
+            results["repository_timestamps"] = self.client.repository_timestamps(repos)
+        
+        unchanged = {}
+        sections = {}
+        if self.config.get("audit_settings", True):
+            sections["settings"] = self._checkpointed_async(
+                journal, "settings", lambda: self.client.get_org_settings(org_name)
+            )
+        if self.config.get("audit_teams", True):
+            sections["teams"] = self._checkpointed_async(
+                journal, "teams", lambda: self.audit_teams_async(org_name)
+            )
+        if self.config.get("audit_repositories", True):
+            sections["repositories"] = self._checkpointed_async(
+                journal, "repositories", lambda: self.client.get_repositories(org_name, repos=repos)
+            )
+        if self.config.get("audit_permissions", True):
+            changed, unchanged["permissions"] = self._split_unchanged(
+                org_name, "permissions", repos, results["repository_timestamps"]
+            )
+            sections["permissions"] = self._fetch_permissions_async(org_name, changed, journal)
+        if self.config.get("audit_codeowners", True):
+            changed, unchanged["codeowners"] = self._split_unchanged(
+                org_name, "codeowners", repos, results["repository_timestamps"]
+            )
+            sections["codeowners"] = self._fetch_codeowners_async(org_name, changed, journal)
+        
+        values = await asyncio.gather(*(
+            self._timed_async(section, awaitable) for section, awaitable in sections.items()
+        ))
+        results.update(zip(sections.keys(), values))
+        for section, names in unchanged.items():
+            results[section] = self._merge_snapshot(
+                section, results[section], names, results["repository_timestamps"]
+            )
+        
+        if "repositories" in results:
+            results["repositories"] = self._filter_archived(results["repositories"])
+        
+        self._add_errors(results, errors_start)
+        if journal is not None:
+            journal.finish()
+        
+        return results
+    
+    def _timed(self, section: str):
+        """Time a block as an audit section, if metrics are collected
+        
+        Args:
+            section: Section name
+            
+        Returns:
+            Context manager
+        """
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.section(section)
+    
+    async def _timed_async(self, section: str, awaitable):
+        """Await a section, timing it if metrics are collected
+        
+        Sections of audit_async run concurrently, so their times overlap.
+        
+        Args:
+            section: Section name
+            awaitable: Awaitable of the section result
+            
+        Returns:
+            Section result
+        """
+        with self._timed(section):
+            return await awaitable
+    
+    async def _audit_and_close(self, org_name: str) -> Dict:
+        """Run audit_async and close the client's session afterwards
+        
+        Args:
+            org_name: Name of the organization to audit
+            
+        Returns:
+            Dictionary containing all audit results
+        """
+        try:
+            return await self.audit_async(org_name)
+        finally:
+            await self.client.close()
+    
+    def _open_journal(self, org_name: str) -> Optional[AuditJournal]:
+        """Open the checkpoint journal of an organization, if configured
+        
+        Args:
+            org_name: Name of the organization to audit
+            
+        Returns:
+            AuditJournal instance, or None without a checkpoint directory
+        """
+        if not self.checkpoint_dir:
+            return None
+        journal = AuditJournal(self.checkpoint_dir, org_name, self.config)
+        self.resumed = journal.resumed
+        return journal
+    
+    @staticmethod
+    def _checkpointed(journal: Optional[AuditJournal], section: str, fetch: Callable):
+        """Get a section from the journal, or fetch it and record it there
+        
+        Args:
+            journal: Checkpoint journal, or None
+            section: Audit section name
+            fetch: Function returning the section result
+            
+        Returns:
+            Section result
+        """
+        if journal is not None and journal.has_section(section):
+            return journal.sections[section]
+        data = fetch()
+        if journal is not None:
+            journal.record_section(section, data)
+        return data
+    
+    @staticmethod
+    async def _checkpointed_async(journal: Optional[AuditJournal], section: str, fetch: Callable):
+        """Get a section from the journal, or fetch it and record it there
+        
+        Args:
+            journal: Checkpoint journal, or None
+            section: Audit section name
+            fetch: Function returning an awaitable of the section result
+            
+        Returns:
+            Section result
+        """
+        if journal is not None and journal.has_section(section):
+            return journal.sections[section]
+        data = await fetch()
+        if journal is not None:
+            journal.record_section(section, data)
+        return data
+    
+    def _fetch_permissions(
+        self, org_name: str, repos: List, journal: Optional[AuditJournal]
+    ) -> List:
+        """Get permissions of repositories, skipping those in the journal
         
         Args:
             org_name: Name of the organization
+            repos: Repository objects from the client's list_repositories
+            journal: Checkpoint journal, or None
             
         Returns:
-            List of team information with members
+            List of permission information in the order of repos
+        """
+        if journal is None:
+            return self.client.get_org_permissions(org_name, repos=repos)
+        
+        names = self.client.repository_names(repos)
+        done = journal.repository_results("permissions")
+        todo = [repo for repo, name in zip(repos, names) if name not in done]
+        for perms in self.client.iter_org_permissions(org_name, repos=todo):
+            journal.record_repository("permissions", perms["repository"], perms)
+        
+        done = journal.repository_results("permissions")
+        return [done[name] for name in names if name in done]
+    
+    async def _fetch_permissions_async(
+        self, org_name: str, repos: List, journal: Optional[AuditJournal]
+    ) -> List:
+        """Get permissions of repositories with an asynchronous client,
+        skipping those in the journal
+        
+        Args:
+            org_name: Name of the organization
+            repos: Repository dictionaries from the client's list_repositories
+            journal: Checkpoint journal, or None
+            
+        Returns:
+            List of permission information in the order of repos
+        """
+        if journal is None:
+            return await self.client.get_org_permissions(org_name, repos=repos)
+        
+        names = self.client.repository_names(repos)
+        done = journal.repository_results("permissions")
+        todo = [repo for repo, name in zip(repos, names) if name not in done]
+        async for perms in self.client.iter_org_permissions(org_name, repos=todo):
+            journal.record_repository("permissions", perms["repository"], perms)
+        
+        done = journal.repository_results("permissions")
+        return [done[name] for name in names if name in done]
+    
+    def _fetch_codeowners(
+        self, org_name: str, repos: List, journal: Optional[AuditJournal]
+    ) -> Dict:
+        """Get CODEOWNERS files of repositories, skipping those in the journal
+        
+        Repositories without a CODEOWNERS file are journaled as well, so
+        they are not checked again after a restart.
+        
+        Args:
+            org_name: Name of the organization
+            repos: Repository objects from the client's list_repositories
+            journal: Checkpoint journal, or None
+            
+        Returns:
+            Dictionary mapping repository names to CODEOWNERS content
         """
-        teams = self.client.get_teams(org_name)
+        if journal is None:
+            return self.client.get_all_codeowners(org_name, repos=repos)
+        
+        names = self.client.repository_names(repos)
+        done = journal.repository_results("codeowners")
+        todo = [repo for repo, name in zip(repos, names) if name not in done]
+        codeowners = self.client.iter_codeowners(org_name, repos=todo, include_missing=True)
+        for name, content in codeowners:
+            journal.record_repository("codeowners", name, content)
         
-        # Optionally get team members
-        if self.config.get("include_team_members", False):
+        done = journal.repository_results("codeowners")
+        return {name: done[name] for name in names if done.get(name)}
+    
+    async def _fetch_codeowners_async(
+        self, org_name: str, repos: List, journal: Optional[AuditJournal]
+    ) -> Dict:
+        """Get CODEOWNERS files of repositories with an asynchronous client,
+        skipping those in the journal
+        
+        Args:
+            org_name: Name of the organization
+            repos: Repository dictionaries from the client's list_repositories
+            journal: Checkpoint journal, or None
+            
+        Returns:
+            Dictionary mapping repository names to CODEOWNERS content
+        """
+        if journal is None:
+            return await self.client.get_all_codeowners(org_name, repos=repos)
+        
+        names = self.client.repository_names(repos)
+        done = journal.repository_results("codeowners")
+        todo = [repo for repo, name in zip(repos, names) if name not in done]
+        records = self.client.iter_codeowners(org_name, repos=todo, include_missing=True)
+        async for name, content in records:
+            journal.record_repository("codeowners", name, content)
+        
+        done = journal.repository_results("codeowners")
+        return {name: done[name] for name in names if done.get(name)}
+    
+    def iter_audit(self, org_name: str) -> Iterator[Dict]:
+        """Perform full audit of organization, yielding records as they are ready
+        
+        Instead of building one results dictionary, every team, repository,
+        permission entry and CODEOWNERS file is yielded as a separate record
+        as soon as it has been fetched, so memory use does not grow with
+        the size of the organization. Each record is a dictionary with the
+        record "type", the "organization" and the record "data". The first
+        record has type "audit" and lists the audited sections; per-repository
+        failures follow at the end as "error" records. results_from_records
+        turns the records back into the dictionary returned by audit().
+        The section times recorded in metrics include the time the caller
+        spends processing the records of the permissions and CODEOWNERS
+        sections, which are yielded while they are fetched.
+        
+        Args:
+            org_name: Name of the organization to audit
+            
+        Yields:
+            Audit records
+        """
+        if self._is_async():
+            yield from self._iter_async(org_name)
+            return
+        
+        errors_start = len(self.client.errors)
+        yield self._record("audit", org_name, {
+            "audit_timestamp": None,
+            "sections": self._sections(),
+        })
+        
+        timestamps = None
+        repos = None
+        if self._needs_repositories():
+            with self._timed("list_repositories"):
+                repos = self.client.list_repositories(org_name)
+            timestamps = self.client.repository_timestamps(repos)
+            yield self._record("repository_timestamps", org_name, timestamps)
+        
+        if self.config.get("audit_settings", True):
+            with self._timed("settings"):
+                settings = self.client.get_org_settings(org_name)
+            yield self._record("settings", org_name, settings)
+        
+        if self.config.get("audit_teams", True):
+            with self._timed("teams"):
+                teams = self.audit_teams(org_name)
             for team in teams:
+                yield self._record("team", org_name, team)
+        
+        if self.config.get("audit_repositories", True):
+            with self._timed("repositories"):
+                repositories = self.audit_repositories(org_name, repos=repos)
+            for repo in repositories:
+                yield self._record("repository", org_name, repo)
+        
+        if self.config.get("audit_permissions", True):
+            with self._timed("permissions"):
+                changed, unchanged = self._split_unchanged(
+                    org_name, "permissions", repos, timestamps
+                )
+                yield from self._snapshot_records(org_name, "permissions", unchanged)
+                for perms in self.client.iter_org_permissions(org_name, repos=changed):
+                    yield self._record("permissions", org_name, perms)
+        
+        if self.config.get("audit_codeowners", True):
+            with self._timed("codeowners"):
+                changed, unchanged = self._split_unchanged(
+                    org_name, "codeowners", repos, timestamps
+                )
+                yield from self._snapshot_records(org_name, "codeowners", unchanged)
+                for name, content in self.client.iter_codeowners(org_name, repos=changed):
+                    yield self._codeowners_record(org_name, name, content)
+        
+        yield from self._error_records(org_name, errors_start)
+    
+    async def aiter_audit(self, org_name: str) -> AsyncIterator[Dict]:
+        """Perform full audit of organization with an asynchronous client,
+        yielding records as they are ready
+        
+        Sections are audited one after another; the repositories within a
+        section are processed concurrently and yielded in completion order.
+        
+        Args:
+            org_name: Name of the organization to audit
+            
+        Yields:
+            Audit records, as described in iter_audit
+        """
+        errors_start = len(self.client.errors)
+        yield self._record("audit", org_name, {
+            "audit_timestamp": None,
+            "sections": self._sections(),
+        })
+        
+        timestamps = None
+        repos = None
+        if self._needs_repositories():
+            with self._timed("list_repositories"):
+                repos = await self.client.list_repositories(org_name)
+            timestamps = self.client.repository_timestamps(repos)
+            yield self._record("repository_timestamps", org_name, timestamps)
+        
+        if self.config.get("audit_settings", True):
+            with self._timed("settings"):
+                settings = await self.client.get_org_settings(org_name)
+            yield self._record("settings", org_name, settings)
+        
+        if self.config.get("audit_teams", True):
+            with self._timed("teams"):
+                teams = await self.audit_teams_async(org_name)
+            for team in teams:
+                yield self._record("team", org_name, team)
+        
+        if self.config.get("audit_repositories", True):
+            with self._timed("repositories"):
+                repositories = await self.client.get_repositories(org_name, repos=repos)
+            for repo in self._filter_archived(repositories):
+                yield self._record("repository", org_name, repo)
+        
+        if self.config.get("audit_permissions", True):
+            with self._timed("permissions"):
+                changed, unchanged = self._split_unchanged(
+                    org_name, "permissions", repos, timestamps
+                )
+                for record in self._snapshot_records(org_name, "permissions", unchanged):
+                    yield record
+                async for perms in self.client.iter_org_permissions(org_name, repos=changed):
+                    yield self._record("permissions", org_name, perms)
+        
+        if self.config.get("audit_codeowners", True):
+            with self._timed("codeowners"):
+                changed, unchanged = self._split_unchanged(
+                    org_name, "codeowners", repos, timestamps
+                )
+                for record in self._snapshot_records(org_name, "codeowners", unchanged):
+                    yield record
+                async for name, content in self.client.iter_codeowners(org_name, repos=changed):
+                    yield self._codeowners_record(org_name, name, content)
+        
+        for record in self._error_records(org_name, errors_start):
+            yield record
+    
+    def _iter_async(self, org_name: str) -> Iterator[Dict]:
+        """Drive aiter_audit from synchronous code
+        
+        The records are produced on a private event loop, and the client's
+        session is closed once the iteration ends.
+        
+        Args:
+            org_name: Name of the organization to audit
+            
+        Yields:
+            Audit records
+        """
+        loop = asyncio.new_event_loop()
+        records = self.aiter_audit(org_name)
+        try:
+            while True:
                 try:
-                    members = self.client.get_team_members(org_name, team["slug"])
-                    team["members"] = members
-                except Exception as e:
-                    team["members"] = []
+                    yield loop.run_until_complete(records.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(records.aclose())
+            loop.run_until_complete(self.client.close())
+            loop.close()
+    
+    def _sections(self) -> List[str]:
+        """Get the names of the enabled audit sections"""
+        return [
+            section for section in RECORD_TYPES
+            if self.config.get(f"audit_{section}", True)
+        ]
+    
+    @staticmethod
+    def _record(record_type: str, org_name: str, data) -> Dict:
+        """Build a streamed audit record
         
-        return teams
+        Args:
+            record_type: Type of the record
+            org_name: Name of the organization
+            data: Record payload
+            
+        Returns:
+            Audit record
+        """
+        return {"type": record_type, "organization": org_name, "data": data}
+    
+    def _codeowners_record(self, org_name: str, repo_name: str, content: str) -> Dict:
+        """Build the record of one CODEOWNERS file"""
+        return self._record("codeowners", org_name, {
+            "repository": repo_name,
+            "content": content,
+        })
+    
+    def _snapshot_records(self, org_name: str, section: str, unchanged: set) -> Iterator[Dict]:
+        """Yield the snapshot's records for repositories that did not change
+        
+        Args:
+            org_name: Name of the organization
+            section: Audit section name ("permissions" or "codeowners")
+            unchanged: Names of repositories reused from the snapshot
+            
+        Yields:
+            Audit records taken from the snapshot
+        """
+        if not unchanged:
+            return
+        previous = self.snapshot[section]
+        if section == "permissions":
+            for perms in previous:
+                if perms["repository"] in unchanged:
+                    yield self._record("permissions", org_name, perms)
+        else:
+            for name, content in previous.items():
+                if name in unchanged:
+                    yield self._codeowners_record(org_name, name, content)
+    
+    def _error_records(self, org_name: str, errors_start: int) -> Iterator[Dict]:
+        """Yield per-repository failures recorded during this audit
+        
+        Args:
+            org_name: Name of the organization
+            errors_start: Length of the client's error list when the audit began
+            
+        Yields:
+            Audit records of type "error"
+        """
+        for error in self.client.errors[errors_start:]:
+            if error["organization"] == org_name:
+                yield self._record("error", org_name, error)
     
-    def audit_repositories(self, org_name: str) -> List[Dict]:
+    def _is_async(self) -> bool:
+        """Check whether the client exposes coroutine methods"""
+        return inspect.iscoroutinefunction(self.client.get_org_settings)
+    
+    def _needs_repositories(self) -> bool:
+        """Check whether any enabled section needs the repository listing"""
+        return any(
+            self.config.get(section, True)
+            for section in ("audit_repositories", "audit_permissions", "audit_codeowners")
+        )
+    
+    def _split_unchanged(self, org_name: str, section: str, repos: List, timestamps: Dict):
+        """Split repositories into those to fetch and those to reuse
+        
+        A repository is reused from the snapshot when its updated_at and
+        pushed_at timestamps match the snapshot and the section was audited
+        for it without errors. Without a usable snapshot every repository
+        is fetched.
+        
+        Args:
+            org_name: Name of the organization
+            section: Audit section name ("permissions" or "codeowners")
+            repos: Repository objects from the client's list_repositories
+            timestamps: Repository timestamps of the running audit
+            
+        Returns:
+            Tuple of (repository objects to fetch, names of repositories
+            whose snapshot results are reused)
+        """
+        snapshot = self.snapshot
+        if not snapshot or snapshot.get("organization") != org_name or section not in snapshot:
+            return repos, set()
+        
+        previous = snapshot.get("repository_timestamps") or {}
+        failed = {
+            e["repository"] for e in snapshot.get("errors", [])
+            if e.get("section") == section
+        }
+        changed = []
+        unchanged = set()
+        modified = 0
+        for repo in repos:
+            name = self.client._repo_name(repo)
+            if previous.get(name) != timestamps[name]:
+                modified += 1
+                changed.append(repo)
+            elif name in failed:
+                changed.append(repo)
+            else:
+                unchanged.add(name)
+        
+        self.incremental = {"changed": modified, "unchanged": len(unchanged)}
+        return changed, unchanged
+    
+    def _merge_snapshot(self, section: str, fresh, unchanged: set, timestamps: Dict):
+        """Combine freshly fetched results with those reused from the snapshot
+        
+        Args:
+            section: Audit section name ("permissions" or "codeowners")
+            fresh: Section results for the repositories that were fetched
+            unchanged: Names of repositories reused from the snapshot
+            timestamps: Repository timestamps of the running audit
+            
+        Returns:
+            Section results in repository listing order
+        """
+        if not unchanged:
+            return fresh
+        
+        order = list(timestamps)
+        previous = self.snapshot[section]
+        if section == "permissions":
+            fresh = {p["repository"]: p for p in fresh}
+            previous = {p["repository"]: p for p in previous}
+        
+        def pick(name):
+            return previous.get(name) if name in unchanged else fresh.get(name)
+        
+        if section == "permissions":
+            return [p for p in map(pick, order) if p is not None]
+        return {name: pick(name) for name in order if pick(name)}
+    
+    def _add_errors(self, results: Dict, errors_start: int) -> None:
+        """Add per-repository failures recorded during this audit
+        
+        Args:
+            results: Audit results dictionary to update
+            errors_start: Length of the client's error list when the audit began
+        """
+        errors = [
+            e for e in self.client.errors[errors_start:]
+            if e["organization"] == results["organization"]
+        ]
+        if errors:
+            results["errors"] = errors
+    
+    def audit_teams(self, org_name: str) -> List[Dict]:
+        """Audit all teams in the organization
+        
+        Args:
+            org_name: Name of the organization
+            
+        Returns:
+            List of team information with members
+        """
+        return self.client.get_teams(
+            org_name, include_members=self.config.get("include_team_members", False)
+        )
+    
+    async def audit_teams_async(self, org_name: str) -> List[Dict]:
+        """Audit all teams in the organization with an asynchronous client
+        
+        Args:
+            org_name: Name of the organization
+            
+        Returns:
+            List of team information with members
+        """
+        return await self.client.get_teams(
+            org_name, include_members=self.config.get("include_team_members", False)
+        )
+    
+    def audit_repositories(self, org_name: str, repos: Optional[List] = None) -> List[Dict]:
         """Audit all repositories in the organization
         
         Args:
             org_name: Name of the organization
+            repos: Optional repository objects from the client's
+                list_repositories; fetched when not provided
             
         Returns:
             List of repository information
         """
-        repos = self.client.get_repositories(org_name)
+        repos = self.client.get_repositories(org_name, repos=repos)
+        
+        return self._filter_archived(repos)
+    
+    def _filter_archived(self, repos: List[Dict]) -> List[Dict]:
+        """Filter archived repositories if configured
+        
+        Repositories restored from a checkpoint are converted back to
+        records, so the filter reads a slot instead of a dictionary key.
         
-        # Filter archived repositories if configured
+        Args:
+            repos: List of repository information
+            
+        Returns:
+            Filtered list of RepositoryRecord
+        """
+        repos = as_records(RepositoryRecord, repos)
         if not self.config.get("include_archived", False):
-            repos = [r for r in repos if not r.get("archived", False)]
+            repos = [r for r in repos if not r.archived]
         
         return repos
+
+
+def results_from_records(records: Iterable[Dict]) -> Dict:
+    """Assemble streamed audit records into an audit results dictionary
+    
+    Args:
+        records: Records from GitHubOrgAuditor.iter_audit
+        
+    Returns:
+        Dictionary shaped like the result of GitHubOrgAuditor.audit
+    """
+    sections = {
+        record_type: (section, many) for section, (record_type, many) in RECORD_TYPES.items()
+    }
+    results = {}
+    
+    for record in records:
+        record_type, data = record["type"], record["data"]
+        if record_type == "audit":
+            results["organization"] = record["organization"]
+            results["audit_timestamp"] = data.get("audit_timestamp")
+            # Sections without any records are still present, only empty
+            for section in data.get("sections", []):
+                if RECORD_TYPES[section][1]:
+                    results[section] = {} if section == "codeowners" else []
+        elif record_type == "repository_timestamps":
+            results["repository_timestamps"] = data
+        elif record_type == "codeowners":
+            results.setdefault("codeowners", {})[data["repository"]] = data["content"]
+        elif record_type == "error":
+            results.setdefault("errors", []).append(data)
+        elif record_type in sections:
+            section, many = sections[record_type]
+            if many:
+                results.setdefault(section, []).append(data)
+            else:
+                results[section] = data
+    
+    return results
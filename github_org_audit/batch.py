@@ -0,0 +1,148 @@
+"""Concurrent audits of several GitHub organizations"""
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from .auditor import GitHubOrgAuditor
+
+
+class BatchAuditor:
+    """Audits several organizations concurrently through one client
+
+    All organizations share the client's connection pool, rate limit
+    scheduler and credentials, so the number of requests in flight and the
+    pace of the whole batch are governed by the API budget rather than by
+    the number of organizations. With a synchronous client the
+    organizations are audited on a thread pool; with an asynchronous client
+    they run on one event loop.
+    """
+
+    def __init__(
+        self,
+        client,
+        organizations: Dict[str, Dict],
+        parallel: int = 4,
+        on_complete: Optional[Callable] = None,
+    ):
+        """Initialize the batch
+
+        Args:
+            client: GitHubAuditClient, GraphQLGitHubAuditClient or
+                AsyncGitHubAuditClient instance shared by all audits
+            organizations: Mapping of organization names to their audit
+                configuration
+            parallel: Maximum number of organizations audited at once
+            on_complete: Optional function called with the organization name
+                and its results as soon as each audit finishes
+        """
+        self.client = client
+        self.organizations = organizations
+        self.parallel = max(1, parallel)
+        self.on_complete = on_complete
+
+    def run(self) -> List[Dict]:
+        """Audit every organization
+
+        An organization whose audit fails does not stop the others; the
+        failure is reported in its summary entry.
+
+        Returns:
+            Summary entry per organization, in the order given
+        """
+        if inspect.iscoroutinefunction(self.client.get_org_settings):
+            return asyncio.run(self._run_async())
+
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            return list(executor.map(self._audit, self.organizations))
+
+    def _audit(self, org_name: str) -> Dict:
+        """Audit one organization with a synchronous client
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Summary entry of the organization
+        """
+        auditor = GitHubOrgAuditor(self.client, self.organizations[org_name])
+        started = time.monotonic()
+        try:
+            results = auditor.audit(org_name)
+        except Exception as e:
+            return summarize(org_name, None, time.monotonic() - started, e)
+
+        if self.on_complete is not None:
+            self.on_complete(org_name, results)
+        return summarize(org_name, results, time.monotonic() - started)
+
+    async def _run_async(self) -> List[Dict]:
+        """Audit every organization on one event loop
+
+        Returns:
+            Summary entry per organization, in the order given
+        """
+        semaphore = asyncio.Semaphore(self.parallel)
+
+        async def audit(org_name):
+            async with semaphore:
+                return await self._audit_async(org_name)
+
+        try:
+            return await asyncio.gather(*[audit(name) for name in self.organizations])
+        finally:
+            await self.client.close()
+
+    async def _audit_async(self, org_name: str) -> Dict:
+        """Audit one organization with an asynchronous client
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Summary entry of the organization
+        """
+        auditor = GitHubOrgAuditor(self.client, self.organizations[org_name])
+        started = time.monotonic()
+        try:
+            results = await auditor.audit_async(org_name)
+        except Exception as e:
+            return summarize(org_name, None, time.monotonic() - started, e)
+
+        if self.on_complete is not None:
+            self.on_complete(org_name, results)
+        return summarize(org_name, results, time.monotonic() - started)
+
+
+def summarize(
+    org_name: str,
+    results: Optional[Dict],
+    seconds: float,
+    error: Optional[Exception] = None,
+) -> Dict:
+    """Build the batch summary entry of one organization
+
+    Args:
+        org_name: Name of the organization
+        results: Audit results, or None if the audit failed
+        seconds: Duration of the audit
+        error: Exception that ended the audit, if any
+
+    Returns:
+        Dictionary with the status, duration and section sizes
+    """
+    summary = {
+        "organization": org_name,
+        "status": "failed" if error is not None else "ok",
+        "seconds": round(seconds, 1),
+    }
+    if error is not None:
+        summary["error"] = str(error)
+        return summary
+
+    for section in ("teams", "repositories", "permissions", "codeowners"):
+        if section in results:
+            summary[section] = len(results[section])
+    summary["errors"] = len(results.get("errors", []))
+    return summary
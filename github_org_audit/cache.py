@@ -0,0 +1,317 @@
+"""Persistent HTTP cache for conditional GitHub API requests"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+# Fraction of max_size the cache is trimmed to once it grows past it
+EVICTION_TARGET = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class HTTPCache:
+    """On-disk cache of GET responses keyed by URL
+
+    Responses that carry an ETag or Last-Modified header are stored with
+    their body. Later requests for the same URL are sent as conditional
+    requests, and a 304 Not Modified answer, which does not count against
+    the rate limit, is replayed from the cache.
+
+    The cache also keeps JSON values that clients derive from responses,
+    such as where a repository's CODEOWNERS file lives and the contents of
+    CODEOWNERS blobs. Bodies and values count towards max_size together,
+    and once they exceed it the least recently used of either are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE):
+        """Open or create the cache
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_size: Maximum total size of cached bodies and values in bytes
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "http-cache.sqlite3")
+        self.max_size = max_size
+        self.hits = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Values of caches created before they were size-accounted are
+        # dropped; they are derived from responses and are fetched again
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(entries)")}
+        if columns and "size" not in columns:
+            self._db.execute("DROP TABLE entries")
+        self._db.executescript(SCHEMA)
+        self._size = self._db.execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM responses)"
+            " + (SELECT COALESCE(SUM(size), 0) FROM entries)"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the cache database"""
+        with self._lock:
+            self._db.close()
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """Get the cached entry for a request
+
+        Args:
+            key: Cache key of the request
+
+        Returns:
+            Dictionary with etag, last_modified, headers and body, or None
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, headers, body FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "headers": json.loads(row[2]),
+            "body": row[3],
+        }
+
+    def conditional_headers(self, entry: dict) -> dict:
+        """Get the headers turning a request into a conditional one
+
+        Args:
+            entry: Cached entry from lookup()
+
+        Returns:
+            Dictionary of If-None-Match/If-Modified-Since headers
+        """
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        elif entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self, key: str) -> None:
+        """Record that a cached entry was replayed after a 304
+
+        Args:
+            key: Cache key of the request
+        """
+        with self._lock:
+            self.hits += 1
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+
+    def store(self, key: str, headers, body: bytes) -> None:
+        """Store a response if it can be revalidated later
+
+        Args:
+            key: Cache key of the request
+            headers: Response headers (case-insensitive mapping)
+            body: Response body
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        stored_headers = json.dumps({k: v for k, v in headers.items()})
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, etag, last_modified, headers, body, size, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, stored_headers, body, len(body), time.time()),
+            )
+            self.stores += 1
+            self._size += len(body) - (previous[0] if previous else 0)
+            if self._size > self.max_size:
+                self._evict()
+            self._db.commit()
+
+    def get_value(self, key: str):
+        """Get a stored value
+
+        Args:
+            key: Key of the value
+
+        Returns:
+            The value, or None if nothing is stored under key
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+        return json.loads(row[0])
+
+    def set_value(self, key: str, value) -> None:
+        """Store a JSON-serializable value
+
+        Args:
+            key: Key of the value
+            value: Value to store
+        """
+        stored = json.dumps(value)
+        size = len(stored.encode("utf-8"))
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, stored, size, time.time()),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_size:
+                self._evict()
+            self._db.commit()
+
+    def summary(self) -> dict:
+        """Get cache statistics
+
+        Returns:
+            Dictionary with hit and store counts and the cache size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stores": self.stores,
+                "size": self._size,
+            }
+
+    def _evict(self) -> None:
+        """Remove least recently used responses and values until under the size target
+
+        Must be called with the lock held.
+        """
+        target = self.max_size * EVICTION_TARGET
+        rows = self._db.execute(
+            "SELECT 'responses', key, size, accessed FROM responses"
+            " UNION ALL SELECT 'entries', key, size, accessed FROM entries"
+            " ORDER BY accessed"
+        ).fetchall()
+        evicted = {"responses": [], "entries": []}
+        for table, key, size, _ in rows:
+            if self._size <= target:
+                break
+            evicted[table].append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted["responses"])
+        self._db.executemany("DELETE FROM entries WHERE key = ?", evicted["entries"])
+
+
+class MemoMixin:
+    """Memo of values API clients derive from responses
+
+    Values live in the client's HTTP cache when it has one, so they
+    persist between runs, and in memory otherwise. Classes using the mixin
+    provide a cache attribute, an HTTPCache or None, and a _memo dict.
+    """
+
+    def _recall(self, key: str):
+        """Get a value remembered by an earlier lookup
+
+        Args:
+            key: Key of the value
+
+        Returns:
+            The value, or None if nothing is remembered under key
+        """
+        if self.cache is not None:
+            return self.cache.get_value(key)
+        return self._memo.get(key)
+
+    def _remember(self, key: str, value) -> None:
+        """Remember a value for later lookups
+
+        Args:
+            key: Key of the value
+            value: JSON-serializable value
+        """
+        if self.cache is not None:
+            self.cache.set_value(key, value)
+        else:
+            self._memo[key] = value
+
+
+def cache_key(
+    method: str, url: str, accept: Optional[str] = None, credential: Optional[str] = None
+) -> Optional[str]:
+    """Get the cache key of a request
+
+    Responses differ by credential, as each token or installation may see
+    different repositories and fields, so each credential has its own
+    entries.
+
+    Args:
+        method: HTTP method
+        url: Full request URL including the query string
+        accept: Value of the Accept header
+        credential: Key of the credential the request is sent with
+
+    Returns:
+        Cache key, or None if the request is not cacheable
+    """
+    if method.upper() != "GET":
+        return None
+    return f"{url} {accept or ''} {credential or ''}"
+
+
+def replay_headers(cached: dict, fresh) -> dict:
+    """Merge cached response headers with those of a 304 response
+
+    The cached headers describe the body; rate limit and date headers are
+    taken from the fresh response.
+
+    Args:
+        cached: Headers stored with the cached body
+        fresh: Headers of the 304 response
+
+    Returns:
+        Merged headers
+    """
+    headers = dict(cached)
+    lowered = {k.lower(): k for k in headers}
+    for name, value in fresh.items():
+        if name.lower().startswith("x-ratelimit") or name.lower() in ("date", "etag"):
+            headers.pop(lowered.get(name.lower(), name), None)
+            headers[name] = value
+    return headers
@@ -0,0 +1,151 @@
+"""Checkpoint journal for resuming interrupted audits"""
+
+import json
+import os
+from typing import Dict, Optional
+
+from .records import to_builtin
+
+
+class AuditJournal:
+    """Append-only journal of an audit in progress
+
+    Finished sections and per-repository results are appended to a file as
+    one JSON object per line and flushed immediately, so an interrupted
+    audit can be resumed without repeating finished work. A journal written
+    with a different audit configuration is discarded, and the journal is
+    removed once the audit completes.
+    """
+
+    def __init__(self, checkpoint_dir: str, org_name: str, config: Optional[Dict] = None):
+        """Open the journal of an organization, resuming it if possible
+
+        Args:
+            checkpoint_dir: Directory holding the journals
+            org_name: Name of the organization being audited
+            config: Audit configuration the journal must have been written with
+        """
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, f"{org_name}.journal")
+        self.sections = {}
+        self.repositories = {}
+
+        # Compare configurations in their JSON form, as read back from disk
+        header = {
+            "organization": org_name,
+            "config": json.loads(json.dumps(config, default=to_builtin)),
+        }
+        entries = self._load()
+        if not entries or entries[0] != header:
+            entries = [header]
+
+        for entry in entries[1:]:
+            self._apply(entry)
+
+        # Rewrite the readable entries so that a partially written last
+        # line does not corrupt the entries appended after it
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=to_builtin) + "\n")
+        os.replace(temporary, self.path)
+        self._file = open(self.path, "a")
+
+    @property
+    def resumed(self) -> bool:
+        """Whether any work was recovered from an earlier run"""
+        return bool(self.sections or self.repositories)
+
+    def has_section(self, section: str) -> bool:
+        """Check whether a section was finished
+
+        Args:
+            section: Audit section name
+
+        Returns:
+            True if the section's result is in the journal
+        """
+        return section in self.sections
+
+    def record_section(self, section: str, data) -> None:
+        """Record the result of a finished section
+
+        Args:
+            section: Audit section name
+            data: Section result
+        """
+        self.sections[section] = data
+        self._append({"section": section, "data": data})
+
+    def repository_results(self, section: str) -> Dict:
+        """Get the per-repository results recorded for a section
+
+        Args:
+            section: Audit section name
+
+        Returns:
+            Dictionary mapping repository names to their results
+        """
+        return self.repositories.get(section, {})
+
+    def record_repository(self, section: str, repo_name: str, data) -> None:
+        """Record the result of one repository within a section
+
+        Args:
+            section: Audit section name
+            repo_name: Name of the repository
+            data: Result for the repository
+        """
+        self.repositories.setdefault(section, {})[repo_name] = data
+        self._append({"section": section, "repository": repo_name, "data": data})
+
+    def close(self) -> None:
+        """Close the journal, keeping it for a later run"""
+        if not self._file.closed:
+            self._file.close()
+
+    def finish(self) -> None:
+        """Close and remove the journal after the audit completed"""
+        self.close()
+        os.remove(self.path)
+
+    def _load(self) -> list:
+        """Read the entries of an existing journal
+
+        A partially written last line, left by an interrupted run, is
+        ignored.
+
+        Returns:
+            List of journal entries
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        entries = []
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+        return entries
+
+    def _apply(self, entry: Dict) -> None:
+        """Apply a journal entry read from disk
+
+        Args:
+            entry: Journal entry
+        """
+        if "repository" in entry:
+            self.repositories.setdefault(entry["section"], {})[entry["repository"]] = entry["data"]
+        else:
+            self.sections[entry["section"]] = entry["data"]
+
+    def _append(self, entry: Dict) -> None:
+        """Append an entry to the journal file
+
+        Args:
+            entry: Journal entry
+        """
+        self._file.write(json.dumps(entry, default=to_builtin) + "\n")
+        self._file.flush()
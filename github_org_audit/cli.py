@@ -1,16 +1,65 @@
 """Command-line interface for GitHub organization audit tool"""
 
 import click
-import json
 import yaml
 import os
+import signal
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
 from tabulate import tabulate
+from .cache import DEFAULT_MAX_SIZE, HTTPCache
 from .client import GitHubAuditClient
-from .auditor import GitHubOrgAuditor
+from .credentials import AppInstallationCredential, CredentialPool, TokenCredential
+from .async_client import AsyncGitHubAuditClient
+from .graphql_client import GraphQLGitHubAuditClient
+from .lean_client import LeanGitHubAuditClient
+from .auditor import GitHubOrgAuditor, results_from_records
+from .access import PERMISSION_LEVELS, AccessIndex
+from .batch import BatchAuditor
+from .codeowners import OwnersIndex
+from .metrics import AuditMetrics
+from .policy import SEVERITIES, Policy, PolicyError, fails
+from .serializers import (
+    check_available,
+    compression_of,
+    dump_json_line,
+    get_serializer,
+    is_msgpack,
+    load_json,
+    load_msgpack,
+    load_yaml,
+    open_output,
+    read_bytes,
+    write_results,
+)
+from .server import (
+    DEFAULT_ADDRESS,
+    DEFAULT_FULL_INTERVAL,
+    DEFAULT_INTERVAL,
+    AuditServerClient,
+    AuditServerError,
+    AuditService,
+    create_server,
+)
+from .store import SnapshotStore
+from .table import iter_grid, paginate
+
+
+TEAM_HEADERS = ["Name", "Slug", "Privacy", "Permission", "Members", "Repos"]
+REPOSITORY_HEADERS = ["Name", "Private", "Archived", "Default Branch", "Visibility"]
 
 
-@click.group()
+class AuditGroup(click.Group):
+    """Command group reporting audit server failures as command errors"""
+    
+    def invoke(self, ctx):
+        try:
+            return super().invoke(ctx)
+        except AuditServerError as e:
+            raise click.ClickException(str(e))
+
+
+@click.group(cls=AuditGroup)
 @click.version_option(version="0.1.0")
 def cli():
     """GitHub Organization Audit Tool
@@ -25,8 +74,26 @@ def cli():
 @click.option(
     "--token",
     envvar="GITHUB_TOKEN",
-    required=True,
-    help="GitHub personal access token (or set GITHUB_TOKEN env var)",
+    multiple=True,
+    help="GitHub personal access token (or set GITHUB_TOKEN env var); "
+    "repeat to spread requests across several tokens",
+)
+@click.option(
+    "--app-id",
+    envvar="GITHUB_APP_ID",
+    help="GitHub App ID, to authenticate as an app installation",
+)
+@click.option(
+    "--app-private-key",
+    envvar="GITHUB_APP_PRIVATE_KEY_PATH",
+    type=click.Path(exists=True),
+    help="Path to the GitHub App private key (PEM)",
+)
+@click.option(
+    "--app-installation-id",
+    envvar="GITHUB_APP_INSTALLATION_ID",
+    type=int,
+    help="GitHub App installation ID (default: the organization's installation)",
 )
 @click.option(
     "--config",
@@ -35,9 +102,10 @@ def cli():
 )
 @click.option(
     "--output",
-    type=click.Choice(["json", "yaml", "table"]),
+    type=click.Choice(["json", "yaml", "table", "ndjson", "msgpack"]),
     default="table",
-    help="Output format (default: table)",
+    help="Output format (default: table); ndjson streams one record per line "
+    "while the audit runs, msgpack is binary and needs --output-file",
 )
 @click.option(
     "--output-file",
@@ -74,9 +142,69 @@ def cli():
     default=False,
     help="Include archived repositories",
 )
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Number of repositories (rest, lean) or requests (async) in flight "
+    "(default: 1 for rest and lean, 50 for async)",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["rest", "lean", "async", "graphql"]),
+    default="rest",
+    help="API client backend (default: rest)",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory of a persistent HTTP cache; unchanged resources are "
+    "revalidated with conditional requests",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=1),
+    default=512,
+    help="Maximum size of the HTTP cache in MB (default: 512)",
+)
+@click.option(
+    "--since-snapshot",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON or YAML results of a previous audit; permissions and CODEOWNERS "
+    "are only fetched again for repositories changed since then",
+)
+@click.option(
+    "--affiliation",
+    type=click.Choice(["all", "direct", "outside"]),
+    help="Only audit collaborators with this affiliation (default: all)",
+)
+@click.option(
+    "--checkpoint-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for a progress journal; an interrupted audit run again "
+    "with the same options resumes where it stopped",
+)
+@click.option(
+    "--store",
+    type=click.Path(dir_okay=False),
+    help="SQLite snapshot store to save the results to, for the diff command",
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="File to write request and section metrics to; JSON if it ends in "
+    ".json, otherwise the OpenMetrics text format",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Print the time spent per section and API endpoint at the end",
+)
 def audit(
     organization,
     token,
+    app_id,
+    app_private_key,
+    app_installation_id,
     config,
     output,
     output_file,
@@ -86,6 +214,16 @@ def audit(
     permissions,
     codeowners,
     include_archived,
+    concurrency,
+    backend,
+    cache_dir,
+    cache_size,
+    since_snapshot,
+    affiliation,
+    checkpoint_dir,
+    store,
+    metrics_file,
+    profile,
 ):
     """Audit a GitHub organization
     
@@ -107,29 +245,103 @@ def audit(
         "include_archived": include_archived,
     })
     
+    if checkpoint_dir and output == "ndjson":
+        raise click.UsageError("--checkpoint-dir cannot be combined with --output ndjson")
+    if output == "msgpack" and not output_file:
+        raise click.UsageError("--output msgpack requires --output-file")
+    check_output(output, output_file)
+    
+    snapshot = None
+    if since_snapshot:
+        snapshot = load_snapshot(since_snapshot, organization)
+    
     # Create client and auditor
-    client = GitHubAuditClient(token)
-    auditor = GitHubOrgAuditor(client, audit_config)
-    
-    # Perform audit
-    click.echo(f"Auditing organization: {organization}")
-    results = auditor.audit(organization)
-    
-    # Format output
-    if output == "json":
-        output_text = json.dumps(results, indent=2, default=str)
-    elif output == "yaml":
-        output_text = yaml.dump(results, default_flow_style=False)
-    else:  # table
-        output_text = format_table_output(results)
-    
-    # Write output
+    credentials = build_credentials(
+        organization, token, app_id, app_private_key, app_installation_id
+    )
+    cache = open_cache(cache_dir, max_size=cache_size * 1024 * 1024)
+    metrics = AuditMetrics() if metrics_file or profile else None
+    client = create_client(
+        credentials,
+        backend=backend,
+        concurrency=concurrency,
+        cache=cache,
+        affiliation=affiliation,
+        metrics=metrics,
+    )
+    auditor = GitHubOrgAuditor(
+        client, audit_config, snapshot=snapshot, checkpoint_dir=checkpoint_dir
+    )
+    snapshot_store = SnapshotStore(store) if store else None
+    
+    # Perform audit; streamed records may go to stdout, so status
+    # messages go to stderr in that case
+    streaming = output == "ndjson"
+    click.echo(f"Auditing organization: {organization}", err=streaming)
+    if streaming:
+        records = auditor.iter_audit(organization)
+        if snapshot_store is not None:
+            records = snapshot_store.record(records)
+        write_records(records, output_file)
+    else:
+        results = auditor.audit(organization)
+        if snapshot_store is not None:
+            snapshot_store.save(results)
+    
+    if snapshot_store is not None:
+        snapshot_id = snapshot_store.snapshots(organization)[-1]["id"]
+        click.echo(f"Snapshot {snapshot_id} saved to: {store}", err=streaming)
+        snapshot_store.close()
+    if isinstance(client, GraphQLGitHubAuditClient):
+        click.echo(
+            f"GraphQL queries: {client.query_count}, "
+            f"cost: {client.query_cost} points, "
+            f"remaining: {client.rate_limit_remaining}",
+            err=streaming,
+        )
+    if auditor.resumed:
+        click.echo(f"Resumed from checkpoint in {checkpoint_dir}", err=streaming)
+    if auditor.incremental is not None:
+        click.echo(
+            f"Incremental audit: {auditor.incremental['changed']} repositories changed, "
+            f"{auditor.incremental['unchanged']} reused from {since_snapshot}",
+            err=streaming,
+        )
+    click.echo(format_budget(client.scheduler.summary()), err=streaming)
+    if cache is not None:
+        cache_summary = cache.summary()
+        click.echo(
+            f"HTTP cache: {cache_summary['hits']} revalidated (304), "
+            f"{cache_summary['stores']} stored",
+            err=streaming,
+        )
+    if metrics_file:
+        metrics.write(metrics_file)
+        click.echo(f"Metrics written to: {metrics_file}", err=streaming)
+    if profile:
+        click.echo(format_profile(metrics.summary()), err=streaming)
+    
+    if streaming:
+        if output_file:
+            click.echo(f"Audit results written to: {output_file}", err=True)
+        return
+    
+    # Write output, compressed if the file name ends in .gz or .zst;
+    # tables are written line by line as they are formatted
     if output_file:
-        with open(output_file, 'w') as f:
-            f.write(output_text)
+        if output == "table":
+            with open_output(output_file) as f:
+                for index, line in enumerate(iter_table_output(results)):
+                    f.write((line if index == 0 else "\n" + line).encode("utf-8"))
+        else:
+            write_results(results, output_file, output)
         click.echo(f"Audit results written to: {output_file}")
+    elif output == "table":
+        click.echo("")
+        for line in iter_table_output(results):
+            click.echo(line)
     else:
-        click.echo("\n" + output_text)
+        click.echo("\n" + format_results(results, output))
 
 
 @cli.command()
@@ -137,12 +349,17 @@ def audit(
 @click.option(
     "--token",
     envvar="GITHUB_TOKEN",
-    required=True,
     help="GitHub personal access token (or set GITHUB_TOKEN env var)",
 )
-def settings(organization, token):
+@click.option(
+    "--server",
+    envvar="GITHUB_AUDIT_SERVER",
+    help="Query a running serve daemon at HOST:PORT or unix:PATH instead of "
+    "GitHub (or set GITHUB_AUDIT_SERVER env var)",
+)
+def settings(organization, token, server):
     """Show organization settings"""
-    client = GitHubAuditClient(token)
+    client = query_client(token, server)
     settings = client.get_org_settings(organization)
     
     # Format as table
@@ -155,28 +372,60 @@ def settings(organization, token):
 @click.option(
     "--token",
     envvar="GITHUB_TOKEN",
-    required=True,
     help="GitHub personal access token (or set GITHUB_TOKEN env var)",
 )
-def teams(organization, token):
+@click.option(
+    "--server",
+    envvar="GITHUB_AUDIT_SERVER",
+    help="Query a running serve daemon at HOST:PORT or unix:PATH instead of "
+    "GitHub (or set GITHUB_AUDIT_SERVER env var)",
+)
+@click.option(
+    "--members",
+    is_flag=True,
+    help="Also show the members of every team and its parent team",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of teams fetched in parallel with --members (default: 1)",
+)
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    help="Show at most this many teams",
+)
+@click.option(
+    "--page",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Page of --limit teams to show (default: 1)",
+)
+def teams(organization, token, server, members, concurrency, limit, page):
     """Show organization teams"""
-    client = GitHubAuditClient(token)
-    teams = client.get_teams(organization)
+    check_page(limit, page)
+    client = query_client(token, server, concurrency=concurrency)
+    teams = list(paginate(client.get_teams(organization, include_members=members), limit, page))
     
     # Format as table
-    headers = ["Name", "Slug", "Privacy", "Permission", "Members", "Repos"]
-    table_data = [
-        [
-            t["name"],
-            t["slug"],
-            t["privacy"],
-            t["permission"],
-            t["members_count"],
-            t["repos_count"],
-        ]
-        for t in teams
-    ]
-    click.echo(tabulate(table_data, headers=headers, tablefmt="grid"))
+    echo_table(team_rows(teams), TEAM_HEADERS, limit, page, "teams")
+    
+    if members:
+        for t in teams:
+            click.echo(f"\n{t['name']}" + (f" (child of {t['parent']})" if t["parent"] else ""))
+            if "members" not in t:
+                click.echo("Members could not be listed")
+                continue
+            member_data = [[m["login"], m["name"], m["role"]] for m in t["members"]]
+            click.echo(tabulate(member_data, headers=["Login", "Name", "Role"], tablefmt="grid"))
+        
+        # A serve daemon keeps its errors with the audit results
+        errors = getattr(client, "errors", [])
+        if errors:
+            click.echo("\nErrors")
+            error_data = [[e["team"], e["error"]] for e in errors]
+            click.echo(tabulate(error_data, headers=["Team", "Error"], tablefmt="grid"))
 
 
 @cli.command()
@@ -184,36 +433,47 @@ def teams(organization, token):
 @click.option(
     "--token",
     envvar="GITHUB_TOKEN",
-    required=True,
     help="GitHub personal access token (or set GITHUB_TOKEN env var)",
 )
+@click.option(
+    "--server",
+    envvar="GITHUB_AUDIT_SERVER",
+    help="Query a running serve daemon at HOST:PORT or unix:PATH instead of "
+    "GitHub (or set GITHUB_AUDIT_SERVER env var)",
+)
 @click.option(
     "--include-archived/--no-archived",
     default=False,
     help="Include archived repositories",
 )
-def repositories(organization, token, include_archived):
-    """Show organization repositories"""
-    client = GitHubAuditClient(token)
-    repos = client.get_repositories(organization)
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    help="Show at most this many repositories",
+)
+@click.option(
+    "--page",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Page of --limit repositories to show (default: 1)",
+)
+def repositories(organization, token, server, include_archived, limit, page):
+    """Show organization repositories
+    
+    Rows are printed while the repository listing is paginated, and only
+    the pages needed for --limit and --page are fetched.
+    """
+    check_page(limit, page)
+    client = query_client(token, server)
+    repos = client.iter_repositories(organization)
     
     # Filter archived if needed
     if not include_archived:
-        repos = [r for r in repos if not r.get("archived", False)]
+        repos = (r for r in repos if not r.archived)
     
     # Format as table
-    headers = ["Name", "Private", "Archived", "Default Branch", "Visibility"]
-    table_data = [
-        [
-            r["name"],
-            r["private"],
-            r["archived"],
-            r["default_branch"],
-            r["visibility"],
-        ]
-        for r in repos
-    ]
-    click.echo(tabulate(table_data, headers=headers, tablefmt="grid"))
+    rows = repository_rows(paginate(repos, limit, page))
+    echo_table(rows, REPOSITORY_HEADERS, limit, page, "repositories")
 
 
 @cli.command()
@@ -222,16 +482,30 @@ def repositories(organization, token, include_archived):
 @click.option(
     "--token",
     envvar="GITHUB_TOKEN",
-    required=True,
     help="GitHub personal access token (or set GITHUB_TOKEN env var)",
 )
-def permissions(organization, repository, token):
+@click.option(
+    "--server",
+    envvar="GITHUB_AUDIT_SERVER",
+    help="Query a running serve daemon at HOST:PORT or unix:PATH instead of "
+    "GitHub (or set GITHUB_AUDIT_SERVER env var)",
+)
+@click.option(
+    "--affiliation",
+    type=click.Choice(["all", "direct", "outside"]),
+    help="Only list collaborators with this affiliation (default: all)",
+)
+def permissions(organization, repository, token, server, affiliation):
     """Show repository permissions
     
     ORGANIZATION: Name of the GitHub organization
     REPOSITORY: Name of the repository
     """
-    client = GitHubAuditClient(token)
+    if server and affiliation:
+        raise click.UsageError(
+            "--affiliation cannot be combined with --server; start serve with --affiliation"
+        )
+    client = query_client(token, server, affiliation=affiliation)
     perms = client.get_repository_permissions(organization, repository)
     
     click.echo(f"\nRepository: {perms['repository']}")
@@ -239,8 +513,11 @@ def permissions(organization, repository, token):
     # Collaborators
     if perms["collaborators"]:
         click.echo("\nCollaborators:")
-        headers = ["Login", "Permission"]
-        table_data = [[c["login"], c["permissions"]] for c in perms["collaborators"]]
+        headers = ["Login", "Permission", "Role"]
+        table_data = [
+            [c["login"], c["permissions"], c.get("role_name")]
+            for c in perms["collaborators"]
+        ]
         click.echo(tabulate(table_data, headers=headers, tablefmt="grid"))
     
     # Teams
@@ -257,16 +534,34 @@ def permissions(organization, repository, token):
 @click.option(
     "--token",
     envvar="GITHUB_TOKEN",
-    required=True,
     help="GitHub personal access token (or set GITHUB_TOKEN env var)",
 )
-def codeowners(organization, repository, token):
+@click.option(
+    "--server",
+    envvar="GITHUB_AUDIT_SERVER",
+    help="Query a running serve daemon at HOST:PORT or unix:PATH instead of "
+    "GitHub (or set GITHUB_AUDIT_SERVER env var)",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of repositories to check in parallel (default: 1)",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory of a persistent cache; repositories whose tree has not "
+    "changed since the last run are answered from it",
+)
+def codeowners(organization, repository, token, server, concurrency, cache_dir):
     """Show CODEOWNERS files
     
     ORGANIZATION: Name of the GitHub organization
     REPOSITORY: (Optional) Name of specific repository, or all if not provided
     """
-    client = GitHubAuditClient(token)
+    cache = open_cache(cache_dir) if not server else None
+    client = query_client(token, server, concurrency=concurrency, cache=cache)
     
     if repository:
         # Show single repository
@@ -290,89 +585,1430 @@ def codeowners(organization, repository, token):
             click.echo("No CODEOWNERS files found in organization")
 
 
-def format_table_output(results: dict) -> str:
-    """Format audit results as human-readable tables
+@cli.command()
+@click.argument("organization")
+@click.argument("paths", nargs=-1)
+@click.option(
+    "--token",
+    envvar="GITHUB_TOKEN",
+    help="GitHub personal access token (or set GITHUB_TOKEN env var)",
+)
+@click.option(
+    "--server",
+    envvar="GITHUB_AUDIT_SERVER",
+    help="Query a running serve daemon at HOST:PORT or unix:PATH instead of "
+    "GitHub (or set GITHUB_AUDIT_SERVER env var)",
+)
+@click.option(
+    "--results",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON, NDJSON or YAML results of an audit to index instead of "
+    "fetching the CODEOWNERS files",
+)
+@click.option(
+    "--repository",
+    multiple=True,
+    help="Only look up PATHS in this repository (repeatable)",
+)
+@click.option(
+    "--owner",
+    help="List the rules naming this owner, such as @org/team",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Report syntax errors and unknown owners",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of repositories fetched in parallel (default: 1)",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory of a persistent cache for the CODEOWNERS lookup",
+)
+@click.option(
+    "--output",
+    type=click.Choice(["json", "yaml", "table"]),
+    default="table",
+    help="Output format (default: table)",
+)
+def owners(
+    organization,
+    paths,
+    token,
+    server,
+    results,
+    repository,
+    owner,
+    check,
+    concurrency,
+    cache_dir,
+    output,
+):
+    """Show who owns paths according to CODEOWNERS
     
-    Args:
-        results: Audit results dictionary
-        
-    Returns:
-        Formatted string with tables
+    ORGANIZATION: Name of the GitHub organization
+    PATHS: Paths to find the owners of in every repository
+    
+    Without PATHS, --owner or --check, lists every owner with the number of
+    repositories and rules naming it.
     """
-    output = []
+    if results:
+        index = OwnersIndex.from_results(load_snapshot(results, organization, "--results"))
+    else:
+        cache = open_cache(cache_dir) if not server else None
+        client = query_client(token, server, concurrency=concurrency, cache=cache)
+        known_teams = {f"@{organization}/{t['slug']}" for t in client.get_teams(organization)}
+        index = OwnersIndex(client.get_all_codeowners(organization), known_teams=known_teams)
     
-    # Organization settings
-    if "settings" in results:
-        output.append("Organization Settings")
-        output.append("=" * 80)
-        settings_data = [[k, v] for k, v in results["settings"].items()]
-        output.append(tabulate(settings_data, headers=["Setting", "Value"], tablefmt="grid"))
-        output.append("")
+    report = {}
+    if paths:
+        report["paths"] = index.resolve(paths, repository or None)
+    if owner:
+        report["owned_by"] = index.owned_by(owner)
+    if check:
+        report["errors"] = index.errors
+    if not report:
+        report["owners"] = index.summary()
     
-    # Teams
-    if "teams" in results:
-        output.append("Teams")
-        output.append("=" * 80)
-        if results["teams"]:
-            headers = ["Name", "Slug", "Privacy", "Permission", "Members", "Repos"]
-            teams_data = [
-                [
-                    t["name"],
-                    t["slug"],
-                    t["privacy"],
-                    t["permission"],
-                    t["members_count"],
-                    t["repos_count"],
-                ]
-                for t in results["teams"]
-            ]
-            output.append(tabulate(teams_data, headers=headers, tablefmt="grid"))
-        else:
-            output.append("No teams found")
-        output.append("")
+    if output != "table":
+        click.echo(format_results(report, output))
+    else:
+        click.echo(format_owners_output(report))
     
-    # Repositories
-    if "repositories" in results:
-        output.append("Repositories")
-        output.append("=" * 80)
-        if results["repositories"]:
-            headers = ["Name", "Private", "Archived", "Default Branch", "Visibility"]
-            repos_data = [
-                [
-                    r["name"],
-                    r["private"],
-                    r["archived"],
-                    r["default_branch"],
-                    r["visibility"],
-                ]
-                for r in results["repositories"]
-            ]
-            output.append(tabulate(repos_data, headers=headers, tablefmt="grid"))
-            output.append(f"\nTotal repositories: {len(results['repositories'])}")
-        else:
-            output.append("No repositories found")
-        output.append("")
+    if check and index.errors:
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.argument("organization")
+@click.option(
+    "--results",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="JSON, NDJSON or YAML results of an audit of the organization",
+)
+@click.option(
+    "--user",
+    multiple=True,
+    help="Show the repositories this user can access (repeatable)",
+)
+@click.option(
+    "--repo",
+    multiple=True,
+    help="Show the users who can access this repository (repeatable)",
+)
+@click.option(
+    "--min-permission",
+    type=click.Choice(PERMISSION_LEVELS),
+    help="Only show access of at least this level",
+)
+@click.option(
+    "--output",
+    type=click.Choice(["json", "yaml", "table"]),
+    default="table",
+    help="Output format (default: table)",
+)
+def access(organization, results, user, repo, min_permission, output):
+    """Show effective repository access
     
-    # Permissions summary
-    if "permissions" in results:
-        output.append("Permissions Summary")
-        output.append("=" * 80)
-        output.append(f"Total repositories with permissions: {len(results['permissions'])}")
-        output.append("")
+    ORGANIZATION: Name of the GitHub organization
     
-    # CODEOWNERS summary
-    if "codeowners" in results:
-        output.append("CODEOWNERS Summary")
-        output.append("=" * 80)
-        if results["codeowners"]:
-            output.append(f"Repositories with CODEOWNERS: {len(results['codeowners'])}")
-            for repo_name in results["codeowners"].keys():
-                output.append(f"  - {repo_name}")
-        else:
-            output.append("No CODEOWNERS files found")
-        output.append("")
+    Combines collaborator grants, team grants and the organization's default
+    repository permission into the highest permission of every user on every
+    repository. Without --user or --repo, counts the repositories of every
+    user per permission level.
+    """
+    index = AccessIndex.from_results(load_snapshot(results, organization, "--results"))
     
-    return "\n".join(output)
+    report = {}
+    for login in user:
+        report.setdefault("users", {})[login] = index.user_access(login, min_permission)
+    for name in repo:
+        report.setdefault("repositories", {})[name] = index.repo_access(name, min_permission)
+    if not report:
+        report["summary"] = index.summary()
+    
+    if output != "table":
+        click.echo(format_results(report, output))
+    else:
+        click.echo(format_access_output(report))
+
+
+@cli.command()
+@click.argument("organization")
+@click.option(
+    "--policy",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="YAML policy file (see policy.example.yaml)",
+)
+@click.option(
+    "--results",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON, NDJSON or YAML results of an audit to check instead of "
+    "auditing the organization",
+)
+@click.option(
+    "--token",
+    envvar="GITHUB_TOKEN",
+    help="GitHub personal access token (or set GITHUB_TOKEN env var)",
+)
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    help="Path to configuration file (YAML) for the audit",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of repositories audited in parallel (default: 1)",
+)
+@click.option(
+    "--fail-on",
+    type=click.Choice(SEVERITIES + ["never"]),
+    default="high",
+    help="Exit with status 1 if a finding has at least this severity (default: high)",
+)
+@click.option(
+    "--output",
+    type=click.Choice(["json", "yaml", "table"]),
+    default="table",
+    help="Output format (default: table)",
+)
+@click.option(
+    "--output-file",
+    type=click.Path(),
+    help="Write output to file instead of stdout",
+)
+def check(organization, policy, results, token, config, concurrency, fail_on, output, output_file):
+    """Check an organization against a policy
+    
+    ORGANIZATION: Name of the GitHub organization
+    
+    Evaluates every rule of the policy over the audit results and reports
+    the findings, most severe first, followed by the rules skipped because
+    a section they need was not audited. Exits with status 1 if a finding
+    is at least as severe as --fail-on, and 2 if the policy is invalid.
+    """
+    try:
+        compiled = Policy.from_file(policy)
+    except PolicyError as e:
+        raise click.BadParameter(str(e), param_hint="--policy")
+    
+    if not results and not token:
+        raise click.UsageError("Provide --token (or GITHUB_TOKEN) or --results")
+    
+    if results:
+        audit_results = load_snapshot(results, organization, "--results")
+    else:
+        audit_config = {}
+        if config:
+            with open(config, 'r') as f:
+                audit_config = yaml.safe_load(f) or {}
+        client = GitHubAuditClient(token, concurrency=concurrency)
+        click.echo(f"Auditing organization: {organization}", err=True)
+        audit_results = GitHubOrgAuditor(client, audit_config).audit(organization)
+    
+    try:
+        findings = compiled.evaluate(audit_results)
+    except PolicyError as e:
+        raise click.BadParameter(str(e), param_hint="--policy")
+    
+    if output == "table":
+        output_text = format_findings_output(findings, compiled.skipped)
+    else:
+        report = {"findings": findings}
+        if compiled.skipped:
+            report["skipped"] = compiled.skipped
+        output_text = format_results(report, output)
+    
+    if output_file:
+        with open(output_file, 'w') as f:
+            f.write(output_text)
+        click.echo(f"Findings written to: {output_file}")
+    else:
+        click.echo(output_text)
+    
+    if fails(findings, fail_on):
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.argument("organizations", nargs=-1)
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    help="YAML manifest listing the organizations and their configuration",
+)
+@click.option(
+    "--token",
+    envvar="GITHUB_TOKEN",
+    multiple=True,
+    help="GitHub personal access token (or set GITHUB_TOKEN env var); "
+    "repeat to spread requests across several tokens",
+)
+@click.option(
+    "--app-id",
+    envvar="GITHUB_APP_ID",
+    help="GitHub App ID, to authenticate as an app installation",
+)
+@click.option(
+    "--app-private-key",
+    envvar="GITHUB_APP_PRIVATE_KEY_PATH",
+    type=click.Path(exists=True),
+    help="Path to the GitHub App private key (PEM)",
+)
+@click.option(
+    "--app-installation-id",
+    envvar="GITHUB_APP_INSTALLATION_ID",
+    type=int,
+    help="GitHub App installation ID (required with --app-id for several organizations)",
+)
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    help="Path to configuration file (YAML) applied to every organization",
+)
+@click.option(
+    "--output",
+    type=click.Choice(["json", "yaml", "msgpack"]),
+    default="json",
+    help="Format of the result files (default: json)",
+)
+@click.option(
+    "--compress",
+    type=click.Choice(["gzip", "zstd"]),
+    help="Compress the result files, adding .gz or .zst to their names",
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="Directory for one result file per organization and the summary",
+)
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=4,
+    help="Number of organizations audited at once (default: 4)",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Number of repositories (rest, lean) or requests (async) in flight, "
+    "shared by all organizations (default: 1 for rest and lean, 50 for async)",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["rest", "lean", "async", "graphql"]),
+    default="rest",
+    help="API client backend (default: rest)",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory of a persistent HTTP cache shared by all organizations",
+)
+@click.option(
+    "--affiliation",
+    type=click.Choice(["all", "direct", "outside"]),
+    help="Only audit collaborators with this affiliation (default: all)",
+)
+@click.option(
+    "--store",
+    type=click.Path(dir_okay=False),
+    help="SQLite snapshot store to save every organization's results to",
+)
+def batch(
+    organizations,
+    manifest,
+    token,
+    app_id,
+    app_private_key,
+    app_installation_id,
+    config,
+    output,
+    compress,
+    output_dir,
+    parallel,
+    concurrency,
+    backend,
+    cache_dir,
+    affiliation,
+    store,
+):
+    """Audit several GitHub organizations concurrently
+    
+    ORGANIZATIONS: Names of the organizations to audit, in addition to
+    those listed in --manifest
+    
+    All audits share one connection pool, credential pool and rate limit
+    budget. Results are written to OUTPUT_DIR/<organization>.<format>,
+    together with a summary of the whole batch.
+    """
+    suffix = {"gzip": ".gz", "zstd": ".zst", None: ""}[compress]
+    check_output(output, f"summary.{output}{suffix}")
+    
+    base_config = {}
+    if config:
+        with open(config, 'r') as f:
+            base_config = yaml.safe_load(f) or {}
+    
+    targets = load_manifest(manifest, base_config) if manifest else {}
+    for name in organizations:
+        targets.setdefault(name, dict(base_config))
+    if not targets:
+        raise click.UsageError("Provide ORGANIZATIONS or --manifest")
+    
+    # An installation belongs to a single organization, so it cannot be
+    # looked up per organization from one shared credential pool
+    if app_id and not app_installation_id and len(targets) > 1:
+        raise click.UsageError(
+            "--app-installation-id is required with --app-id for several organizations"
+        )
+    
+    credentials = build_credentials(
+        next(iter(targets)), token, app_id, app_private_key, app_installation_id
+    )
+    cache = open_cache(cache_dir)
+    client = create_client(
+        credentials,
+        backend=backend,
+        concurrency=concurrency,
+        cache=cache,
+        affiliation=affiliation,
+    )
+    
+    snapshot_store = SnapshotStore(store) if store else None
+    os.makedirs(output_dir, exist_ok=True)
+    
+    def write_result(name, results):
+        path = os.path.join(output_dir, f"{name}.{output}{suffix}")
+        write_results(results, path, output)
+        click.echo(f"Audit results for {name} written to: {path}")
+        if snapshot_store is not None:
+            snapshot_id = snapshot_store.save(results)
+            click.echo(f"Snapshot {snapshot_id} of {name} saved to: {store}")
+    
+    click.echo(f"Auditing {len(targets)} organizations")
+    summary = BatchAuditor(
+        client, targets, parallel=parallel, on_complete=write_result
+    ).run()
+    
+    budget = client.scheduler.summary()
+    summary_path = os.path.join(output_dir, f"summary.{output}{suffix}")
+    write_results({"organizations": summary, "api": budget}, summary_path, output)
+    
+    headers = ["Organization", "Status", "Seconds", "Repos", "Errors", "Detail"]
+    rows = [
+        [
+            s["organization"],
+            s["status"],
+            s["seconds"],
+            s.get("repositories", ""),
+            s.get("errors", ""),
+            s.get("error", ""),
+        ]
+        for s in summary
+    ]
+    click.echo("\n" + tabulate(rows, headers=headers, tablefmt="grid"))
+    click.echo(format_budget(budget))
+    if snapshot_store is not None:
+        snapshot_store.close()
+    click.echo(f"Batch summary written to: {summary_path}")
+    
+    if any(s["status"] != "ok" for s in summary):
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.argument("organizations", nargs=-1)
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    help="YAML manifest listing the organizations and their configuration",
+)
+@click.option(
+    "--token",
+    envvar="GITHUB_TOKEN",
+    multiple=True,
+    help="GitHub personal access token (or set GITHUB_TOKEN env var); "
+    "repeat to spread requests across several tokens",
+)
+@click.option(
+    "--app-id",
+    envvar="GITHUB_APP_ID",
+    help="GitHub App ID, to authenticate as an app installation",
+)
+@click.option(
+    "--app-private-key",
+    envvar="GITHUB_APP_PRIVATE_KEY_PATH",
+    type=click.Path(exists=True),
+    help="Path to the GitHub App private key (PEM)",
+)
+@click.option(
+    "--app-installation-id",
+    envvar="GITHUB_APP_INSTALLATION_ID",
+    type=int,
+    help="GitHub App installation ID (required with --app-id for several organizations)",
+)
+@click.option(
+    "--config",
+    type=click.Path(exists=True),
+    help="Path to configuration file (YAML) applied to every organization",
+)
+@click.option(
+    "--listen",
+    default=DEFAULT_ADDRESS,
+    show_default=True,
+    help="HOST:PORT to serve the query API on, or unix:PATH for a Unix socket",
+)
+@click.option(
+    "--interval",
+    type=click.IntRange(min=10),
+    default=DEFAULT_INTERVAL,
+    show_default=True,
+    help="Seconds between two audits of an organization",
+)
+@click.option(
+    "--full-interval",
+    type=click.IntRange(min=0),
+    default=DEFAULT_FULL_INTERVAL,
+    show_default=True,
+    help="Seconds between two full audits of an organization, which also see "
+    "changed collaborator and team grants; 0 audits in full every time",
+)
+@click.option(
+    "--team-members",
+    is_flag=True,
+    help="Also audit team members, for teams --members",
+)
+@click.option(
+    "--snapshot-dir",
+    type=click.Path(file_okay=False),
+    help="Directory to keep the latest results in; on start they are served "
+    "at once and the first audit is incremental",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Number of repositories (rest, lean) or requests (async) in flight "
+    "(default: 1 for rest and lean, 50 for async)",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["rest", "lean", "async", "graphql"]),
+    default="rest",
+    help="API client backend (default: rest)",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory of a persistent HTTP cache; unchanged resources are "
+    "revalidated with conditional requests",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=1),
+    default=512,
+    help="Maximum size of the HTTP cache in MB (default: 512)",
+)
+@click.option(
+    "--affiliation",
+    type=click.Choice(["all", "direct", "outside"]),
+    help="Only audit collaborators with this affiliation (default: all)",
+)
+@click.option(
+    "--access-log",
+    is_flag=True,
+    help="Log every query to stderr",
+)
+def serve(
+    organizations,
+    manifest,
+    token,
+    app_id,
+    app_private_key,
+    app_installation_id,
+    config,
+    listen,
+    interval,
+    full_interval,
+    team_members,
+    snapshot_dir,
+    concurrency,
+    backend,
+    cache_dir,
+    cache_size,
+    affiliation,
+    access_log,
+):
+    """Keep audits of organizations in memory and answer queries about them
+    
+    ORGANIZATIONS: Names of the organizations to audit, in addition to
+    those listed in --manifest
+    
+    Every organization is audited once per --interval in the background,
+    reusing the permissions and CODEOWNERS of unchanged repositories from
+    the previous audit, and in full once per --full-interval. The settings,
+    teams, repositories, permissions, codeowners and owners commands query
+    the server instead of GitHub when given --server (or
+    GITHUB_AUDIT_SERVER).
+    """
+    base_config = {}
+    if config:
+        with open(config, 'r') as f:
+            base_config = yaml.safe_load(f) or {}
+    
+    targets = load_manifest(manifest, base_config) if manifest else {}
+    for name in organizations:
+        targets.setdefault(name, dict(base_config))
+    if not targets:
+        raise click.UsageError("Provide ORGANIZATIONS or --manifest")
+    
+    # Archived repositories are kept, so queries can include them
+    for target in targets.values():
+        target["include_archived"] = True
+        if team_members:
+            target["include_team_members"] = True
+    
+    if app_id and not app_installation_id and len(targets) > 1:
+        raise click.UsageError(
+            "--app-installation-id is required with --app-id for several organizations"
+        )
+    
+    credentials = build_credentials(
+        next(iter(targets)), token, app_id, app_private_key, app_installation_id
+    )
+    cache = open_cache(cache_dir, max_size=cache_size * 1024 * 1024)
+    metrics = AuditMetrics()
+    client = create_client(
+        credentials,
+        backend=backend,
+        concurrency=concurrency,
+        cache=cache,
+        affiliation=affiliation,
+        metrics=metrics,
+    )
+    service = AuditService(
+        client,
+        targets,
+        interval=interval,
+        full_interval=full_interval,
+        snapshot_dir=snapshot_dir,
+        metrics=metrics,
+        log=lambda message: click.echo(message, err=True),
+    )
+    service.load_snapshots()
+    try:
+        server = create_server(service, listen, access_log=access_log)
+    except (OSError, ValueError) as e:
+        raise click.BadParameter(f"Cannot listen on {listen}: {e}", param_hint="--listen")
+    
+    # Stop cleanly on SIGTERM, as sent by service managers, like on Ctrl-C
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+    
+    signal.signal(signal.SIGTERM, terminate)
+    service.start()
+    click.echo(f"Serving {len(targets)} organizations on {listen}", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+@cli.command()
+@click.argument("store", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--organization",
+    help="Only list snapshots of this organization",
+)
+def snapshots(store, organization):
+    """List the snapshots in a snapshot store
+    
+    STORE: Path of the SQLite snapshot store
+    """
+    snapshot_store = SnapshotStore(store)
+    rows = [
+        [s["id"], s["organization"], s["created_at"], ", ".join(s["sections"])]
+        for s in snapshot_store.snapshots(organization)
+    ]
+    snapshot_store.close()
+    
+    if rows:
+        headers = ["ID", "Organization", "Saved", "Sections"]
+        click.echo(tabulate(rows, headers=headers, tablefmt="grid"))
+    else:
+        click.echo("No snapshots found")
+
+
+@cli.command()
+@click.argument("store", type=click.Path(exists=True, dir_okay=False))
+@click.argument("old", type=int, required=False)
+@click.argument("new", type=int, required=False)
+@click.option(
+    "--organization",
+    help="Organization whose two latest snapshots are compared when OLD and "
+    "NEW are not given",
+)
+@click.option(
+    "--output",
+    type=click.Choice(["json", "yaml", "table"]),
+    default="table",
+    help="Output format (default: table)",
+)
+@click.option(
+    "--output-file",
+    type=click.Path(),
+    help="Write output to file instead of stdout",
+)
+def diff(store, old, new, organization, output, output_file):
+    """Compare two audit snapshots
+    
+    STORE: Path of the SQLite snapshot store
+    OLD: ID of the earlier snapshot
+    NEW: ID of the later snapshot (default: latest snapshot of the
+    same organization)
+    """
+    snapshot_store = SnapshotStore(store)
+    try:
+        if old is None:
+            if not organization:
+                raise click.UsageError("Provide OLD and NEW snapshot IDs or --organization")
+            available = snapshot_store.snapshots(organization)
+            if len(available) < 2:
+                raise click.UsageError(f"{store} has fewer than two snapshots of {organization}")
+            old, new = available[-2]["id"], available[-1]["id"]
+        elif new is None:
+            available = snapshot_store.snapshots(snapshot_store.snapshot(old)["organization"])
+            new = available[-1]["id"]
+        changes = snapshot_store.diff(old, new)
+    except KeyError as e:
+        raise click.BadParameter(e.args[0], param_hint="OLD/NEW")
+    finally:
+        snapshot_store.close()
+    
+    if output == "table":
+        output_text = format_diff_output(changes)
+    else:
+        output_text = format_results(changes, output)
+    
+    if output_file:
+        with open(output_file, 'w') as f:
+            f.write(output_text)
+        click.echo(f"Snapshot diff written to: {output_file}")
+    else:
+        click.echo(output_text)
+
+
+def load_manifest(path: str, base_config: dict) -> dict:
+    """Load a batch manifest
+    
+    The manifest is a YAML document with an optional "config" mapping,
+    applied to every organization, and an "organizations" list whose
+    entries are organization names or mappings with a "name" and an
+    optional "config" overriding the shared one.
+    
+    Args:
+        path: Path of the manifest
+        base_config: Configuration the manifest's own settings override
+    
+    Returns:
+        Dictionary mapping organization names to their configuration
+    
+    Raises:
+        click.BadParameter: If the manifest is malformed
+    """
+    with open(path, 'r') as f:
+        manifest = yaml.safe_load(f) or {}
+    
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("organizations"), list):
+        raise click.BadParameter(
+            f"{path} has no 'organizations' list", param_hint="--manifest"
+        )
+    
+    shared = {**base_config, **(manifest.get("config") or {})}
+    targets = {}
+    for entry in manifest["organizations"]:
+        if isinstance(entry, str):
+            targets[entry] = dict(shared)
+        elif isinstance(entry, dict) and entry.get("name"):
+            targets[entry["name"]] = {**shared, **(entry.get("config") or {})}
+        else:
+            raise click.BadParameter(
+                f"{path} has an organization entry without a name: {entry!r}",
+                param_hint="--manifest",
+            )
+    return targets
+
+
+def format_results(results: dict, output: str) -> str:
+    """Serialize audit results as JSON or YAML
+    
+    Args:
+        results: Results dictionary
+        output: Format name ("json" or "yaml")
+    
+    Returns:
+        Serialized results
+    """
+    return get_serializer(output).dump(results).decode("utf-8")
+
+
+def check_output(output: str, output_file=None) -> None:
+    """Check that an output format and file can be written before auditing
+    
+    Args:
+        output: Output format name
+        output_file: Optional output file path
+        
+    Raises:
+        click.UsageError: If an optional dependency needed for them is missing
+    """
+    try:
+        check_available(output, output_file)
+    except ImportError as e:
+        raise click.UsageError(str(e))
+
+
+def build_credentials(
+    organization: str,
+    tokens,
+    app_id=None,
+    app_private_key=None,
+    app_installation_id=None,
+) -> CredentialPool:
+    """Build a credential pool from command-line options
+    
+    Args:
+        organization: Name of the organization being audited
+        tokens: GitHub personal access tokens
+        app_id: Optional GitHub App ID
+        app_private_key: Path to the GitHub App private key
+        app_installation_id: Optional GitHub App installation ID
+        
+    Returns:
+        CredentialPool with every token and the app installation, if any
+        
+    Raises:
+        click.UsageError: If no credentials are configured
+    """
+    credentials = [TokenCredential(t) for t in tokens]
+    
+    if app_id:
+        if not app_private_key:
+            raise click.UsageError("--app-private-key is required with --app-id")
+        with open(app_private_key, 'r') as f:
+            private_key = f.read()
+        credentials.append(AppInstallationCredential(
+            app_id,
+            private_key,
+            installation_id=app_installation_id,
+            organization=organization,
+        ))
+    
+    if not credentials:
+        raise click.UsageError("Provide --token (or GITHUB_TOKEN) or --app-id")
+    
+    return CredentialPool(credentials)
+
+
+def load_snapshot(path: str, organization: str, option: str = "--since-snapshot") -> dict:
+    """Load the results of a previous audit
+    
+    Args:
+        path: Path of a JSON, NDJSON, YAML or MessagePack results file,
+            optionally gzip or zstd compressed
+        organization: Organization being audited
+        option: Name of the option the path was given with, for errors
+        
+    Returns:
+        Previous audit results
+        
+    Raises:
+        click.BadParameter: If the file is not an audit of the organization
+    """
+    try:
+        data = read_bytes(path)
+        if is_msgpack(data):
+            snapshot = load_msgpack(data)
+        else:
+            try:
+                snapshot = load_json(data)
+            except ValueError:
+                try:
+                    records = [load_json(line) for line in data.splitlines() if line.strip()]
+                    snapshot = results_from_records(records)
+                except (ValueError, KeyError, TypeError):
+                    snapshot = load_yaml(data)
+    except ImportError as e:
+        raise click.BadParameter(str(e), param_hint=option)
+    
+    if not isinstance(snapshot, dict) or "organization" not in snapshot:
+        raise click.BadParameter(
+            f"{path} is not a JSON, NDJSON, YAML or MessagePack audit result",
+            param_hint=option,
+        )
+    if snapshot["organization"] != organization:
+        raise click.BadParameter(
+            f"{path} is an audit of {snapshot['organization']}, not {organization}",
+            param_hint=option,
+        )
+    return snapshot
+
+
+def write_records(records, output_file=None) -> None:
+    """Write audit records as newline-delimited JSON
+    
+    Each record is written and flushed as soon as it is produced, so other
+    tools can consume the output while the audit is still running. Files
+    ending in .gz or .zst are compressed instead, and not flushed per
+    record.
+    
+    Args:
+        records: Iterable of audit records
+        output_file: Optional path to write to instead of stdout
+    """
+    stream = open_output(output_file) if output_file else click.get_binary_stream("stdout")
+    flush = not output_file or compression_of(output_file) is None
+    try:
+        for record in records:
+            stream.write(dump_json_line(record) + b"\n")
+            if flush:
+                stream.flush()
+    finally:
+        if output_file:
+            stream.close()
+
+
+def create_client(
+    credentials: CredentialPool,
+    backend: str = "rest",
+    concurrency=None,
+    cache=None,
+    affiliation=None,
+    metrics=None,
+):
+    """Create an API client for the selected backend
+    
+    Args:
+        credentials: Pool of credentials to authenticate with
+        backend: Client backend name ("rest", "lean", "async" or "graphql")
+        concurrency: Optional concurrency override for the client
+        cache: Optional HTTPCache for conditional requests
+        affiliation: Optional collaborator affiliation filter
+        metrics: Optional AuditMetrics to record requests in
+        
+    Returns:
+        Client instance usable by GitHubOrgAuditor
+    """
+    options = {"cache": cache, "affiliation": affiliation, "metrics": metrics}
+    if concurrency is not None:
+        options["concurrency"] = concurrency
+    
+    if backend == "async":
+        return AsyncGitHubAuditClient(credentials=credentials, **options)
+    if backend == "graphql":
+        return GraphQLGitHubAuditClient(credentials=credentials, **options)
+    if backend == "lean":
+        return LeanGitHubAuditClient(credentials=credentials, **options)
+    return GitHubAuditClient(credentials=credentials, **options)
+
+
+def open_cache(cache_dir: Optional[str], max_size: int = DEFAULT_MAX_SIZE) -> Optional[HTTPCache]:
+    """Open the HTTP cache of a command
+    
+    The cache is closed when the command ends, also when it fails.
+    
+    Args:
+        cache_dir: Directory of the cache, or None for no cache
+        max_size: Maximum size of the cache in bytes
+        
+    Returns:
+        HTTPCache, or None without a directory
+    """
+    if not cache_dir:
+        return None
+    cache = HTTPCache(cache_dir, max_size=max_size)
+    click.get_current_context().call_on_close(cache.close)
+    return cache
+
+
+def query_client(token: Optional[str], server: Optional[str] = None, **options):
+    """Create the client of a query command
+    
+    Args:
+        token: GitHub personal access token
+        server: Optional address of a serve daemon to query instead of GitHub
+        **options: Options of GitHubAuditClient; not used with a server
+        
+    Returns:
+        AuditServerClient with a server, otherwise GitHubAuditClient
+        
+    Raises:
+        click.UsageError: If neither a token nor a server is given
+    """
+    if server:
+        return AuditServerClient(server)
+    if not token:
+        raise click.UsageError(
+            "Provide --token (or GITHUB_TOKEN) or --server (or GITHUB_AUDIT_SERVER)"
+        )
+    return GitHubAuditClient(token, **options)
+
+
+def check_page(limit: Optional[int], page: int) -> None:
+    """Reject --page without --limit
+    
+    Args:
+        limit: Value of --limit
+        page: Value of --page
+        
+    Raises:
+        click.UsageError: If a page other than the first is requested
+            without a page size
+    """
+    if page > 1 and limit is None:
+        raise click.UsageError("--page requires --limit")
+
+
+def echo_table(
+    rows: Iterable[list], headers: list, limit: Optional[int], page: int, noun: str
+) -> None:
+    """Print a grid table row by row
+    
+    Column widths are taken from the first rows, so the table starts
+    printing before all rows are known. With a full page of rows, a hint
+    how to get the next page follows the table.
+    
+    Args:
+        rows: Table rows; may be a generator
+        headers: Column headers
+        limit: Page size from --limit, or None
+        page: Page number from --page
+        noun: Name of the rows for the hint
+    """
+    count = 0
+    
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+    
+    for line in iter_grid(counted(rows), headers=headers):
+        click.echo(line)
+    if limit is not None and count == limit:
+        first = (page - 1) * limit + 1
+        click.echo(
+            f"Showing {noun} {first}-{first + count - 1}; "
+            f"use --page {page + 1} for more"
+        )
+
+
+def format_budget(summary: dict) -> str:
+    """Format a rate limit scheduler summary as a short report
+    
+    Args:
+        summary: Summary from RateLimitScheduler.summary()
+        
+    Returns:
+        Human-readable description of the API budget used
+    """
+    lines = [
+        f"API requests: {summary['requests']} "
+        f"({summary['retries']} retried, {summary['rate_limited']} rate limited, "
+        f"{summary['throttled_seconds']:.1f}s throttled)"
+    ]
+    for name, resource in sorted(summary["resources"].items()):
+        lines.append(
+            f"  {name}: used {resource['used']}, "
+            f"remaining {resource['remaining']}/{resource['limit']}"
+        )
+    return "\n".join(lines)
+
+
+def format_profile(summary: dict) -> str:
+    """Format audit metrics as tables of sections and API endpoints
+    
+    Args:
+        summary: Summary from AuditMetrics.summary()
+        
+    Returns:
+        Human-readable profile, endpoints ordered by total time
+    """
+    sections = [
+        [name, f"{seconds:.2f}"] for name, seconds in summary["sections"].items()
+    ]
+    endpoints = [
+        [
+            f"{stats['method']} {stats['endpoint']}",
+            stats["requests"],
+            ", ".join(f"{status}: {count}" for status, count in stats["statuses"].items()),
+            f"{stats['seconds']:.2f}",
+            f"{stats['seconds'] / stats['requests'] * 1000:.0f}",
+            f"{stats['max_seconds'] * 1000:.0f}",
+        ]
+        for stats in summary["endpoints"]
+    ]
+    lines = ["\nProfile"]
+    if sections:
+        lines.append(tabulate(
+            sections, headers=["Section", "Seconds"], tablefmt="grid", disable_numparse=True
+        ))
+        lines.append("")
+    lines.append(tabulate(
+        endpoints,
+        headers=["Endpoint", "Requests", "Statuses", "Seconds", "Mean ms", "Max ms"],
+        tablefmt="grid",
+        disable_numparse=True,
+    ))
+    lines.append(
+        f"{summary['requests']} requests, {summary['request_seconds']:.2f}s waiting for responses"
+    )
+    return "\n".join(lines)
+
+
+def format_access_output(report: dict) -> str:
+    """Format an access report as human-readable tables
+    
+    Args:
+        report: Report built by the access command
+        
+    Returns:
+        Formatted string with tables
+    """
+    output = []
+    for login, entries in report.get("users", {}).items():
+        output.append(f"Access of {login}")
+        output.append("=" * 80)
+        rows = [[e["repository"], e["permission"], ", ".join(e["sources"])] for e in entries]
+        output.append(
+            tabulate(rows, headers=["Repository", "Permission", "Granted By"], tablefmt="grid")
+            if rows else "No access"
+        )
+        output.append("")
+    
+    for name, entries in report.get("repositories", {}).items():
+        output.append(f"Access to {name}")
+        output.append("=" * 80)
+        rows = [[e["user"], e["permission"], ", ".join(e["sources"])] for e in entries]
+        output.append(
+            tabulate(rows, headers=["User", "Permission", "Granted By"], tablefmt="grid")
+            if rows else "No access"
+        )
+        output.append("")
+    
+    if "summary" in report:
+        output.append("Repositories per User")
+        output.append("=" * 80)
+        headers = ["User"] + [level.capitalize() for level in PERMISSION_LEVELS]
+        rows = [[e["user"]] + [e[level] for level in PERMISSION_LEVELS] for e in report["summary"]]
+        output.append(
+            tabulate(rows, headers=headers, tablefmt="grid") if rows else "No users found"
+        )
+        output.append("")
+    
+    return "\n".join(output)
+
+
+def format_findings_output(findings: list, skipped: Optional[list] = None) -> str:
+    """Format policy findings as a human-readable table
+    
+    Args:
+        findings: Findings from Policy.evaluate
+        skipped: Optional rules the policy skipped, from Policy.skipped
+        
+    Returns:
+        Formatted string with a table and counts per severity, and the
+        skipped rules
+    """
+    lines = []
+    if findings:
+        headers = ["Severity", "Rule", "Subject", "Description"]
+        rows = [[f["severity"], f["rule"], f["subject"], f["description"]] for f in findings]
+        counts = [
+            f"{sum(1 for f in findings if f['severity'] == severity)} {severity}"
+            for severity in reversed(SEVERITIES)
+        ]
+        lines.append(tabulate(rows, headers=headers, tablefmt="grid"))
+        lines.append(f"{len(findings)} findings: {', '.join(counts)}")
+    else:
+        lines.append("No findings")
+    
+    for rule in skipped or []:
+        lines.append(f"Skipped {rule['rule']}: {rule['reason']}")
+    return "\n".join(lines)
+
+
+def format_owners_output(report: dict) -> str:
+    """Format an ownership report as human-readable tables
+    
+    Args:
+        report: Report built by the owners command
+        
+    Returns:
+        Formatted string with tables
+    """
+    tables = {
+        "paths": ("Path Owners", ["Repository", "Path", "Owners", "Line", "Pattern"],
+                  lambda e: [
+                      e["repository"], e["path"], " ".join(e["owners"]), e["line"], e["pattern"]
+                  ]),
+        "owned_by": ("Rules Naming Owner", ["Repository", "Line", "Pattern"],
+                     lambda e: [e["repository"], e["line"], e["pattern"]]),
+        "errors": ("CODEOWNERS Problems", ["Repository", "Line", "Error"],
+                   lambda e: [e["repository"], e["line"], e["error"]]),
+        "owners": ("Owners", ["Owner", "Repositories", "Rules"],
+                   lambda e: [e["owner"], e["repositories"], e["rules"]]),
+    }
+    
+    output = []
+    for section, entries in report.items():
+        title, headers, row = tables[section]
+        output.append(title)
+        output.append("=" * 80)
+        if entries:
+            output.append(tabulate([row(e) for e in entries], headers=headers, tablefmt="grid"))
+        else:
+            output.append("None found")
+        output.append("")
+    return "\n".join(output)
+
+
+def format_diff_output(changes: dict) -> str:
+    """Format a snapshot diff as human-readable tables
+    
+    Args:
+        changes: Diff from SnapshotStore.diff
+        
+    Returns:
+        Formatted string with tables
+    """
+    old, new = changes["old"], changes["new"]
+    output = [
+        f"Snapshot {old['id']} ({old['created_at']}) -> "
+        f"snapshot {new['id']} ({new['created_at']})",
+        "",
+    ]
+    
+    if "settings" in changes:
+        output.append("Organization Settings")
+        output.append("=" * 80)
+        if changes["settings"]:
+            rows = [[k, v["old"], v["new"]] for k, v in changes["settings"].items()]
+            output.append(tabulate(rows, headers=["Setting", "Old", "New"], tablefmt="grid"))
+        else:
+            output.append("No changes")
+        output.append("")
+    
+    for section, title, key, label in (
+        ("repositories", "Repositories", "name", "Repository"),
+        ("teams", "Teams", "slug", "Team"),
+    ):
+        if section not in changes:
+            continue
+        output.append(title)
+        output.append("=" * 80)
+        rows = [["added", e[key], ""] for e in changes[section]["added"]]
+        rows += [["removed", e[key], ""] for e in changes[section]["removed"]]
+        rows += [
+            ["changed", e[key], f"{field}: {v['old']} -> {v['new']}"]
+            for e in changes[section]["changed"]
+            for field, v in e["changes"].items()
+        ]
+        if rows:
+            output.append(tabulate(rows, headers=["Change", label, "Detail"], tablefmt="grid"))
+        else:
+            output.append("No changes")
+        output.append("")
+    
+    if "permissions" in changes:
+        output.append("Permissions")
+        output.append("=" * 80)
+        section = changes["permissions"]
+        rows = [
+            ["added", e["repository"], f"{e['principal_type']} {e['principal']}", e["permission"]]
+            for e in section["added"]
+        ]
+        rows += [
+            ["removed", e["repository"], f"{e['principal_type']} {e['principal']}", e["permission"]]
+            for e in section["removed"]
+        ]
+        rows += [
+            [
+                "changed",
+                e["repository"],
+                f"{e['principal_type']} {e['principal']}",
+                f"{e['old']['permission']} -> {e['new']['permission']}",
+            ]
+            for e in section["changed"]
+        ]
+        if rows:
+            headers = ["Change", "Repository", "Grantee", "Permission"]
+            output.append(tabulate(rows, headers=headers, tablefmt="grid"))
+        else:
+            output.append("No changes")
+        output.append("")
+    
+    if "codeowners" in changes:
+        output.append("CODEOWNERS")
+        output.append("=" * 80)
+        section = changes["codeowners"]
+        rows = [["added", e["repository"], e["pattern"], e["owners"]] for e in section["added"]]
+        rows += [
+            ["removed", e["repository"], e["pattern"], e["owners"]] for e in section["removed"]
+        ]
+        rows += [
+            [
+                "changed", e["repository"], e["pattern"],
+                f"{e['old']['owners']} -> {e['new']['owners']}",
+            ]
+            for e in section["changed"]
+        ]
+        if rows:
+            headers = ["Change", "Repository", "Pattern", "Owners"]
+            output.append(tabulate(rows, headers=headers, tablefmt="grid"))
+        else:
+            output.append("No changes")
+        output.append("")
+    
+    return "\n".join(output)
+
+
+def format_table_output(results: dict) -> str:
+    """Format audit results as human-readable tables
+    
+    Args:
+        results: Audit results dictionary
+        
+    Returns:
+        Formatted string with tables
+    """
+    return "\n".join(iter_table_output(results))
+
+
+def iter_table_output(results: dict) -> Iterator[str]:
+    """Format audit results as human-readable tables, line by line
+    
+    Tables are rendered with iter_grid, so large sections are written
+    as they are formatted instead of being built in memory first.
+    
+    Args:
+        results: Audit results dictionary
+        
+    Yields:
+        Lines of the formatted tables
+    """
+    # Organization settings
+    if "settings" in results:
+        yield "Organization Settings"
+        yield "=" * 80
+        settings_data = ([k, v] for k, v in results["settings"].items())
+        yield from iter_grid(settings_data, headers=["Setting", "Value"])
+        yield ""
+    
+    # Teams
+    if "teams" in results:
+        yield "Teams"
+        yield "=" * 80
+        if results["teams"]:
+            yield from iter_grid(team_rows(results["teams"]), headers=TEAM_HEADERS)
+        else:
+            yield "No teams found"
+        yield ""
+    
+    # Repositories
+    if "repositories" in results:
+        yield "Repositories"
+        yield "=" * 80
+        if results["repositories"]:
+            rows = repository_rows(results["repositories"])
+            yield from iter_grid(rows, headers=REPOSITORY_HEADERS)
+            yield f"\nTotal repositories: {len(results['repositories'])}"
+        else:
+            yield "No repositories found"
+        yield ""
+    
+    # Permissions summary
+    if "permissions" in results:
+        yield "Permissions Summary"
+        yield "=" * 80
+        yield f"Total repositories with permissions: {len(results['permissions'])}"
+        yield ""
+    
+    # CODEOWNERS summary
+    if "codeowners" in results:
+        yield "CODEOWNERS Summary"
+        yield "=" * 80
+        if results["codeowners"]:
+            yield f"Repositories with CODEOWNERS: {len(results['codeowners'])}"
+            for repo_name in results["codeowners"].keys():
+                yield f"  - {repo_name}"
+        else:
+            yield "No CODEOWNERS files found"
+        yield ""
+    
+    # Per-repository and per-team errors
+    if results.get("errors"):
+        yield "Errors"
+        yield "=" * 80
+        headers = ["Section", "Repository/Team", "Error"]
+        errors_data = (
+            [e["section"], e["repository"] or e.get("team"), e["error"]]
+            for e in results["errors"]
+        )
+        yield from iter_grid(errors_data, headers=headers)
+        yield ""
+
+
+def team_rows(teams: Iterable[dict]) -> Iterator[list]:
+    """Get the table rows of teams
+    
+    Args:
+        teams: Team dictionaries or records
+        
+    Yields:
+        Row per team, in the columns of TEAM_HEADERS
+    """
+    for t in teams:
+        yield [
+            t["name"],
+            t["slug"],
+            t["privacy"],
+            t["permission"],
+            t["members_count"],
+            t["repos_count"],
+        ]
+
+
+def repository_rows(repos: Iterable[dict]) -> Iterator[list]:
+    """Get the table rows of repositories
+    
+    Args:
+        repos: Repository dictionaries or records
+        
+    Yields:
+        Row per repository, in the columns of REPOSITORY_HEADERS
+    """
+    for r in repos:
+        yield [
+            r["name"],
+            r["private"],
+            r["archived"],
+            r["default_branch"],
+            r["visibility"],
+        ]
 
 
 def main():
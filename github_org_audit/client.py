@@ -1,30 +1,143 @@
 """GitHub API client wrapper for auditing"""
 
-from github import Github
-from typing import Optional
+import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from github import Github, GithubException, UnknownObjectException
+from typing import Callable, Iterator, Optional
+from .cache import HTTPCache, MemoMixin
+from .credentials import DEFAULT_BASE_URL, CredentialPool
+from .metrics import AuditMetrics
+from .projections import (
+    add_team_hierarchy,
+    codeowners_blob,
+    codeowners_candidates,
+    collaborator_permissions,
+    team_error,
+)
+from .ratelimit import RateLimitScheduler
+from .records import (
+    PermissionsRecord,
+    RepositoryRecord,
+    TeamGrant,
+    TeamMember,
+    TeamRecord,
+)
+from .transport import AuditTransportAdapter, mount_on_github
 
 
-class GitHubAuditClient:
+class GitHubAuditClient(MemoMixin):
     """Client for auditing GitHub organizations"""
 
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        concurrency: int = 1,
+        scheduler: Optional[RateLimitScheduler] = None,
+        credentials: Optional[CredentialPool] = None,
+        cache: Optional[HTTPCache] = None,
+        affiliation: Optional[str] = None,
+        base_url: str = DEFAULT_BASE_URL,
+        metrics: Optional[AuditMetrics] = None,
+    ):
         """Initialize the GitHub client with authentication token
         
         Args:
-            token: GitHub personal access token
+            token: GitHub personal access token; not needed when
+                credentials is given
+            concurrency: Maximum number of repositories processed in
+                parallel by the organization-wide methods
+            scheduler: Optional rate limit scheduler, e.g. to share one
+                budget between several clients
+            credentials: Optional pool of tokens or GitHub App
+                installations to spread requests across
+            cache: Optional HTTP cache; unchanged resources are then
+                revalidated with conditional requests
+            affiliation: Optional collaborator affiliation to audit
+                ("all", "direct" or "outside"); defaults to all
+            base_url: Base URL of the GitHub REST API, e.g. of a GitHub
+                Enterprise Server
+            metrics: Optional metrics to count and time every request in
+                
+        Raises:
+            ValueError: If neither token nor credentials is given
         """
-        self.client = Github(token)
+        if credentials is None:
+            if not token:
+                raise ValueError("A token or a credential pool is required")
+            credentials = CredentialPool.from_tokens([token])
+        self.credentials = credentials
+        self.cache = cache
+        self.affiliation = affiliation
+        self.base_url = base_url.rstrip("/")
+        self.metrics = metrics
+        self.concurrency = max(1, concurrency)
+        self.scheduler = scheduler or RateLimitScheduler(max_concurrency=self.concurrency)
+        self.adapter = AuditTransportAdapter(
+            self.scheduler,
+            self.credentials,
+            cache=cache,
+            metrics=metrics,
+            pool_maxsize=self.concurrency,
+            max_retries=3,
+        )
+        # Authentication and request pacing are handled by the adapter
+        self.client = Github(
+            base_url=self.base_url,
+            pool_size=self.concurrency,
+            seconds_between_requests=None,
+        )
+        mount_on_github(self.client, self.adapter)
+        self._organizations = {}
+        self._memo = {}
+        self._user_names = {}
+        self.errors = []
         
     def get_organization(self, org_name: str):
         """Get organization object
         
+        The organization is fetched once and cached for the lifetime of
+        the client.
+        
         Args:
             org_name: Name of the organization
             
         Returns:
             GitHub organization object
         """
-        return self.client.get_organization(org_name)
+        if org_name not in self._organizations:
+            self._organizations[org_name] = self.client.get_organization(org_name)
+        return self._organizations[org_name]
+    
+    def list_repositories(self, org_name: str) -> list:
+        """List repository objects in the organization
+        
+        This walks the organization's repository listing once. The returned
+        objects can be passed to the other repository methods through their
+        ``repos``/``repo`` arguments so a full audit only paginates the
+        listing a single time.
+        
+        Args:
+            org_name: Name of the organization
+            
+        Returns:
+            List of GitHub repository objects
+        """
+        org = self.get_organization(org_name)
+        return list(org.get_repos())
+    
+    def get_repo(self, org_name: str, repo_name: str):
+        """Get a single repository object
+        
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            
+        Returns:
+            GitHub repository object
+        """
+        org = self.get_organization(org_name)
+        return org.get_repo(repo_name)
     
     def get_org_settings(self, org_name: str) -> dict:
         """Get organization settings
@@ -61,30 +174,49 @@ class GitHubAuditClient:
         
         return settings
     
-    def get_teams(self, org_name: str) -> list:
+    def get_teams(self, org_name: str, include_members: bool = False) -> list:
         """Get all teams in the organization
         
+        With include_members, every team also gets its members, the slug
+        of its parent team and the slugs of its child teams. Members are
+        fetched for all teams concurrently, using the team objects from the
+        listing, and each user's display name is fetched only once. Teams
+        whose members could not be listed are recorded in self.errors.
+        
         Args:
             org_name: Name of the organization
+            include_members: Whether to add members and the team hierarchy
             
         Returns:
-            List of team information dictionaries
+            List of TeamRecord
         """
         org = self.get_organization(org_name)
+        team_objects = list(org.get_teams())
         teams = []
         
-        for team in org.get_teams():
-            team_info = {
-                "name": team.name,
-                "slug": team.slug,
-                "description": team.description,
-                "privacy": team.privacy,
-                "permission": team.permission,
-                "members_count": team.members_count,
-                "repos_count": team.repos_count,
-            }
+        for team in team_objects:
+            team_info = TeamRecord(
+                name=team.name,
+                slug=team.slug,
+                description=team.description,
+                privacy=team.privacy,
+                permission=team.permission,
+                members_count=team.members_count,
+                repos_count=team.repos_count,
+            )
             teams.append(team_info)
         
+        if include_members:
+            add_team_hierarchy(teams, [t._rawData for t in team_objects])
+            listings = self._map(
+                self._team_member_roles,
+                team_objects,
+                on_error=lambda team, e: self.errors.append(team_error(org_name, team.slug, e)),
+            )
+            for team_info, listing in zip(teams, listings):
+                if listing is not None:
+                    team_info["members"] = self._team_members(listing)
+        
         return teams
     
     def get_team_members(self, org_name: str, team_slug: str) -> list:
@@ -99,160 +231,558 @@ class GitHubAuditClient:
         """
         org = self.get_organization(org_name)
         team = org.get_team_by_slug(team_slug)
-        members = []
+        return self._team_members(self._team_member_roles(team))
+    
+    def _team_member_roles(self, team) -> list:
+        """Get the logins and roles of a team's members
         
-        for member in team.get_members():
-            member_info = {
-                "login": member.login,
-                "name": member.name,
-                "role": "member",  # PyGithub doesn't expose role directly
-            }
-            members.append(member_info)
+        Two listings give the roles of all members: the maintainers and
+        everyone, instead of one membership request per member.
         
-        return members
+        Args:
+            team: GitHub team object
+            
+        Returns:
+            List of (login, role) tuples
+        """
+        maintainers = {member.login for member in team.get_members(role="maintainer")}
+        return [
+            (member.login, "maintainer" if member.login in maintainers else "member")
+            for member in team.get_members(role="all")
+        ]
+    
+    def _team_members(self, member_roles: list) -> list:
+        """Build team member records with display names
+        
+        Args:
+            member_roles: List of (login, role) tuples
+            
+        Returns:
+            List of team member information
+        """
+        names = self.get_user_names([login for login, _ in member_roles])
+        return [
+            TeamMember(login, names.get(login), role)
+            for login, role in member_roles
+        ]
     
-    def get_repositories(self, org_name: str) -> list:
+    def get_user_names(self, logins: list) -> dict:
+        """Get the display names of users
+        
+        Names are remembered for the lifetime of the client, so each user is
+        fetched once however many teams they belong to.
+        
+        Args:
+            logins: Logins of the users
+            
+        Returns:
+            Dictionary mapping logins to display names
+        """
+        missing = [login for login in dict.fromkeys(logins) if login not in self._user_names]
+        names = self._map(lambda login: self.client.get_user(login).name, missing)
+        self._user_names.update(zip(missing, names))
+        return {login: self._user_names.get(login) for login in logins}
+    
+    def _map(self, func: Callable, items: list, on_error: Optional[Callable] = None) -> list:
+        """Apply a function to items, in parallel up to the concurrency
+        
+        Args:
+            func: Function called with each item
+            items: Items to process
+            on_error: Optional function called with the item and the
+                exception of each item that failed
+            
+        Returns:
+            Results in the order of items, with None for items that failed
+        """
+        def run(item):
+            try:
+                return func(item)
+            except Exception as e:
+                if on_error is not None:
+                    on_error(item, e)
+                return None
+        
+        if self.concurrency <= 1 or len(items) <= 1:
+            return [run(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(run, items))
+    
+    def get_repositories(self, org_name: str, repos: Optional[list] = None) -> list:
         """Get all repositories in the organization
         
         Args:
             org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
             
         Returns:
-            List of repository information dictionaries
+            List of RepositoryRecord
         """
-        org = self.get_organization(org_name)
-        repos = []
-        
-        for repo in org.get_repos():
-            repo_info = {
-                "name": repo.name,
-                "full_name": repo.full_name,
-                "description": repo.description,
-                "private": repo.private,
-                "archived": repo.archived,
-                "disabled": repo.disabled,
-                "default_branch": repo.default_branch,
-                "visibility": repo.visibility,
-                "allow_merge_commit": repo.allow_merge_commit,
-                "allow_squash_merge": repo.allow_squash_merge,
-                "allow_rebase_merge": repo.allow_rebase_merge,
-                "delete_branch_on_merge": repo.delete_branch_on_merge,
-                "has_issues": repo.has_issues,
-                "has_projects": repo.has_projects,
-                "has_wiki": repo.has_wiki,
-                "has_downloads": repo.has_downloads,
-            }
-            repos.append(repo_info)
-        
-        return repos
+        if repos is None:
+            repos = self.list_repositories(org_name)
+        return [self._repository_record(repo) for repo in repos]
+    
+    def iter_repositories(self, org_name: str) -> Iterator[RepositoryRecord]:
+        """Get the repositories in the organization while paginating
+        
+        Unlike get_repositories, records are yielded as each page of the
+        listing arrives, so the first repositories can be shown before the
+        listing of a large organization is complete, and the remaining
+        pages are not fetched if the caller stops early. Pages are
+        requested one by one, because iterating a PyGithub PaginatedList
+        keeps every repository object it has returned.
+        
+        Args:
+            org_name: Name of the organization
+            
+        Yields:
+            RepositoryRecord of every repository
+        """
+        listing = self.get_organization(org_name).get_repos()
+        page = 0
+        while True:
+            repos = listing.get_page(page)
+            for repo in repos:
+                yield self._repository_record(repo)
+            if len(repos) < self.client.per_page:
+                return
+            page += 1
     
-    def get_repository_permissions(self, org_name: str, repo_name: str) -> dict:
+    @staticmethod
+    def _repository_record(repo) -> RepositoryRecord:
+        """Get the audited settings of a repository object
+        
+        Args:
+            repo: GitHub repository object
+            
+        Returns:
+            RepositoryRecord
+        """
+        return RepositoryRecord(
+            name=repo.name,
+            full_name=repo.full_name,
+            description=repo.description,
+            private=repo.private,
+            archived=repo.archived,
+            # PyGithub 2.1 does not expose "disabled"; read it from the
+            # listing JSON instead of completing the object
+            disabled=repo._rawData.get("disabled"),
+            default_branch=repo.default_branch,
+            visibility=repo.visibility,
+            allow_merge_commit=repo.allow_merge_commit,
+            allow_squash_merge=repo.allow_squash_merge,
+            allow_rebase_merge=repo.allow_rebase_merge,
+            delete_branch_on_merge=repo.delete_branch_on_merge,
+            has_issues=repo.has_issues,
+            has_projects=repo.has_projects,
+            has_wiki=repo.has_wiki,
+            has_downloads=repo.has_downloads,
+            updated_at=str(repo.updated_at),
+            pushed_at=str(repo.pushed_at),
+        )
+    
+    def get_repository_permissions(self, org_name: str, repo_name: str, repo=None) -> dict:
         """Get permissions for a specific repository
         
         Args:
             org_name: Name of the organization
             repo_name: Name of the repository
+            repo: Optional repository object already fetched for repo_name
             
         Returns:
-            Dictionary containing repository permissions
+            PermissionsRecord of the repository
         """
-        org = self.get_organization(org_name)
-        repo = org.get_repo(repo_name)
+        if repo is None:
+            repo = self.get_repo(org_name, repo_name)
         
-        permissions = {
-            "repository": repo_name,
-            "collaborators": [],
-            "teams": [],
-        }
+        permissions = PermissionsRecord(repository=repo_name, collaborators=[], teams=[])
         
-        # Get direct collaborators
-        for collab in repo.get_collaborators():
-            collab_info = {
-                "login": collab.login,
-                "permissions": repo.get_collaborator_permission(collab),
-            }
-            permissions["collaborators"].append(collab_info)
+        # Get direct collaborators; the listing carries each collaborator's
+        # permissions, so no per-user permission lookup is needed
+        if self.affiliation:
+            collaborators = repo.get_collaborators(affiliation=self.affiliation)
+        else:
+            collaborators = repo.get_collaborators()
+        for collab in collaborators:
+            permissions.collaborators.append(collaborator_permissions(collab._rawData))
         
         # Get teams with access
         for team in repo.get_teams():
-            team_info = {
-                "name": team.name,
-                "permission": team.permission,
-            }
-            permissions["teams"].append(team_info)
+            permissions.teams.append(TeamGrant(team.name, team.permission))
         
         return permissions
     
-    def get_org_permissions(self, org_name: str) -> list:
+    def get_org_permissions(self, org_name: str, repos: Optional[list] = None) -> list:
         """Get permissions across all repositories in the organization
         
         Args:
             org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
             
         Returns:
             List of permission information for all repositories
         """
-        org = self.get_organization(org_name)
-        all_permissions = []
+        return list(self.iter_org_permissions(org_name, repos=repos))
+    
+    def iter_org_permissions(self, org_name: str, repos: Optional[list] = None) -> Iterator[dict]:
+        """Yield permissions of each repository as soon as they are fetched
         
-        for repo in org.get_repos():
-            try:
-                perms = self.get_repository_permissions(org_name, repo.name)
-                all_permissions.append(perms)
-            except Exception as e:
-                # Skip repositories we can't access
-                continue
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+            
+        Yields:
+            Permission information of one repository, in the order of repos
+        """
+        if repos is None:
+            repos = self.list_repositories(org_name)
+        results = self._iter_repos(
+            org_name,
+            "permissions",
+            lambda repo: self.get_repository_permissions(
+                org_name, self._repo_name(repo), repo=repo
+            ),
+            repos,
+        )
+        
+        for _, perms in results:
+            if perms is not None:
+                yield perms
+    
+    def find_codeowners(self, org_name: str, repo_name: str, repo=None) -> Optional[dict]:
+        """Locate the CODEOWNERS file of a repository without downloading it
+        
+        The root tree of the default branch is listed with one request. Its
+        SHA changes with any commit that touches the repository content, so
+        an earlier answer for the same tree, including "no CODEOWNERS", is
+        reused without further requests. Otherwise the .github and docs
+        subtrees are listed as needed; being addressed by SHA, they are
+        remembered as well.
         
-        return all_permissions
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Optional repository object already fetched for repo_name
+            
+        Returns:
+            Dictionary with the path and blob sha of the CODEOWNERS file, or
+            None if the repository has none
+        """
+        if repo is None:
+            repo = self.get_repo(org_name, repo_name)
+        
+        tree = self._git_tree(repo)
+        if tree is None:
+            return None
+        tree_sha, entries = tree
+        
+        key = f"codeowners:{self._repo_full_name(repo)}"
+        known = self._recall(key)
+        if known is not None and known["tree"] == tree_sha:
+            return known["location"]
+        
+        location = None
+        for path, blob_sha, subtree_sha in codeowners_candidates(entries):
+            if subtree_sha:
+                blob_sha = self._codeowners_in_tree(repo, subtree_sha)
+            if blob_sha:
+                location = {"path": path, "sha": blob_sha}
+                break
+        
+        self._remember(key, {"tree": tree_sha, "location": location})
+        return location
     
-    def get_codeowners(self, org_name: str, repo_name: str) -> Optional[str]:
+    def _codeowners_in_tree(self, repo, tree_sha: str) -> Optional[str]:
+        """Get the blob sha of a CODEOWNERS file directly inside a tree
+        
+        Args:
+            repo: Repository object
+            tree_sha: SHA of the tree to look in
+            
+        Returns:
+            Blob sha, or None if the tree has no CODEOWNERS file
+        """
+        key = f"codeowners-tree:{tree_sha}"
+        known = self._recall(key)
+        if known is None:
+            tree = self._git_tree(repo, tree_sha)
+            known = {"sha": codeowners_blob(tree[1]) if tree else None}
+            self._remember(key, known)
+        return known["sha"]
+    
+    def get_codeowners(self, org_name: str, repo_name: str, repo=None) -> Optional[str]:
         """Get CODEOWNERS file content for a repository
         
+        The file is located with find_codeowners and its content is only
+        downloaded when the blob has not been seen before.
+        
         Args:
             org_name: Name of the organization
             repo_name: Name of the repository
+            repo: Optional repository object already fetched for repo_name
             
         Returns:
             Content of CODEOWNERS file or None if not found
         """
-        org = self.get_organization(org_name)
-        repo = org.get_repo(repo_name)
+        if repo is None:
+            repo = self.get_repo(org_name, repo_name)
         
-        # CODEOWNERS can be in multiple locations
-        possible_paths = [
-            "CODEOWNERS",
-            ".github/CODEOWNERS",
-            "docs/CODEOWNERS",
-        ]
+        location = self.find_codeowners(org_name, repo_name, repo=repo)
+        if location is None:
+            return None
         
-        for path in possible_paths:
-            try:
-                content = repo.get_contents(path)
-                if content:
-                    return content.decoded_content.decode('utf-8')
-            except:
-                continue
+        key = f"blob:{location['sha']}"
+        content = self._recall(key)
+        if content is None:
+            content = self._git_blob(repo, location["sha"])
+            self._remember(key, content)
+        
+        return content
+    
+    def _git_tree(self, repo, sha: Optional[str] = None) -> Optional[tuple]:
+        """List a git tree of a repository
+        
+        Args:
+            repo: Repository object
+            sha: SHA of the tree; the root tree of the default branch when
+                not given
+            
+        Returns:
+            Tuple of (tree sha, dictionary mapping entry paths to (type,
+            sha) tuples), or None if the repository has no such tree
+        """
+        try:
+            tree = repo.get_git_tree(sha or repo.default_branch)
+        except UnknownObjectException:
+            return None
+        except GithubException as e:
+            # Empty repositories have no tree
+            if e.status == 409:
+                return None
+            raise
+        return tree.sha, {entry.path: (entry.type, entry.sha) for entry in tree.tree}
+    
+    def _git_blob(self, repo, sha: str) -> str:
+        """Download a git blob of a repository as text
+        
+        Args:
+            repo: Repository object
+            sha: SHA of the blob
+            
+        Returns:
+            Content of the blob
+        """
+        blob = repo.get_git_blob(sha)
+        return base64.b64decode(blob.content).decode('utf-8')
+    
+    def get_codeowners_locations(self, org_name: str, repos: Optional[list] = None) -> dict:
+        """Locate CODEOWNERS files for all repositories without downloading them
         
-        return None
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+            
+        Returns:
+            Dictionary mapping repository names to the CODEOWNERS path, or
+            None for repositories without one
+        """
+        if repos is None:
+            repos = self.list_repositories(org_name)
+        
+        def locate(repo):
+            location = self.find_codeowners(org_name, self._repo_name(repo), repo=repo)
+            return location["path"] if location else None
+        
+        # Wrap each path so that failed repositories, whose result is None,
+        # can be told apart from repositories without CODEOWNERS
+        results = self._map_repos(org_name, "codeowners", lambda repo: (locate(repo),), repos)
+        
+        return {
+            self._repo_name(repo): result[0]
+            for repo, result in results
+            if result is not None
+        }
     
-    def get_all_codeowners(self, org_name: str) -> dict:
+    def get_all_codeowners(self, org_name: str, repos: Optional[list] = None) -> dict:
         """Get CODEOWNERS files for all repositories
         
         Args:
             org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
             
         Returns:
             Dictionary mapping repository names to CODEOWNERS content
         """
-        org = self.get_organization(org_name)
-        codeowners = {}
+        return dict(self.iter_codeowners(org_name, repos=repos))
+    
+    def iter_codeowners(
+        self, org_name: str, repos: Optional[list] = None, include_missing: bool = False
+    ) -> Iterator[tuple]:
+        """Yield CODEOWNERS files as soon as they are fetched
+        
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+            include_missing: Also yield repositories without a CODEOWNERS
+                file, with None as the content
+            
+        Yields:
+            (repository name, CODEOWNERS content) tuples for repositories
+            that have a CODEOWNERS file, in the order of repos. Repositories
+            that failed are never yielded.
+        """
+        if repos is None:
+            repos = self.list_repositories(org_name)
+        results = self._iter_repos(
+            org_name,
+            "codeowners",
+            # Wrapped so that failures can be told apart from missing files
+            lambda repo: (self.get_codeowners(org_name, self._repo_name(repo), repo=repo),),
+            repos,
+        )
+        
+        for repo, result in results:
+            content = result[0] if result is not None else None
+            if content or (include_missing and result is not None):
+                yield self._repo_name(repo), content
+    
+    def repository_names(self, repos: list) -> list:
+        """Get the names of repository objects
+        
+        Args:
+            repos: Repository objects from list_repositories
+            
+        Returns:
+            List of repository names in the order of repos
+        """
+        return [self._repo_name(repo) for repo in repos]
+    
+    def repository_timestamps(self, repos: list) -> dict:
+        """Get when each repository last changed
+        
+        The timestamps come from the repository listing, so no requests
+        are made.
+        
+        Args:
+            repos: Repository objects from list_repositories
+            
+        Returns:
+            Dictionary mapping repository names, in the order of repos, to
+            their updated_at and pushed_at timestamps
+        """
+        return {self._repo_name(repo): self._repo_timestamps(repo) for repo in repos}
+    
+    @staticmethod
+    def _repo_name(repo) -> str:
+        """Get the name of a repository object from list_repositories
+        
+        Args:
+            repo: Repository object
+            
+        Returns:
+            Name of the repository
+        """
+        return repo.name
+    
+    @staticmethod
+    def _repo_full_name(repo) -> str:
+        """Get the owner/name of a repository object from list_repositories
+        
+        Args:
+            repo: Repository object
+            
+        Returns:
+            Full name of the repository
+        """
+        return repo.full_name
+    
+    @staticmethod
+    def _repo_timestamps(repo) -> dict:
+        """Get the change timestamps of a repository object
         
-        for repo in org.get_repos():
+        Args:
+            repo: Repository object
+            
+        Returns:
+            Dictionary with updated_at and pushed_at
+        """
+        return {
+            "updated_at": str(repo.updated_at),
+            "pushed_at": str(repo.pushed_at),
+        }
+    
+    def _map_repos(self, org_name: str, section: str, func: Callable, repos: list) -> list:
+        """Apply a per-repository function across repositories
+        
+        Repositories are processed by a thread pool when the client was
+        created with a concurrency above one. Failures are recorded in
+        self.errors rather than raised.
+        
+        Args:
+            org_name: Name of the organization
+            section: Audit section name used when recording errors
+            func: Function called with each repository object
+            repos: Repository objects to process
+            
+        Returns:
+            List of (repository, result) tuples in the order of repos, with
+            None as the result for repositories that failed
+        """
+        return list(self._iter_repos(org_name, section, func, repos))
+    
+    def _iter_repos(
+        self, org_name: str, section: str, func: Callable, repos: list
+    ) -> Iterator[tuple]:
+        """Apply a per-repository function across repositories lazily
+        
+        Like _map_repos, but results are yielded as they become available.
+        Only a couple of repositories per worker are processed ahead of the
+        consumer, so results do not pile up in memory.
+        
+        Args:
+            org_name: Name of the organization
+            section: Audit section name used when recording errors
+            func: Function called with each repository object
+            repos: Repository objects to process
+            
+        Yields:
+            (repository, result) tuples in the order of repos, with None as
+            the result for repositories that failed
+        """
+        def run(repo):
             try:
-                content = self.get_codeowners(org_name, repo.name)
-                if content:
-                    codeowners[repo.name] = content
+                return func(repo), None
             except Exception as e:
-                continue
+                return None, e
+        
+        def outcome(repo, result, error):
+            if error is not None:
+                self.errors.append({
+                    "organization": org_name,
+                    "section": section,
+                    "repository": self._repo_name(repo),
+                    "error": str(error),
+                })
+            return repo, result
+        
+        if self.concurrency <= 1 or len(repos) <= 1:
+            for repo in repos:
+                yield outcome(repo, *run(repo))
+            return
         
-        return codeowners
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = deque()
+            for repo in repos:
+                pending.append((repo, executor.submit(run, repo)))
+                if len(pending) >= 2 * self.concurrency:
+                    done, future = pending.popleft()
+                    yield outcome(done, *future.result())
+            while pending:
+                done, future = pending.popleft()
+                yield outcome(done, *future.result())
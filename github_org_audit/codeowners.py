@@ -0,0 +1,299 @@
+"""Parsing and matching of CODEOWNERS files"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Set
+
+
+# Owners are @user, @org/team-slug or an email address
+OWNER_PATTERN = re.compile(
+    r"^(@[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?"
+    r"(?:/[A-Za-z0-9_.-]+)?"
+    r"|[^@\s]+@[^@\s]+\.[^@\s]+)$"
+)
+
+
+class CodeownersRule(NamedTuple):
+    """One rule of a CODEOWNERS file"""
+
+    line: int
+    pattern: str
+    owners: List[str]
+    matcher: Pattern
+
+
+class CodeownersFile:
+    """Rules of one repository's CODEOWNERS file
+
+    Lines GitHub cannot parse are left out of the rules, as GitHub ignores
+    them, and reported in errors.
+    """
+
+    def __init__(self, repository: str, content: str):
+        """Parse a CODEOWNERS file
+
+        Args:
+            repository: Name of the repository
+            content: Text of the CODEOWNERS file
+        """
+        self.repository = repository
+        self.rules = []
+        self.errors = []
+
+        for number, text in enumerate(content.splitlines(), start=1):
+            fields = strip_comment(text).split()
+            if not fields:
+                continue
+            pattern, owners = fields[0], fields[1:]
+
+            problem = pattern_error(pattern)
+            if problem:
+                self.errors.append(self._error(number, problem))
+                continue
+            invalid = [o for o in owners if not OWNER_PATTERN.match(o)]
+            if invalid:
+                self.errors.append(self._error(number, f"invalid owner {invalid[0]}"))
+                continue
+            self.rules.append(CodeownersRule(number, pattern, owners, compile_pattern(pattern)))
+
+    def match(self, path: str) -> Optional[CodeownersRule]:
+        """Find the rule that decides who owns a path
+
+        Args:
+            path: Path relative to the repository root
+
+        Returns:
+            The last rule matching the path, or None if no rule matches
+        """
+        path = path.strip("/")
+        for rule in reversed(self.rules):
+            if rule.matcher.match(path):
+                return rule
+        return None
+
+    def _error(self, line: int, error: str) -> Dict:
+        """Build the report entry of a problem in the file"""
+        return {"repository": self.repository, "line": line, "error": error}
+
+
+class OwnersIndex:
+    """Organization-wide index of CODEOWNERS rules
+
+    Indexes the parsed rules by repository and by owner, so ownership
+    questions across all repositories are answered without reparsing the
+    files. When the organization's teams or collaborators are known, owners
+    that are neither are reported as unknown.
+    """
+
+    def __init__(
+        self,
+        codeowners: Dict[str, str],
+        known_teams: Optional[Set[str]] = None,
+        known_users: Optional[Set[str]] = None,
+    ):
+        """Build the index
+
+        Args:
+            codeowners: Dictionary mapping repository names to CODEOWNERS
+                content, as returned by get_all_codeowners
+            known_teams: Optional "@org/slug" handles of the existing teams
+            known_users: Optional "@login" handles of the existing users
+        """
+        self.files = {}
+        self.owners = {}
+        self.errors = []
+        known_teams = {t.lower() for t in known_teams} if known_teams is not None else None
+        known_users = {u.lower() for u in known_users} if known_users is not None else None
+
+        for repository in sorted(codeowners):
+            parsed = CodeownersFile(repository, codeowners[repository] or "")
+            self.files[repository] = parsed
+            self.errors.extend(parsed.errors)
+
+            for rule in parsed.rules:
+                for owner in rule.owners:
+                    self.owners.setdefault(owner.lower(), []).append((repository, rule))
+                    known = known_teams if "/" in owner else known_users
+                    if owner.startswith("@") and known is not None and owner.lower() not in known:
+                        self.errors.append(parsed._error(rule.line, f"unknown owner {owner}"))
+
+        self.errors.sort(key=lambda e: (e["repository"], e["line"]))
+
+    @classmethod
+    def from_results(cls, results: Dict) -> "OwnersIndex":
+        """Build the index of an audit
+
+        Teams are checked against the audited teams and users against the
+        audited collaborators, if those sections were audited.
+
+        Args:
+            results: Results from GitHubOrgAuditor.audit
+
+        Returns:
+            OwnersIndex
+        """
+        known_teams = known_users = None
+        if "teams" in results:
+            known_teams = {f"@{results['organization']}/{t['slug']}" for t in results["teams"]}
+        if "permissions" in results:
+            known_users = {
+                f"@{c['login']}"
+                for perms in results["permissions"]
+                for c in perms.get("collaborators", [])
+            }
+        return cls(results.get("codeowners", {}), known_teams, known_users)
+
+    def owned_by(self, owner: str) -> List[Dict]:
+        """List the rules that name an owner
+
+        Args:
+            owner: Owner handle, such as "@org/team" or "@user"
+
+        Returns:
+            Dictionaries with repository, line and pattern, in repository order
+        """
+        return [
+            {"repository": repository, "line": rule.line, "pattern": rule.pattern}
+            for repository, rule in self.owners.get(owner.lower(), [])
+        ]
+
+    def resolve(
+        self, paths: Iterable[str], repositories: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """Find the owners of paths across repositories
+
+        Args:
+            paths: Paths relative to the repository root
+            repositories: Repositories to look in (default: every repository
+                with a CODEOWNERS file)
+
+        Returns:
+            Dictionaries with repository, path, owners and the deciding
+            rule's line and pattern; paths no rule matches are left out
+        """
+        paths = list(paths)
+        if repositories is None:
+            repositories = self.files
+        matches = []
+        for repository in repositories:
+            parsed = self.files.get(repository)
+            if parsed is None:
+                continue
+            for path in paths:
+                rule = parsed.match(path)
+                if rule is not None:
+                    matches.append({
+                        "repository": repository,
+                        "path": path,
+                        "owners": rule.owners,
+                        "line": rule.line,
+                        "pattern": rule.pattern,
+                    })
+        return matches
+
+    def summary(self) -> List[Dict]:
+        """Count the repositories and rules of every owner
+
+        Returns:
+            Dictionaries with owner, repositories and rules, by owner
+        """
+        return [
+            {
+                "owner": owner,
+                "repositories": len({repository for repository, _ in entries}),
+                "rules": len(entries),
+            }
+            for owner, entries in sorted(self.owners.items())
+        ]
+
+
+def parse_codeowners(content: str) -> List[CodeownersRule]:
+    """Parse the valid rules of a CODEOWNERS file
+
+    Args:
+        content: Text of the CODEOWNERS file
+
+    Returns:
+        Rules in file order, with their 1-based line numbers
+    """
+    return CodeownersFile("", content).rules
+
+
+def strip_comment(line: str) -> str:
+    """Remove the comment from a CODEOWNERS line
+
+    Args:
+        line: Line of a CODEOWNERS file
+
+    Returns:
+        The line up to the first "#" that is not escaped with a backslash
+    """
+    position = line.find("#")
+    while position != -1:
+        if position == 0 or line[position - 1] != "\\":
+            return line[:position]
+        position = line.find("#", position + 1)
+    return line
+
+
+def pattern_error(pattern: str) -> Optional[str]:
+    """Check a CODEOWNERS pattern for syntax GitHub does not support
+
+    Args:
+        pattern: Path pattern of a rule
+
+    Returns:
+        Description of the problem, or None if the pattern is valid
+    """
+    if pattern.startswith("!"):
+        return f"negated pattern {pattern} is not supported"
+    if "[" in pattern or "]" in pattern:
+        return f"character range in {pattern} is not supported"
+    if pattern.startswith("\\#"):
+        return f"escaped comment character in {pattern} is not supported"
+    return None
+
+
+def compile_pattern(pattern: str) -> Pattern:
+    """Compile a CODEOWNERS pattern into a regular expression
+
+    Patterns follow gitignore rules: a pattern with a leading or inner "/"
+    is relative to the repository root, otherwise it matches at any depth;
+    "*" and "?" do not cross directories while "**" does; and a pattern
+    naming a directory matches everything inside it.
+
+    Args:
+        pattern: Path pattern of a rule
+
+    Returns:
+        Compiled expression matching paths relative to the repository root
+    """
+    anchored = "/" in pattern.rstrip("/")
+    body = pattern.strip("/")
+    regex = []
+    i = 0
+    while i < len(body):
+        if body.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif body.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif body[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif body[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif body[i] == "\\" and i + 1 < len(body):
+            regex.append(re.escape(body[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(body[i]))
+            i += 1
+
+    # "docs/*" only matches the files directly in docs, while a last
+    # segment without wildcards may be a directory with files inside
+    last_segment = body.rsplit("/", 1)[-1]
+    suffix = "" if "*" in last_segment or "?" in last_segment else "(?:/.*)?"
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"{prefix}{''.join(regex)}{suffix}\\Z")
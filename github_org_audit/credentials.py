@@ -0,0 +1,244 @@
+"""Credentials and credential pools for the GitHub API clients"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import jwt
+import requests
+
+
+DEFAULT_BASE_URL = "https://api.github.com"
+
+# Seconds to wait for a connection or a response, as PyGithub does by default
+REQUEST_TIMEOUT = 15
+
+# Installation tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 300
+
+
+class Credential:
+    """Base class for a credential used to authenticate API requests"""
+
+    name = "credential"
+    # Identifies the credential in cache keys and rate limit budgets
+    key = "credential"
+
+    def authorization(self) -> str:
+        """Get the value of the Authorization header
+
+        Returns:
+            Authorization header value
+        """
+        raise NotImplementedError
+
+    def needs_refresh(self) -> bool:
+        """Check whether authorization() would have to fetch a new token
+
+        Returns:
+            True if the next authorization() call performs a network request
+        """
+        return False
+
+
+class TokenCredential(Credential):
+    """Personal access token or other static token"""
+
+    def __init__(self, token: str, name: Optional[str] = None):
+        """Initialize the credential
+
+        Args:
+            token: GitHub token
+            name: Optional display name; defaults to the last four
+                characters of the token
+        """
+        self.token = token
+        self.name = name or f"token-{token[-4:]}"
+        # Tokens may share their last characters, so the key hashes all of it
+        self.key = f"token-{hashlib.sha256(token.encode()).hexdigest()[:12]}"
+
+    def authorization(self) -> str:
+        """Get the value of the Authorization header"""
+        return f"token {self.token}"
+
+
+class AppInstallationCredential(Credential):
+    """GitHub App installation, authenticated with short-lived tokens
+
+    A JWT signed with the app's private key is exchanged for an installation
+    access token, which is refreshed automatically shortly before it
+    expires.
+    """
+
+    def __init__(
+        self,
+        app_id: str,
+        private_key: str,
+        installation_id: Optional[int] = None,
+        organization: Optional[str] = None,
+        base_url: str = DEFAULT_BASE_URL,
+    ):
+        """Initialize the credential
+
+        Args:
+            app_id: GitHub App ID
+            private_key: PEM-encoded private key of the app
+            installation_id: Installation ID; looked up from organization
+                when not provided
+            organization: Organization the app is installed on
+            base_url: Base URL of the GitHub REST API
+
+        Raises:
+            ValueError: If neither installation_id nor organization is given
+        """
+        if installation_id is None and organization is None:
+            raise ValueError("installation_id or organization is required")
+        self.app_id = str(app_id)
+        self.private_key = private_key
+        self.installation_id = installation_id
+        self.organization = organization
+        self.base_url = base_url.rstrip("/")
+        self.name = f"app-{self.app_id}-{installation_id or organization}"
+        self.key = self.name
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def authorization(self) -> str:
+        """Get the value of the Authorization header, refreshing if needed"""
+        with self._lock:
+            if self.needs_refresh():
+                self._refresh()
+            return f"token {self._token}"
+
+    def needs_refresh(self) -> bool:
+        """Check whether the installation token is missing or about to expire"""
+        return self._token is None or self._expires_at - time.time() < TOKEN_REFRESH_MARGIN
+
+    def _app_headers(self) -> dict:
+        """Get headers authenticating as the app itself
+
+        Returns:
+            Request headers with a freshly signed JWT
+        """
+        now = int(time.time())
+        payload = {
+            # Allow for clock drift between us and GitHub
+            "iat": now - 60,
+            "exp": now + 540,
+            "iss": self.app_id,
+        }
+        token = jwt.encode(payload, self.private_key, algorithm="RS256")
+        return {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+        }
+
+    def _refresh(self) -> None:
+        """Exchange the app JWT for a new installation access token"""
+        headers = self._app_headers()
+
+        if self.installation_id is None:
+            response = requests.get(
+                f"{self.base_url}/orgs/{self.organization}/installation",
+                headers=headers,
+                timeout=REQUEST_TIMEOUT,
+            )
+            response.raise_for_status()
+            self.installation_id = response.json()["id"]
+
+        response = requests.post(
+            f"{self.base_url}/app/installations/{self.installation_id}/access_tokens",
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        expires_at = datetime.strptime(data["expires_at"], "%Y-%m-%dT%H:%M:%SZ")
+        self._token = data["token"]
+        self._expires_at = expires_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+class CredentialPool:
+    """Pool of credentials that requests are spread across
+
+    Each request is routed to the credential with the most remaining rate
+    limit budget for its resource, so several tokens or app installations
+    add up to one larger budget.
+    """
+
+    def __init__(self, credentials: List[Credential]):
+        """Initialize the pool
+
+        Args:
+            credentials: Credentials to use; at least one is required
+
+        Raises:
+            ValueError: If no credentials are given
+        """
+        if not credentials:
+            raise ValueError("At least one credential is required")
+        self.credentials = list(credentials)
+        self._budgets = {}
+        self._selected = {id(c): 0 for c in self.credentials}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_tokens(cls, tokens: List[str]) -> "CredentialPool":
+        """Create a pool of static tokens
+
+        Args:
+            tokens: GitHub tokens
+
+        Returns:
+            CredentialPool instance
+        """
+        return cls([TokenCredential(token) for token in tokens])
+
+    def select(self, resource: str = "core") -> Credential:
+        """Pick the credential to use for the next request
+
+        Credentials whose budget is unknown or whose window has reset are
+        treated as having their full budget.
+
+        Args:
+            resource: Rate limit resource the request counts against
+
+        Returns:
+            Credential with the most remaining budget
+        """
+        with self._lock:
+            now = time.time()
+
+            def rank(credential):
+                budget = self._budgets.get((id(credential), resource))
+                if budget is None or budget["reset"] is None or budget["reset"] <= now:
+                    remaining = float("inf")
+                else:
+                    remaining = budget["remaining"]
+                return remaining, -self._selected[id(credential)]
+
+            credential = max(self.credentials, key=rank)
+            self._selected[id(credential)] += 1
+            return credential
+
+    def record(self, credential: Credential, resource: str, headers) -> None:
+        """Update a credential's budget from response headers
+
+        Args:
+            credential: Credential used for the request
+            resource: Rate limit resource the request counted against
+            headers: Response headers (case-insensitive mapping)
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        reset = headers.get("X-RateLimit-Reset")
+        with self._lock:
+            self._budgets[(id(credential), resource)] = {
+                "remaining": int(remaining),
+                "reset": int(reset) if reset is not None else None,
+            }
@@ -0,0 +1,618 @@
+"""GitHub GraphQL API client for auditing"""
+
+import threading
+from typing import Optional
+from .cache import HTTPCache
+from .client import GitHubAuditClient
+from .credentials import DEFAULT_BASE_URL, REQUEST_TIMEOUT, CredentialPool
+from .metrics import AuditMetrics
+from .projections import format_timestamp
+from .ratelimit import RateLimitScheduler
+from .records import CollaboratorGrant, PermissionsRecord, RepositoryRecord, TeamGrant
+from .transport import create_session
+
+
+DEFAULT_GRAPHQL_URL = "https://api.github.com/graphql"
+
+# GraphQL RepositoryPermission values as reported by the REST endpoints
+COLLABORATOR_PERMISSIONS = {
+    "ADMIN": "admin",
+    "MAINTAIN": "write",
+    "WRITE": "write",
+    "TRIAGE": "read",
+    "READ": "read",
+}
+COLLABORATOR_AFFILIATIONS = {
+    "all": "ALL",
+    "direct": "DIRECT",
+    "outside": "OUTSIDE",
+}
+TEAM_PERMISSIONS = {
+    "ADMIN": "admin",
+    "MAINTAIN": "maintain",
+    "WRITE": "push",
+    "TRIAGE": "triage",
+    "READ": "pull",
+}
+
+CODEOWNERS_FIELDS = {
+    "codeownersRoot": "CODEOWNERS",
+    "codeownersGithub": ".github/CODEOWNERS",
+    "codeownersDocs": "docs/CODEOWNERS",
+}
+
+RATE_LIMIT_FRAGMENT = """
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
+"""
+
+COLLABORATORS_FRAGMENT = """
+  pageInfo {
+    hasNextPage
+    endCursor
+  }
+  edges {
+    permission
+    node {
+      login
+    }
+  }
+"""
+
+REPOSITORY_FIELDS = """
+  name
+  nameWithOwner
+  description
+  isPrivate
+  isArchived
+  isDisabled
+  visibility
+  defaultBranchRef {
+    name
+  }
+  mergeCommitAllowed
+  squashMergeAllowed
+  rebaseMergeAllowed
+  deleteBranchOnMerge
+  hasIssuesEnabled
+  hasProjectsEnabled
+  hasWikiEnabled
+  updatedAt
+  pushedAt
+  codeownersRoot: object(expression: "HEAD:CODEOWNERS") {
+    ... on Blob {
+      oid
+      text
+    }
+  }
+  codeownersGithub: object(expression: "HEAD:.github/CODEOWNERS") {
+    ... on Blob {
+      oid
+      text
+    }
+  }
+  codeownersDocs: object(expression: "HEAD:docs/CODEOWNERS") {
+    ... on Blob {
+      oid
+      text
+    }
+  }
+  collaborators(first: 100, affiliation: $affiliation) {
+    %s
+  }
+""" % COLLABORATORS_FRAGMENT
+
+REPOSITORIES_QUERY = """
+query($org: String!, $first: Int!, $cursor: String, $affiliation: CollaboratorAffiliation) {
+  organization(login: $org) {
+    repositories(first: $first, after: $cursor, orderBy: {field: NAME, direction: ASC}) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        %s
+      }
+    }
+  }
+  %s
+}
+""" % (REPOSITORY_FIELDS, RATE_LIMIT_FRAGMENT)
+
+REPOSITORY_QUERY = """
+query($org: String!, $name: String!, $affiliation: CollaboratorAffiliation) {
+  repository(owner: $org, name: $name) {
+    %s
+  }
+  %s
+}
+""" % (REPOSITORY_FIELDS, RATE_LIMIT_FRAGMENT)
+
+COLLABORATORS_QUERY = """
+query($org: String!, $name: String!, $cursor: String, $affiliation: CollaboratorAffiliation) {
+  repository(owner: $org, name: $name) {
+    collaborators(first: 100, after: $cursor, affiliation: $affiliation) {
+      %s
+    }
+  }
+  %s
+}
+""" % (COLLABORATORS_FRAGMENT, RATE_LIMIT_FRAGMENT)
+
+TEAM_REPOSITORIES_FRAGMENT = """
+  pageInfo {
+    hasNextPage
+    endCursor
+  }
+  edges {
+    permission
+    node {
+      name
+    }
+  }
+"""
+
+TEAMS_QUERY = """
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    teams(first: 50, after: $cursor) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        name
+        slug
+        repositories(first: 100) {
+          %s
+        }
+      }
+    }
+  }
+  %s
+}
+""" % (TEAM_REPOSITORIES_FRAGMENT, RATE_LIMIT_FRAGMENT)
+
+TEAM_REPOSITORIES_QUERY = """
+query($org: String!, $slug: String!, $cursor: String) {
+  organization(login: $org) {
+    team(slug: $slug) {
+      repositories(first: 100, after: $cursor) {
+        %s
+      }
+    }
+  }
+  %s
+}
+""" % (TEAM_REPOSITORIES_FRAGMENT, RATE_LIMIT_FRAGMENT)
+
+
+class GraphQLError(Exception):
+    """Error returned by the GitHub GraphQL API"""
+
+
+class GraphQLGitHubAuditClient(GitHubAuditClient):
+    """Client for auditing GitHub organizations through GraphQL
+
+    Repositories, their settings, CODEOWNERS blobs and collaborator edges are
+    fetched together in paged queries, and team access is read from one
+    organization-wide team query. Returned dictionaries have the same shape
+    as GitHubAuditClient's. Organization settings and team listings still
+    use the REST API.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        concurrency: int = 1,
+        scheduler: Optional[RateLimitScheduler] = None,
+        credentials: Optional[CredentialPool] = None,
+        cache: Optional[HTTPCache] = None,
+        affiliation: Optional[str] = None,
+        graphql_url: str = DEFAULT_GRAPHQL_URL,
+        page_size: int = 50,
+        base_url: str = DEFAULT_BASE_URL,
+        metrics: Optional[AuditMetrics] = None,
+    ):
+        """Initialize the client with authentication token
+
+        Args:
+            token: GitHub personal access token; not needed when
+                credentials is given
+            concurrency: Maximum number of repositories processed in
+                parallel by the organization-wide methods
+            scheduler: Optional rate limit scheduler, e.g. to share one
+                budget between several clients
+            credentials: Optional pool of tokens or GitHub App
+                installations to spread requests across
+            cache: Optional HTTP cache for the REST requests
+            affiliation: Optional collaborator affiliation to audit
+                ("all", "direct" or "outside"); defaults to all
+            graphql_url: URL of the GitHub GraphQL endpoint
+            page_size: Number of repositories fetched per query (max 100)
+            base_url: Base URL of the GitHub REST API
+            metrics: Optional metrics to count and time every request,
+                REST and GraphQL, in
+        """
+        super().__init__(
+            token,
+            concurrency=concurrency,
+            scheduler=scheduler,
+            credentials=credentials,
+            cache=cache,
+            affiliation=affiliation,
+            base_url=base_url,
+            metrics=metrics,
+        )
+        self.graphql_url = graphql_url
+        self.page_size = min(max(1, page_size), 100)
+        self.session = create_session(self.adapter)
+        self.query_count = 0
+        self.query_cost = 0
+        self.rate_limit_remaining = None
+        self._team_access = {}
+        self._team_access_lock = threading.Lock()
+        self._accounting_lock = threading.Lock()
+
+    def query(self, query: str, variables: dict) -> tuple:
+        """Run a GraphQL query and account for its cost
+
+        Args:
+            query: GraphQL query document
+            variables: Query variables
+
+        Returns:
+            Tuple of (data, errors) where errors is the list of partial errors
+
+        Raises:
+            GraphQLError: If the query returned errors and no data
+        """
+        response = self.session.post(
+            self.graphql_url,
+            json={"query": query, "variables": variables},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        body = response.json()
+
+        data = body.get("data")
+        errors = body.get("errors") or []
+        if data is None:
+            messages = "; ".join(e.get("message", str(e)) for e in errors)
+            raise GraphQLError(messages or "GraphQL query returned no data")
+
+        rate_limit = data.get("rateLimit") or {}
+        with self._accounting_lock:
+            self.query_count += 1
+            self.query_cost += rate_limit.get("cost", 0)
+            self.rate_limit_remaining = rate_limit.get("remaining", self.rate_limit_remaining)
+
+        return data, errors
+
+    def list_repositories(self, org_name: str) -> list:
+        """List repository nodes in the organization
+
+        Each node carries the repository settings, CODEOWNERS blobs and the
+        first page of collaborator edges.
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            List of repository node dictionaries
+        """
+        repos = []
+        cursor = None
+
+        while True:
+            data, errors = self.query(
+                REPOSITORIES_QUERY,
+                {
+                    "org": org_name,
+                    "first": self.page_size,
+                    "cursor": cursor,
+                    "affiliation": self._affiliation(),
+                },
+            )
+            connection = data["organization"]["repositories"]
+            nodes = connection["nodes"]
+            _attach_errors(nodes, errors, ["organization", "repositories", "nodes"])
+            repos.extend(nodes)
+
+            if not connection["pageInfo"]["hasNextPage"]:
+                break
+            cursor = connection["pageInfo"]["endCursor"]
+
+        return repos
+
+    def get_repo(self, org_name: str, repo_name: str) -> dict:
+        """Get a single repository node
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+
+        Returns:
+            Repository node dictionary
+        """
+        data, errors = self.query(
+            REPOSITORY_QUERY,
+            {"org": org_name, "name": repo_name, "affiliation": self._affiliation()},
+        )
+        repo = data["repository"]
+        if repo is None:
+            raise GraphQLError(f"Repository {org_name}/{repo_name} not found")
+        _attach_errors([repo], errors, ["repository"], indexed=False)
+
+        return repo
+
+    def get_repositories(self, org_name: str, repos: Optional[list] = None) -> list:
+        """Get all repositories in the organization
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository nodes from list_repositories;
+                fetched when not provided
+
+        Returns:
+            List of RepositoryRecord
+        """
+        if repos is None:
+            repos = self.list_repositories(org_name)
+
+        return [
+            RepositoryRecord(
+                name=repo["name"],
+                full_name=repo["nameWithOwner"],
+                description=repo["description"],
+                private=repo["isPrivate"],
+                archived=repo["isArchived"],
+                disabled=repo["isDisabled"],
+                default_branch=(repo["defaultBranchRef"] or {}).get("name"),
+                visibility=(repo["visibility"] or "").lower() or None,
+                allow_merge_commit=repo["mergeCommitAllowed"],
+                allow_squash_merge=repo["squashMergeAllowed"],
+                allow_rebase_merge=repo["rebaseMergeAllowed"],
+                delete_branch_on_merge=repo["deleteBranchOnMerge"],
+                has_issues=repo["hasIssuesEnabled"],
+                has_projects=repo["hasProjectsEnabled"],
+                has_wiki=repo["hasWikiEnabled"],
+                # Not exposed by the GraphQL API
+                has_downloads=None,
+                **self._repo_timestamps(repo),
+            )
+            for repo in repos
+        ]
+
+    def get_repository_permissions(self, org_name: str, repo_name: str, repo=None) -> dict:
+        """Get permissions for a specific repository
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Optional repository node already fetched for repo_name
+
+        Returns:
+            PermissionsRecord of the repository
+
+        Raises:
+            GraphQLError: If the collaborators of the repository are not visible
+        """
+        if repo is None:
+            repo = self.get_repo(org_name, repo_name)
+
+        connection = repo.get("collaborators")
+        if connection is None:
+            raise GraphQLError(
+                _field_error(repo, "collaborators") or "Collaborators are not accessible"
+            )
+
+        edges = list(connection["edges"])
+        page_info = connection["pageInfo"]
+        while page_info["hasNextPage"]:
+            data, _ = self.query(
+                COLLABORATORS_QUERY,
+                {
+                    "org": org_name,
+                    "name": repo_name,
+                    "cursor": page_info["endCursor"],
+                    "affiliation": self._affiliation(),
+                },
+            )
+            connection = data["repository"]["collaborators"]
+            edges.extend(connection["edges"])
+            page_info = connection["pageInfo"]
+
+        permissions = PermissionsRecord(
+            repository=repo_name,
+            collaborators=[
+                CollaboratorGrant(
+                    edge["node"]["login"],
+                    COLLABORATOR_PERMISSIONS.get(edge["permission"]),
+                    (edge["permission"] or "").lower() or None,
+                )
+                for edge in edges
+            ],
+            teams=list(self.get_team_access(org_name).get(repo_name, [])),
+        )
+
+        return permissions
+
+    def get_team_access(self, org_name: str) -> dict:
+        """Get the teams with access to each repository
+
+        The index is built from one paged organization-wide team query and
+        cached for the lifetime of the client. Threads asking for it while
+        it is being built wait for it rather than build it again.
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Dictionary mapping repository names to lists of TeamGrant
+        """
+        with self._team_access_lock:
+            if org_name not in self._team_access:
+                self._team_access[org_name] = self._fetch_team_access(org_name)
+            return self._team_access[org_name]
+
+    def _fetch_team_access(self, org_name: str) -> dict:
+        """Build the index of the teams with access to each repository
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Dictionary mapping repository names to lists of TeamGrant
+        """
+        access = {}
+        cursor = None
+        while True:
+            data, _ = self.query(TEAMS_QUERY, {"org": org_name, "cursor": cursor})
+            connection = data["organization"]["teams"]
+
+            for team in connection["nodes"]:
+                repositories = team["repositories"]
+                edges = list(repositories["edges"])
+                page_info = repositories["pageInfo"]
+                while page_info["hasNextPage"]:
+                    team_data, _ = self.query(
+                        TEAM_REPOSITORIES_QUERY,
+                        {"org": org_name, "slug": team["slug"], "cursor": page_info["endCursor"]},
+                    )
+                    repositories = team_data["organization"]["team"]["repositories"]
+                    edges.extend(repositories["edges"])
+                    page_info = repositories["pageInfo"]
+
+                for edge in edges:
+                    access.setdefault(edge["node"]["name"], []).append(
+                        TeamGrant(team["name"], TEAM_PERMISSIONS.get(edge["permission"]))
+                    )
+
+            if not connection["pageInfo"]["hasNextPage"]:
+                break
+            cursor = connection["pageInfo"]["endCursor"]
+
+        return access
+
+    def find_codeowners(self, org_name: str, repo_name: str, repo=None) -> Optional[dict]:
+        """Locate the CODEOWNERS file of a repository
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Optional repository node already fetched for repo_name
+
+        Returns:
+            Dictionary with the path and blob sha of the CODEOWNERS file, or
+            None if the repository has none
+        """
+        if repo is None:
+            repo = self.get_repo(org_name, repo_name)
+
+        for field, path in CODEOWNERS_FIELDS.items():
+            blob = repo.get(field)
+            if blob:
+                return {"path": path, "sha": blob["oid"]}
+
+        return None
+
+    def get_codeowners(self, org_name: str, repo_name: str, repo=None) -> Optional[str]:
+        """Get CODEOWNERS file content for a repository
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Optional repository node already fetched for repo_name
+
+        Returns:
+            Content of CODEOWNERS file or None if not found
+        """
+        if repo is None:
+            repo = self.get_repo(org_name, repo_name)
+
+        # Same lookup order as the REST client
+        for field in CODEOWNERS_FIELDS:
+            blob = repo.get(field)
+            if blob and blob.get("text"):
+                return blob["text"]
+
+        return None
+
+    def _affiliation(self) -> Optional[str]:
+        """Get the GraphQL value of the collaborator affiliation filter
+
+        Returns:
+            CollaboratorAffiliation enum value, or None for all collaborators
+        """
+        return COLLABORATOR_AFFILIATIONS.get(self.affiliation) if self.affiliation else None
+
+    @staticmethod
+    def _repo_name(repo) -> str:
+        """Get the name of a repository node from list_repositories
+
+        Args:
+            repo: Repository node dictionary
+
+        Returns:
+            Name of the repository
+        """
+        return repo["name"]
+
+    @staticmethod
+    def _repo_timestamps(repo) -> dict:
+        """Get the change timestamps of a repository node
+
+        Args:
+            repo: Repository node dictionary
+
+        Returns:
+            Dictionary with updated_at and pushed_at
+        """
+        return {
+            "updated_at": format_timestamp(repo["updatedAt"]),
+            "pushed_at": format_timestamp(repo["pushedAt"]),
+        }
+
+
+def _attach_errors(nodes: list, errors: list, prefix: list, indexed: bool = True) -> None:
+    """Attach partial GraphQL errors to the nodes they belong to
+
+    Errors are stored under the node's "_errors" key, mapping the name of
+    the failing field to the error message.
+
+    Args:
+        nodes: Nodes returned by the query
+        errors: Errors returned by the query
+        prefix: Path of the node list within the query result
+        indexed: Whether error paths include an index into nodes
+    """
+    for error in errors:
+        path = error.get("path") or []
+        if path[:len(prefix)] != prefix:
+            continue
+        rest = path[len(prefix):]
+        if indexed:
+            if not rest or not isinstance(rest[0], int) or rest[0] >= len(nodes):
+                continue
+            node, rest = nodes[rest[0]], rest[1:]
+        else:
+            node = nodes[0]
+        if node is not None and rest:
+            node.setdefault("_errors", {})[rest[0]] = error.get("message")
+
+
+def _field_error(node: dict, field: str) -> Optional[str]:
+    """Get the partial error recorded for a field of a node
+
+    Args:
+        node: Node dictionary
+        field: Name of the field
+
+    Returns:
+        Error message or None
+    """
+    return node.get("_errors", {}).get(field)
@@ -0,0 +1,412 @@
+"""GitHub REST client working directly on the API's JSON"""
+
+import base64
+from typing import Iterator, Optional
+
+import requests
+
+from .cache import HTTPCache
+from .client import GitHubAuditClient
+from .credentials import DEFAULT_BASE_URL, REQUEST_TIMEOUT, CredentialPool
+from .metrics import AuditMetrics
+from .projections import (
+    add_team_hierarchy,
+    collaborator_permissions,
+    next_link,
+    org_settings,
+    repo_timestamps,
+    repository_info,
+    team_error,
+    team_info,
+)
+from .ratelimit import RateLimitScheduler
+from .records import PermissionsRecord, RepositoryRecord, TeamGrant
+from .transport import create_session
+
+
+class LeanGitHubAuditClient(GitHubAuditClient):
+    """Client for auditing GitHub organizations without PyGithub objects
+
+    Requests go through one pooled requests session with the same transport
+    adapter as GitHubAuditClient, and results are projected straight from
+    the JSON of the list endpoints. Nothing is completed lazily, so a
+    listing costs exactly one request per page. The exceptions are
+    get_teams and get_repositories: the team listing omits member and
+    repository counts and the repository listing omits the merge settings,
+    so they also cost one request per team or repository, as with
+    PyGithub. Returned dictionaries have the same shape as
+    GitHubAuditClient's, and repository objects are the repositories' JSON
+    dictionaries.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        concurrency: int = 1,
+        scheduler: Optional[RateLimitScheduler] = None,
+        credentials: Optional[CredentialPool] = None,
+        cache: Optional[HTTPCache] = None,
+        affiliation: Optional[str] = None,
+        base_url: str = DEFAULT_BASE_URL,
+        per_page: int = 100,
+        metrics: Optional[AuditMetrics] = None,
+    ):
+        """Initialize the client with authentication token
+
+        Args:
+            token: GitHub personal access token; not needed when
+                credentials is given
+            concurrency: Maximum number of repositories processed in
+                parallel by the organization-wide methods
+            scheduler: Optional rate limit scheduler, e.g. to share one
+                budget between several clients
+            credentials: Optional pool of tokens or GitHub App
+                installations to spread requests across
+            cache: Optional HTTP cache; unchanged resources are then
+                revalidated with conditional requests
+            affiliation: Optional collaborator affiliation to audit
+                ("all", "direct" or "outside"); defaults to all
+            base_url: Base URL of the GitHub REST API
+            per_page: Page size used for list endpoints (max 100)
+            metrics: Optional metrics to count and time every request in
+        """
+        super().__init__(
+            token,
+            concurrency=concurrency,
+            scheduler=scheduler,
+            credentials=credentials,
+            cache=cache,
+            affiliation=affiliation,
+            base_url=base_url,
+            metrics=metrics,
+        )
+        self.per_page = min(max(1, per_page), 100)
+        self.session = create_session(self.adapter)
+        self.session.headers["Accept"] = "application/vnd.github+json"
+
+    def _request(self, path: str, params: Optional[dict] = None) -> tuple:
+        """Perform a GET request against the API
+
+        Args:
+            path: API path or absolute URL
+            params: Optional query parameters
+
+        Returns:
+            Tuple of (decoded JSON body, next page URL or None)
+
+        Raises:
+            requests.HTTPError: If the API returns an error status
+        """
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json(), next_link(response.headers)
+
+    def _get(self, path: str) -> dict:
+        """Get a single API resource
+
+        Args:
+            path: API path
+
+        Returns:
+            Decoded JSON body
+        """
+        data, _ = self._request(path)
+        return data
+
+    def _paginate(self, path: str, params: Optional[dict] = None) -> list:
+        """Get every item of a paginated list endpoint
+
+        Args:
+            path: API path
+            params: Optional query parameters
+
+        Returns:
+            List of items from all pages
+        """
+        return list(self._iter_pages(path, params))
+
+    def _iter_pages(self, path: str, params: Optional[dict] = None) -> Iterator[dict]:
+        """Get the items of a paginated list endpoint page by page
+
+        Args:
+            path: API path
+            params: Optional query parameters
+
+        Yields:
+            Items, with the next page fetched once the previous one is used up
+        """
+        params = dict(params or {}, per_page=self.per_page)
+        items, next_url = self._request(path, params)
+        yield from items
+
+        while next_url:
+            items, next_url = self._request(next_url)
+            yield from items
+
+    def get_organization(self, org_name: str) -> dict:
+        """Get organization data
+
+        The organization is fetched once and cached for the lifetime of
+        the client.
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Organization JSON object
+        """
+        if org_name not in self._organizations:
+            self._organizations[org_name] = self._get(f"/orgs/{org_name}")
+        return self._organizations[org_name]
+
+    def list_repositories(self, org_name: str) -> list:
+        """List repository objects in the organization
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            List of repository JSON objects
+        """
+        return self._paginate(f"/orgs/{org_name}/repos")
+
+    def get_repo(self, org_name: str, repo_name: str) -> dict:
+        """Get a single repository object
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+
+        Returns:
+            Repository JSON object
+        """
+        return self._get(f"/repos/{org_name}/{repo_name}")
+
+    def get_org_settings(self, org_name: str) -> dict:
+        """Get organization settings
+
+        Args:
+            org_name: Name of the organization
+
+        Returns:
+            Dictionary containing organization settings
+        """
+        return org_settings(self.get_organization(org_name))
+
+    def get_teams(self, org_name: str, include_members: bool = False) -> list:
+        """Get all teams in the organization
+
+        The team listing omits member and repository counts, so besides
+        the pages of the listing, each team is also fetched once, in
+        parallel up to the concurrency: N teams cost N extra requests.
+
+        Args:
+            org_name: Name of the organization
+            include_members: Whether to add members and the team hierarchy
+
+        Returns:
+            List of TeamRecord
+        """
+        listing = self._paginate(f"/orgs/{org_name}/teams")
+        details = self._map(
+            lambda team: self._get(f"/orgs/{org_name}/teams/{team['slug']}"), listing
+        )
+        teams = [team_info(detail or team) for team, detail in zip(listing, details)]
+
+        if include_members:
+            add_team_hierarchy(teams, listing)
+            listings = self._map(
+                lambda team: self._member_roles(org_name, team["slug"]),
+                teams,
+                on_error=lambda team, e: self.errors.append(team_error(org_name, team["slug"], e)),
+            )
+            for team, member_roles in zip(teams, listings):
+                if member_roles is not None:
+                    team["members"] = self._team_members(member_roles)
+
+        return teams
+
+    def get_team_members(self, org_name: str, team_slug: str) -> list:
+        """Get members of a specific team
+
+        Args:
+            org_name: Name of the organization
+            team_slug: Slug of the team
+
+        Returns:
+            List of team member information
+        """
+        return self._team_members(self._member_roles(org_name, team_slug))
+
+    def _member_roles(self, org_name: str, team_slug: str) -> list:
+        """Get the logins and roles of a team's members
+
+        Args:
+            org_name: Name of the organization
+            team_slug: Slug of the team
+
+        Returns:
+            List of (login, role) tuples
+        """
+        path = f"/orgs/{org_name}/teams/{team_slug}/members"
+        maintainers = {m["login"] for m in self._paginate(path, {"role": "maintainer"})}
+        return [
+            (m["login"], "maintainer" if m["login"] in maintainers else "member")
+            for m in self._paginate(path, {"role": "all"})
+        ]
+
+    def get_user_names(self, logins: list) -> dict:
+        """Get the display names of users
+
+        Args:
+            logins: Logins of the users
+
+        Returns:
+            Dictionary mapping logins to display names
+        """
+        missing = [login for login in dict.fromkeys(logins) if login not in self._user_names]
+        users = self._map(lambda login: self._get(f"/users/{login}"), missing)
+        self._user_names.update(
+            (login, user.get("name") if user else None) for login, user in zip(missing, users)
+        )
+        return {login: self._user_names.get(login) for login in logins}
+
+    def get_repositories(self, org_name: str, repos: Optional[list] = None) -> list:
+        """Get all repositories in the organization
+
+        The repository listing omits the merge settings, so each repository
+        is also fetched once, in parallel up to the concurrency. Failures
+        are recorded in self.errors, and the repository keeps the fields of
+        the listing.
+
+        Args:
+            org_name: Name of the organization
+            repos: Optional repository objects from list_repositories;
+                fetched when not provided
+
+        Returns:
+            List of RepositoryRecord
+        """
+        if repos is None:
+            repos = self.list_repositories(org_name)
+        details = self._map_repos(
+            org_name, "repositories", lambda repo: self._get(f"/repos/{repo['full_name']}"), repos
+        )
+        return [repository_info(detail or repo) for repo, detail in details]
+
+    def iter_repositories(self, org_name: str) -> Iterator[RepositoryRecord]:
+        """Get the repositories in the organization while paginating
+
+        Args:
+            org_name: Name of the organization
+
+        Yields:
+            RepositoryRecord of every repository, as each page arrives and
+            its repositories are fetched as in get_repositories
+        """
+        page = []
+        for repo in self._iter_pages(f"/orgs/{org_name}/repos"):
+            page.append(repo)
+            if len(page) == self.per_page:
+                yield from self.get_repositories(org_name, page)
+                page = []
+        yield from self.get_repositories(org_name, page)
+
+    def get_repository_permissions(self, org_name: str, repo_name: str, repo=None) -> dict:
+        """Get permissions for a specific repository
+
+        Args:
+            org_name: Name of the organization
+            repo_name: Name of the repository
+            repo: Unused; accepted for parity with GitHubAuditClient
+
+        Returns:
+            PermissionsRecord of the repository
+        """
+        path = f"/repos/{org_name}/{repo_name}"
+        params = {"affiliation": self.affiliation} if self.affiliation else None
+
+        return PermissionsRecord(
+            repository=repo_name,
+            collaborators=[
+                collaborator_permissions(collab)
+                for collab in self._paginate(f"{path}/collaborators", params)
+            ],
+            teams=[
+                TeamGrant(team.get("name"), team.get("permission"))
+                for team in self._paginate(f"{path}/teams")
+            ],
+        )
+
+    def _git_tree(self, repo, sha: Optional[str] = None) -> Optional[tuple]:
+        """List a git tree of a repository
+
+        Args:
+            repo: Repository dictionary
+            sha: SHA of the tree; the root tree of the default branch when
+                not given
+
+        Returns:
+            Tuple of (tree sha, dictionary mapping entry paths to (type,
+            sha) tuples), or None if the repository has no such tree
+        """
+        try:
+            tree = self._get(
+                f"/repos/{repo['full_name']}/git/trees/{sha or repo['default_branch']}"
+            )
+        except requests.HTTPError as e:
+            # Missing branches and empty repositories have no tree
+            if e.response.status_code in (404, 409):
+                return None
+            raise
+        return tree["sha"], {entry["path"]: (entry["type"], entry["sha"]) for entry in tree["tree"]}
+
+    def _git_blob(self, repo, sha: str) -> str:
+        """Download a git blob of a repository as text
+
+        Args:
+            repo: Repository dictionary
+            sha: SHA of the blob
+
+        Returns:
+            Content of the blob
+        """
+        blob = self._get(f"/repos/{repo['full_name']}/git/blobs/{sha}")
+        return base64.b64decode(blob["content"]).decode("utf-8")
+
+    @staticmethod
+    def _repo_name(repo) -> str:
+        """Get the name of a repository dictionary
+
+        Args:
+            repo: Repository dictionary
+
+        Returns:
+            Name of the repository
+        """
+        return repo["name"]
+
+    @staticmethod
+    def _repo_full_name(repo) -> str:
+        """Get the owner/name of a repository dictionary
+
+        Args:
+            repo: Repository dictionary
+
+        Returns:
+            Full name of the repository
+        """
+        return repo["full_name"]
+
+    @staticmethod
+    def _repo_timestamps(repo) -> dict:
+        """Get the change timestamps of a repository dictionary
+
+        Args:
+            repo: Repository dictionary
+
+        Returns:
+            Dictionary with updated_at and pushed_at
+        """
+        return repo_timestamps(repo)
@@ -0,0 +1,248 @@
+"""Request and section instrumentation of audits"""
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from urllib.parse import urlparse
+
+
+# Upper bounds of the request latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# Path segments followed by an identifier, and the placeholder replacing
+# the identifier in endpoint templates
+PARAMETERS = {
+    "orgs": "{org}",
+    "organizations": "{org_id}",
+    "users": "{username}",
+    "teams": "{team}",
+    "team": "{team_id}",
+    "members": "{username}",
+    "memberships": "{username}",
+    "collaborators": "{username}",
+    "trees": "{sha}",
+    "blobs": "{sha}",
+    "repositories": "{repository_id}",
+}
+
+# Prefix of the API paths of GitHub Enterprise Server
+ENTERPRISE_PREFIX = re.compile(r"^/api(/v3)?(?=/)")
+
+
+def endpoint_template(url: str) -> str:
+    """Get the endpoint template of a request URL
+
+    Identifiers in the path are replaced with placeholders, so that all
+    requests to one endpoint are counted together, for example
+    "/repos/acme/api/collaborators?page=2" becomes
+    "/repos/{owner}/{repo}/collaborators".
+
+    Args:
+        url: Request URL or path
+
+    Returns:
+        Endpoint template
+    """
+    path = ENTERPRISE_PREFIX.sub("", urlparse(url).path.rstrip("/"))
+    segments = [segment for segment in path.split("/") if segment]
+    template = []
+    i = 0
+    while i < len(segments):
+        segment = segments[i]
+        template.append(segment if not segment.isdigit() else "{id}")
+        i += 1
+        if segment == "contents":
+            if i < len(segments):
+                template.append("{path}")
+            break
+        if segment == "repos":
+            template.extend(["{owner}", "{repo}"][: len(segments) - i])
+            i += 2
+        elif segment in PARAMETERS and i < len(segments):
+            template.append(PARAMETERS[segment])
+            i += 1
+    return "/" + "/".join(template)
+
+
+class AuditMetrics:
+    """Counts and timings of API requests and audit sections
+
+    Clients record every request attempt, including retried and failed
+    ones, by HTTP method, endpoint template and status. Failed attempts
+    without a response have the status "error". The auditor records the
+    wall time of each section it runs. Instances are thread-safe, so one
+    can be shared by all clients of an audit.
+    """
+
+    def __init__(self):
+        """Create empty metrics"""
+        self.endpoints = {}
+        self.sections = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, method: str, url: str, status, seconds: float) -> None:
+        """Record one request attempt
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            status: HTTP status code, or None if no response was received
+            seconds: Time until the response was received
+        """
+        key = (method.upper(), endpoint_template(url))
+        status = "error" if status is None else str(status)
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = {
+                    "statuses": {},
+                    "seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "buckets": [0] * len(LATENCY_BUCKETS),
+                }
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats["buckets"][index] += 1
+                    break
+
+    def record_section(self, name: str, seconds: float) -> None:
+        """Add wall time to an audit section
+
+        Args:
+            name: Section name
+            seconds: Time spent in the section
+        """
+        with self._lock:
+            self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as an audit section
+
+        Args:
+            name: Section name
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_section(name, time.perf_counter() - started)
+
+    def summary(self) -> Dict:
+        """Get the metrics as plain data
+
+        Returns:
+            Dictionary with the total number and time of requests, the
+            metrics of each endpoint, most time-consuming first, and the
+            seconds spent in each section
+        """
+        with self._lock:
+            endpoints = []
+            for (method, endpoint), stats in self.endpoints.items():
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                    cumulative += count
+                    buckets[_bound_label(bound)] = cumulative
+                endpoints.append({
+                    "method": method,
+                    "endpoint": endpoint,
+                    "requests": cumulative,
+                    "statuses": dict(sorted(stats["statuses"].items())),
+                    "seconds": round(stats["seconds"], 6),
+                    "max_seconds": round(stats["max_seconds"], 6),
+                    "buckets": buckets,
+                })
+            sections = {name: round(seconds, 6) for name, seconds in self.sections.items()}
+
+        endpoints.sort(key=lambda stats: (-stats["seconds"], stats["endpoint"], stats["method"]))
+        return {
+            "requests": sum(stats["requests"] for stats in endpoints),
+            "request_seconds": round(sum(stats["seconds"] for stats in endpoints), 6),
+            "endpoints": endpoints,
+            "sections": sections,
+        }
+
+    def to_json(self) -> str:
+        """Render the metrics as JSON
+
+        Returns:
+            JSON document of summary()
+        """
+        return json.dumps(self.summary(), indent=2) + "\n"
+
+    def to_openmetrics(self) -> str:
+        """Render the metrics in the OpenMetrics text format
+
+        Returns:
+            OpenMetrics exposition with a request counter, a request
+            latency histogram and a section duration gauge
+        """
+        summary = self.summary()
+        lines = [
+            "# TYPE github_audit_requests counter",
+            "# HELP github_audit_requests GitHub API requests by endpoint and status.",
+        ]
+        for stats in summary["endpoints"]:
+            for status, count in stats["statuses"].items():
+                labels = _labels(method=stats["method"], endpoint=stats["endpoint"], status=status)
+                lines.append(f"github_audit_requests_total{labels} {count}")
+
+        lines += [
+            "# TYPE github_audit_request_duration_seconds histogram",
+            "# UNIT github_audit_request_duration_seconds seconds",
+            "# HELP github_audit_request_duration_seconds GitHub API request latency by endpoint.",
+        ]
+        for stats in summary["endpoints"]:
+            name = "github_audit_request_duration_seconds"
+            endpoint = {"method": stats["method"], "endpoint": stats["endpoint"]}
+            for bound, count in stats["buckets"].items():
+                lines.append(f"{name}_bucket{_labels(**endpoint, le=bound)} {count}")
+            lines.append(f"{name}_count{_labels(**endpoint)} {stats['requests']}")
+            lines.append(f"{name}_sum{_labels(**endpoint)} {stats['seconds']}")
+
+        lines += [
+            "# TYPE github_audit_section_duration_seconds gauge",
+            "# UNIT github_audit_section_duration_seconds seconds",
+            "# HELP github_audit_section_duration_seconds Wall time of each audit section.",
+        ]
+        for section, seconds in summary["sections"].items():
+            lines.append(
+                f"github_audit_section_duration_seconds{_labels(section=section)} {seconds}"
+            )
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the metrics to a file
+
+        Files ending in .json get JSON, all others the OpenMetrics text
+        format.
+
+        Args:
+            path: File to write
+        """
+        text = self.to_json() if path.lower().endswith(".json") else self.to_openmetrics()
+        with open(path, "w") as f:
+            f.write(text)
+
+
+def _bound_label(bound: float) -> str:
+    """Format a histogram bucket bound as an OpenMetrics le label"""
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _labels(**labels: str) -> str:
+    """Format OpenMetrics labels, escaping their values"""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
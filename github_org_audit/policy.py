@@ -0,0 +1,613 @@
+"""Declarative policy rules evaluated over audit results"""
+
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import yaml
+
+from .access import PERMISSION_ALIASES, PERMISSION_LEVELS, permission_rank
+
+
+# Finding severities, lowest first
+SEVERITIES = ["info", "low", "medium", "high", "critical"]
+
+# Tables rules can target
+TARGETS = ["settings", "repositories", "teams", "collaborators", "team_grants"]
+
+# Audit section each table is built from
+SECTIONS = {
+    "settings": "settings",
+    "repositories": "repositories",
+    "teams": "teams",
+    "collaborators": "permissions",
+    "team_grants": "permissions",
+}
+
+
+class PolicyError(Exception):
+    """Raised when a policy file is invalid"""
+
+
+class MissingSection(PolicyError):
+    """Raised when a rule needs a field derived from a section that was not audited
+
+    Attributes:
+        section: Name of the missing audit section
+    """
+
+    def __init__(self, section: str):
+        super().__init__(f"{section} was not audited")
+        self.section = section
+
+
+class Rule(NamedTuple):
+    """One compiled policy rule"""
+
+    id: str
+    target: str
+    severity: str
+    description: str
+    where: Optional[Callable]
+    require: Callable
+
+
+class Table:
+    """Column-oriented view of one kind of audited object
+
+    Columns are extracted from the rows once, on first use, and the distinct
+    values of a column are numbered. A condition is then checked once per
+    distinct value instead of once per row, the matching rows become the set
+    bits of an integer, and conditions are combined with bit operations.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rows: Optional[list] = None,
+        columns: Optional[Dict[str, list]] = None,
+        subject: Optional[Callable] = None,
+        missing: Optional[Dict[str, str]] = None,
+    ):
+        """Create a table
+
+        Args:
+            name: Name of the table
+            rows: Records or dictionaries to extract columns from
+            columns: Columns that are already extracted, by field name
+            subject: Function describing the row at an index in findings
+            missing: Fields derived from audit sections the results do not
+                have, mapped to the name of the section; a key ending in "."
+                stands for every field with that prefix
+        """
+        self.name = name
+        self.rows = rows or []
+        self.columns = dict(columns or {})
+        self.missing = dict(missing or {})
+        if rows is None:
+            self.length = len(next(iter(self.columns.values()), []))
+        else:
+            self.length = len(self.rows)
+        self.all = (1 << self.length) - 1
+        self.subject = subject or (lambda index: str(index))
+        self.links = {}
+        self._codes = {}
+        self._fields = None
+
+    def link(self, prefix: str, key: str, other: "Table", other_key: str) -> None:
+        """Make another table's fields available as "prefix.field"
+
+        Args:
+            prefix: Prefix of the joined fields
+            key: Field of this table naming the joined row
+            other: Joined table
+            other_key: Field of the other table matching key
+        """
+        self.links[prefix] = (key, other, other_key)
+
+    def fields(self) -> set:
+        """Get the names of the table's fields"""
+        if self._fields is None:
+            fields = set(self.columns) | set(self.missing)
+            for row in self.rows[:1]:
+                # Records also have the optional fields they leave unset
+                fields.update(getattr(row, "__slots__", None) or row.keys())
+            for prefix, (_, other, _) in self.links.items():
+                fields.update(f"{prefix}.{field}" for field in other.fields())
+            self._fields = fields
+        return self._fields
+
+    def column(self, field: str) -> list:
+        """Get the values of a field in row order
+
+        Args:
+            field: Field name, or "prefix.field" for a linked table
+
+        Returns:
+            List of values; None where a row lacks the field
+
+        Raises:
+            MissingSection: If the field is derived from a section that was
+                not audited
+            PolicyError: If the table has rows but no such field
+        """
+        if field in self.columns:
+            return self.columns[field]
+        prefix, _, rest = field.partition(".")
+        section = self.missing.get(field) or (rest and self.missing.get(f"{prefix}."))
+        if section:
+            raise MissingSection(section)
+        if self.length and field not in self.fields():
+            raise PolicyError(f"{self.name} has no field {field}")
+
+        if rest and prefix in self.links:
+            key, other, other_key = self.links[prefix]
+            positions = {value: i for i, value in enumerate(other.column(other_key))}
+            values = other.column(rest)
+            column = [
+                values[positions[name]] if name in positions else None
+                for name in self.column(key)
+            ]
+        else:
+            column = [
+                row.get(field) if isinstance(row, dict) else getattr(row, field, None)
+                for row in self.rows
+            ]
+        self.columns[field] = column
+        return column
+
+    def mask(self, field: str, predicate: Callable) -> int:
+        """Get the rows whose value of a field passes a predicate
+
+        Args:
+            field: Field name
+            predicate: Function of a value returning whether it passes
+
+        Returns:
+            Bit mask of the passing rows
+        """
+        codes, values = self._encode(field)
+        passing = [code for code, value in enumerate(values) if _passes(predicate, value)]
+        if not passing:
+            return 0
+        if len(passing) == len(values):
+            return self.all
+
+        if isinstance(codes, bytes):
+            # One C-level translation per condition instead of a loop per row
+            table = bytearray(b"0" * 256)
+            for code in passing:
+                table[code] = ord("1")
+            bits = codes.translate(table)
+        else:
+            passing = set(passing)
+            bits = bytes(49 if code in passing else 48 for code in codes)
+        return int(bits[::-1], 2)
+
+    def positions(self, mask: int) -> List[int]:
+        """Get the indexes of the rows in a bit mask"""
+        bits = bin(mask)[:1:-1]
+        return [match.start() for match in re.finditer("1", bits)]
+
+    def _encode(self, field: str) -> tuple:
+        """Give every distinct value of a field a small integer code
+
+        Args:
+            field: Field name
+
+        Returns:
+            Tuple of the codes in row order, as bytes when there are at most
+            256 distinct values, and the value of each code
+        """
+        if field not in self._codes:
+            column = self.column(field)
+            index = {}
+            try:
+                codes = [index.setdefault(value, len(index)) for value in column]
+                values = list(index)
+            except TypeError:
+                # Lists and other unhashable values are numbered by their repr
+                index = {}
+                codes = [index.setdefault(_hashable(value), len(index)) for value in column]
+                values = [None] * len(index)
+                for code, value in zip(codes, column):
+                    values[code] = value
+            self._codes[field] = (bytes(codes) if len(values) <= 256 else codes, values)
+        return self._codes[field]
+
+
+class Policy:
+    """Compiled set of policy rules
+
+    A policy file has a list of rules, each targeting one table of the
+    audit results:
+
+        rules:
+          - id: two-factor-required
+            target: settings
+            severity: critical
+            description: Members must use two-factor authentication
+            require:
+              two_factor_requirement_enabled: true
+
+    Every row of the target that matches the optional where condition and
+    does not match the require condition is a finding.
+    """
+
+    def __init__(self, rules: List[Dict]):
+        """Compile rules
+
+        Args:
+            rules: Rule dictionaries as they appear in a policy file
+
+        Raises:
+            PolicyError: If a rule is invalid
+        """
+        self.rules = []
+        self.skipped = []
+        seen = set()
+        for number, rule in enumerate(rules, start=1):
+            if not isinstance(rule, dict):
+                raise PolicyError(f"rule {number} must be a mapping")
+            rule_id = rule.get("id") or f"rule-{number}"
+            if rule_id in seen:
+                raise PolicyError(f"duplicate rule id {rule_id}")
+            seen.add(rule_id)
+
+            unknown = set(rule) - {"id", "target", "severity", "description", "where", "require"}
+            if unknown:
+                raise PolicyError(f"rule {rule_id}: unknown key {sorted(unknown)[0]}")
+            if rule.get("target") not in TARGETS:
+                raise PolicyError(f"rule {rule_id}: target must be one of {', '.join(TARGETS)}")
+            severity = rule.get("severity", "medium")
+            if severity not in SEVERITIES:
+                raise PolicyError(
+                    f"rule {rule_id}: severity must be one of {', '.join(SEVERITIES)}"
+                )
+            if not rule.get("require"):
+                raise PolicyError(f"rule {rule_id}: require is missing")
+
+            try:
+                where = compile_condition(rule["where"]) if rule.get("where") else None
+                require = compile_condition(rule["require"])
+            except PolicyError as e:
+                raise PolicyError(f"rule {rule_id}: {e}") from None
+            self.rules.append(
+                Rule(rule_id, rule["target"], severity, rule.get("description", ""), where, require)
+            )
+
+    @classmethod
+    def from_file(cls, path: str) -> "Policy":
+        """Load and compile a YAML policy file
+
+        Args:
+            path: Path to the policy file
+
+        Returns:
+            Policy
+
+        Raises:
+            PolicyError: If the file is not a valid policy
+        """
+        with open(path, "r") as f:
+            try:
+                data = yaml.safe_load(f) or {}
+            except yaml.YAMLError as e:
+                raise PolicyError(f"{path} is not valid YAML: {e}") from None
+        if not isinstance(data, dict) or not isinstance(data.get("rules"), list):
+            raise PolicyError(f"{path} must have a list of rules")
+        return cls(data["rules"])
+
+    def evaluate(self, results: Dict) -> List[Dict]:
+        """Evaluate every rule over audit results
+
+        Rules whose target was not audited, or that test a field derived
+        from a section that was not audited (such as has_codeowners without
+        CODEOWNERS), produce no findings. They are listed in self.skipped
+        with rule, target and reason instead.
+
+        Args:
+            results: Results from GitHubOrgAuditor.audit
+
+        Returns:
+            Findings with rule, severity, target, subject and description,
+            most severe first
+
+        Raises:
+            PolicyError: If a rule names a field the target does not have
+        """
+        tables = build_tables(results, [rule.target for rule in self.rules])
+        findings = []
+        self.skipped = []
+        for rule in self.rules:
+            table = tables.get(rule.target)
+            if table is None:
+                self._skip(rule, f"{SECTIONS[rule.target]} was not audited")
+                continue
+            if not table.length:
+                continue
+            try:
+                selected = rule.where(table) if rule.where else table.all
+                failing = selected & ~rule.require(table)
+            except MissingSection as e:
+                self._skip(rule, str(e))
+                continue
+            except PolicyError as e:
+                raise PolicyError(f"rule {rule.id}: {e}") from None
+            for index in table.positions(failing):
+                findings.append({
+                    "rule": rule.id,
+                    "severity": rule.severity,
+                    "target": rule.target,
+                    "subject": table.subject(index),
+                    "description": rule.description,
+                })
+
+        findings.sort(key=lambda f: -SEVERITIES.index(f["severity"]))
+        return findings
+
+    def _skip(self, rule: Rule, reason: str) -> None:
+        """Record a rule that could not be evaluated
+
+        Args:
+            rule: Skipped rule
+            reason: Why the rule was skipped
+        """
+        self.skipped.append({"rule": rule.id, "target": rule.target, "reason": reason})
+
+
+def compile_condition(condition) -> Callable:
+    """Compile a condition into a function of a table returning a row mask
+
+    A condition is a mapping of field names to expected values, all of
+    which must match. A scalar expects that value, a list any of its
+    values, and a mapping of operators (equals, not_equals, in, not_in,
+    matches, gte, lte, at_least, at_most, empty) all of them. The keys
+    all, any and not combine nested conditions.
+
+    Args:
+        condition: Condition from a policy file
+
+    Returns:
+        Function of a Table returning the bit mask of the matching rows
+
+    Raises:
+        PolicyError: If the condition is invalid
+    """
+    if not isinstance(condition, dict) or not condition:
+        raise PolicyError(f"condition must be a non-empty mapping, not {condition!r}")
+
+    parts = []
+    for key, expected in condition.items():
+        if key in ("all", "any"):
+            if not isinstance(expected, list) or not expected:
+                raise PolicyError(f"{key} must be a non-empty list of conditions")
+            parts.append(_combine(key, [compile_condition(c) for c in expected]))
+        elif key == "not":
+            parts.append(_negate(compile_condition(expected)))
+        else:
+            parts.append(_field_mask(key, compile_value(expected)))
+    return _combine("all", parts)
+
+
+def compile_value(expected) -> Callable:
+    """Compile the expected value of a field into a predicate
+
+    Args:
+        expected: Scalar, list or mapping of operators
+
+    Returns:
+        Function of a value returning whether it matches
+
+    Raises:
+        PolicyError: If an operator is unknown or has an invalid argument
+    """
+    if isinstance(expected, list):
+        return _operator("in", expected)
+    if not isinstance(expected, dict):
+        return _operator("equals", expected)
+
+    predicates = [_operator(name, argument) for name, argument in expected.items()]
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda value: all(predicate(value) for predicate in predicates)
+
+
+def fails(findings: List[Dict], threshold: Optional[str]) -> bool:
+    """Check whether any finding is at least as severe as a threshold
+
+    Args:
+        findings: Findings from Policy.evaluate
+        threshold: Severity name, or None to never fail
+
+    Returns:
+        True if a finding reaches the threshold
+    """
+    if threshold not in SEVERITIES:
+        return False
+    rank = SEVERITIES.index(threshold)
+    return any(SEVERITIES.index(f["severity"]) >= rank for f in findings)
+
+
+def build_tables(results: Dict, targets: Optional[List[str]] = None) -> Dict[str, Table]:
+    """Build the tables rules are evaluated over
+
+    Collaborators and team grants are flattened from the permissions, with
+    one row per grant and the highest permission level as "permission";
+    their "repository." fields are those of the granted repository.
+    Repositories get a "has_codeowners" field when CODEOWNERS was audited;
+    otherwise the field is known but missing, and rules testing it are
+    skipped.
+
+    Args:
+        results: Results from GitHubOrgAuditor.audit
+        targets: Only build these tables (default: all)
+
+    Returns:
+        Dictionary mapping target names to tables of the audited sections
+    """
+    targets = set(TARGETS if targets is None else targets)
+    tables = {}
+    organization = results.get("organization")
+
+    if "settings" in results and "settings" in targets:
+        tables["settings"] = Table(
+            "settings", [results["settings"]], subject=lambda i: organization
+        )
+
+    if "repositories" in results:
+        repos = results["repositories"]
+        columns = {}
+        missing = {}
+        if "codeowners" in results:
+            columns["has_codeowners"] = [r["name"] in results["codeowners"] for r in repos]
+        else:
+            missing["has_codeowners"] = "codeowners"
+        tables["repositories"] = Table(
+            "repositories", repos, columns, subject=lambda i: repos[i]["name"], missing=missing
+        )
+
+    if "teams" in results and "teams" in targets:
+        teams = results["teams"]
+        tables["teams"] = Table("teams", teams, subject=lambda i: teams[i]["slug"])
+
+    if "permissions" in results and "collaborators" in targets:
+        collaborators = {"repository": [], "login": [], "permission": [], "role_name": []}
+        levels = {}
+        for perms in results["permissions"]:
+            repository = perms["repository"]
+            for collaborator in perms.get("collaborators", []):
+                granted = (collaborator.get("permissions"), collaborator.get("role_name"))
+                if granted not in levels:
+                    # role_name carries triage and maintain, which the flags do not
+                    rank = max(permission_rank(granted[0]), permission_rank(granted[1]))
+                    levels[granted] = PERMISSION_LEVELS[rank - 1] if rank else None
+                collaborators["repository"].append(repository)
+                collaborators["login"].append(collaborator["login"])
+                collaborators["permission"].append(levels[granted])
+                collaborators["role_name"].append(granted[1])
+        tables["collaborators"] = Table(
+            "collaborators",
+            columns=collaborators,
+            subject=lambda i: f"{collaborators['login'][i]} on {collaborators['repository'][i]}",
+        )
+
+    if "permissions" in results and "team_grants" in targets:
+        grants = {"repository": [], "team": [], "permission": []}
+        for perms in results["permissions"]:
+            for team in perms.get("teams", []):
+                permission = team.get("permission")
+                grants["repository"].append(perms["repository"])
+                grants["team"].append(team["name"])
+                grants["permission"].append(PERMISSION_ALIASES.get(permission, permission))
+        tables["team_grants"] = Table(
+            "team_grants",
+            columns=grants,
+            subject=lambda i: f"{grants['team'][i]} on {grants['repository'][i]}",
+        )
+
+    # Grants see the fields of their repository as "repository.<field>"
+    for name in ("collaborators", "team_grants"):
+        if name not in tables:
+            continue
+        if "repositories" in tables:
+            tables[name].link("repository", "repository", tables["repositories"], "name")
+        else:
+            tables[name].missing["repository."] = "repositories"
+    if "repositories" in tables and "repositories" not in targets:
+        del tables["repositories"]
+
+    return tables
+
+
+def _field_mask(field: str, predicate: Callable) -> Callable:
+    """Build the condition of one field"""
+    return lambda table: table.mask(field, predicate)
+
+
+def _combine(how: str, parts: List[Callable]) -> Callable:
+    """Build a condition matching all or any of several conditions"""
+    if len(parts) == 1:
+        return parts[0]
+
+    def combined(table):
+        masks = (part(table) for part in parts)
+        if how == "any":
+            mask = 0
+            for part in masks:
+                mask |= part
+        else:
+            mask = table.all
+            for part in masks:
+                mask &= part
+        return mask
+
+    return combined
+
+
+def _negate(condition: Callable) -> Callable:
+    """Build a condition matching the rows another one does not"""
+    return lambda table: table.all & ~condition(table)
+
+
+def _operator(name: str, argument) -> Callable:
+    """Build the predicate of one operator
+
+    Args:
+        name: Operator name
+        argument: Operator argument from the policy file
+
+    Returns:
+        Function of a value returning whether it matches
+
+    Raises:
+        PolicyError: If the operator is unknown or the argument invalid
+    """
+    if name == "equals":
+        return lambda value: value == argument
+    if name == "not_equals":
+        return lambda value: value != argument
+    if name in ("in", "not_in"):
+        if not isinstance(argument, list):
+            raise PolicyError(f"{name} needs a list, not {argument!r}")
+        if name == "in":
+            return lambda value: value in argument
+        return lambda value: value not in argument
+    if name == "matches":
+        try:
+            pattern = re.compile(str(argument))
+        except re.error as e:
+            raise PolicyError(f"invalid pattern {argument!r}: {e}") from None
+        return lambda value: value is not None and pattern.search(str(value)) is not None
+    if name in ("gte", "lte"):
+        if isinstance(argument, bool) or not isinstance(argument, (int, float)):
+            raise PolicyError(f"{name} needs a number, not {argument!r}")
+        if name == "gte":
+            return lambda value: value is not None and value >= argument
+        return lambda value: value is not None and value <= argument
+    if name in ("at_least", "at_most"):
+        rank = permission_rank(argument)
+        if not rank:
+            raise PolicyError(f"{name} needs a permission level, not {argument!r}")
+        if name == "at_least":
+            return lambda value: permission_rank(value) >= rank
+        return lambda value: permission_rank(value) <= rank
+    if name == "empty":
+        return lambda value: (not value) == bool(argument)
+    raise PolicyError(f"unknown operator {name}")
+
+
+def _passes(predicate: Callable, value) -> bool:
+    """Apply a predicate, treating values it cannot compare as not matching"""
+    try:
+        return bool(predicate(value))
+    except TypeError:
+        return False
+
+
+def _hashable(value):
+    """Get a hashable stand-in for a column value"""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ("unhashable", repr(value))
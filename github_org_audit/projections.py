@@ -0,0 +1,249 @@
+"""Projections of GitHub REST API JSON onto audit records
+
+The helpers here are shared by the clients: they work on the JSON the API
+returns and on plain dictionaries, without performing requests themselves.
+"""
+
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from requests.utils import parse_header_links
+
+from .records import CollaboratorGrant, RepositoryRecord, TeamRecord
+
+
+# Locations GitHub reads CODEOWNERS from, in the order they are checked
+CODEOWNERS_PATHS = [
+    "CODEOWNERS",
+    ".github/CODEOWNERS",
+    "docs/CODEOWNERS",
+]
+
+
+def org_settings(org: dict) -> dict:
+    """Project an organization JSON object onto the audited settings
+
+    Args:
+        org: Organization JSON object
+
+    Returns:
+        Dictionary containing organization settings
+    """
+    return {
+        "name": org.get("name"),
+        "login": org.get("login"),
+        "description": org.get("description"),
+        "email": org.get("email"),
+        "billing_email": org.get("billing_email"),
+        "company": org.get("company"),
+        "location": org.get("location"),
+        "blog": org.get("blog"),
+        "created_at": format_timestamp(org.get("created_at")),
+        "updated_at": format_timestamp(org.get("updated_at")),
+        "public_repos": org.get("public_repos"),
+        "private_repos": org.get("total_private_repos"),
+        "followers": org.get("followers"),
+        "following": org.get("following"),
+        "default_repository_permission": org.get("default_repository_permission"),
+        "members_can_create_repositories": org.get("members_can_create_repositories"),
+        "two_factor_requirement_enabled": org.get("two_factor_requirement_enabled"),
+        "has_organization_projects": org.get("has_organization_projects"),
+        "has_repository_projects": org.get("has_repository_projects"),
+    }
+
+
+def team_info(team: dict) -> dict:
+    """Project a team JSON object onto the audited fields
+
+    Args:
+        team: Team JSON object
+
+    Returns:
+        TeamRecord of the team
+    """
+    return TeamRecord(
+        name=team.get("name"),
+        slug=team.get("slug"),
+        description=team.get("description"),
+        privacy=team.get("privacy"),
+        permission=team.get("permission"),
+        members_count=team.get("members_count"),
+        repos_count=team.get("repos_count"),
+    )
+
+
+def add_team_hierarchy(teams: list, listing: list) -> None:
+    """Add parent and child team slugs to team records
+
+    Args:
+        teams: Team information dictionaries, updated in place
+        listing: Team dictionaries from the API, in the same order, whose
+            "parent" entry names the parent team
+    """
+    for team, raw in zip(teams, listing):
+        parent = raw.get("parent")
+        team["parent"] = parent["slug"] if parent else None
+        team["child_teams"] = []
+
+    by_slug = {team["slug"]: team for team in teams}
+    for team in teams:
+        if team["parent"] in by_slug:
+            by_slug[team["parent"]]["child_teams"].append(team["slug"])
+
+
+def team_error(org_name: str, team_slug: str, error: Exception) -> dict:
+    """Build the error entry of a team whose members could not be listed
+
+    Args:
+        org_name: Name of the organization
+        team_slug: Slug of the team
+        error: Exception raised while listing the members
+
+    Returns:
+        Error dictionary in the shape of the per-repository errors, with
+        the team in place of the repository
+    """
+    return {
+        "organization": org_name,
+        "section": "teams",
+        "repository": None,
+        "team": team_slug,
+        "error": str(error),
+    }
+
+
+def repository_info(repo: dict) -> dict:
+    """Project a repository JSON object onto the audited fields
+
+    Args:
+        repo: Repository JSON object
+
+    Returns:
+        RepositoryRecord of the repository
+    """
+    return RepositoryRecord(
+        name=repo.get("name"),
+        full_name=repo.get("full_name"),
+        description=repo.get("description"),
+        private=repo.get("private"),
+        archived=repo.get("archived"),
+        disabled=repo.get("disabled"),
+        default_branch=repo.get("default_branch"),
+        visibility=repo.get("visibility"),
+        allow_merge_commit=repo.get("allow_merge_commit"),
+        allow_squash_merge=repo.get("allow_squash_merge"),
+        allow_rebase_merge=repo.get("allow_rebase_merge"),
+        delete_branch_on_merge=repo.get("delete_branch_on_merge"),
+        has_issues=repo.get("has_issues"),
+        has_projects=repo.get("has_projects"),
+        has_wiki=repo.get("has_wiki"),
+        has_downloads=repo.get("has_downloads"),
+        **repo_timestamps(repo),
+    )
+
+
+def repo_timestamps(repo: dict) -> dict:
+    """Get the change timestamps of a repository from the listing
+
+    Args:
+        repo: Repository dictionary
+
+    Returns:
+        Dictionary with updated_at and pushed_at
+    """
+    return {
+        "updated_at": format_timestamp(repo.get("updated_at")),
+        "pushed_at": format_timestamp(repo.get("pushed_at")),
+    }
+
+
+def collaborator_permissions(collaborator: dict) -> dict:
+    """Get the permission entry of a collaborator from a listing
+
+    The permissions object of the collaborators listing is mapped to the
+    admin/write/read level reported by the per-user permission endpoint.
+
+    Args:
+        collaborator: Collaborator dictionary from the collaborators listing
+
+    Returns:
+        CollaboratorGrant with login, permissions and role_name
+    """
+    flags = collaborator.get("permissions") or {}
+    if flags.get("admin"):
+        level = "admin"
+    elif flags.get("push"):
+        level = "write"
+    elif flags.get("pull"):
+        level = "read"
+    else:
+        level = "none"
+
+    return CollaboratorGrant(collaborator["login"], level, collaborator.get("role_name"))
+
+
+def codeowners_candidates(entries: dict) -> Iterator[tuple]:
+    """Get the places of a root tree that may hold the CODEOWNERS file
+
+    Args:
+        entries: Dictionary mapping the paths of the root tree's entries to
+            (type, sha) tuples
+
+    Yields:
+        (path, blob sha, subtree sha) tuples in the order GitHub checks the
+        paths. The blob sha is set for a file in the root tree itself; the
+        subtree sha is set for a directory that still has to be listed and
+        looked in with codeowners_blob.
+    """
+    for path in CODEOWNERS_PATHS:
+        directory, _, name = path.rpartition("/")
+        kind, sha = entries.get(directory or name, (None, None))
+        if directory and kind == "tree":
+            yield path, None, sha
+        elif not directory and kind == "blob":
+            yield path, sha, None
+
+
+def codeowners_blob(entries: dict) -> Optional[str]:
+    """Get the blob sha of a CODEOWNERS file directly inside a tree
+
+    Args:
+        entries: Dictionary mapping the paths of the tree's entries to
+            (type, sha) tuples
+
+    Returns:
+        Blob sha, or None if the tree has no CODEOWNERS file
+    """
+    kind, sha = entries.get("CODEOWNERS", (None, None))
+    return sha if kind == "blob" else None
+
+
+def next_link(headers) -> Optional[str]:
+    """Get the URL of the next page from a Link header
+
+    Args:
+        headers: Response headers
+
+    Returns:
+        Next page URL, or None on the last page
+    """
+    link = {k.lower(): v for k, v in headers.items()}.get("link")
+    for entry in parse_header_links(link or ""):
+        if entry.get("rel") == "next":
+            return entry["url"]
+    return None
+
+
+def format_timestamp(value: Optional[str]) -> str:
+    """Format an API timestamp the way GitHubAuditClient does
+
+    Args:
+        value: ISO 8601 timestamp from the API, or None
+
+    Returns:
+        String form of the timestamp as a timezone-aware datetime
+    """
+    if not value:
+        return str(None)
+    parsed = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    return str(parsed.replace(tzinfo=timezone.utc))
@@ -0,0 +1,388 @@
+"""Rate-limit-aware scheduling of GitHub API requests"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+# Seconds to wait between checks for a free request slot in async code
+POLL_INTERVAL = 0.05
+
+# GitHub asks clients to wait at least a minute after a secondary rate limit
+SECONDARY_BACKOFF = 60.0
+MAX_BACKOFF = 900.0
+
+
+class RateLimitScheduler:
+    """Schedules API requests against GitHub's rate limits
+
+    Every request acquires a slot before it is sent and releases it with
+    the response. The scheduler reads the X-RateLimit-* and Retry-After
+    headers to:
+
+    - spread the remaining budget over the reset window once less than
+      ``pace_below`` of the limit is left,
+    - pause until the window resets when the budget is exhausted,
+    - back off exponentially on secondary rate limits,
+    - lower the number of requests in flight when latency rises and raise
+      it again while responses stay fast.
+
+    Budgets are tracked per resource and, when requests name the
+    credential they use, per credential. One scheduler can be shared by
+    several clients, and by threads and coroutines alike.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 1,
+        min_concurrency: int = 1,
+        pace_below: float = 0.5,
+        reserve: int = 10,
+        latency_factor: float = 2.0,
+    ):
+        """Initialize the scheduler
+
+        Args:
+            max_concurrency: Maximum number of requests in flight
+            min_concurrency: Lower bound for the adaptive concurrency
+            pace_below: Fraction of the limit below which requests are
+                spread over the time left until the reset
+            reserve: Requests per resource kept unused until the reset
+            latency_factor: Ratio of smoothed to baseline latency above
+                which concurrency is reduced
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency = self.max_concurrency
+        self.pace_below = pace_below
+        self.reserve = reserve
+        self.latency_factor = latency_factor
+
+        self.resources = {}
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+
+        self._condition = threading.Condition()
+        # Budget keys requests were acquired for, mapped to the key of the
+        # budget GitHub reported them against when the two differ
+        self._aliases = {}
+        self._in_flight = 0
+        self._next_start = {}
+        self._paused_until = 0.0
+        self._secondary_hits = 0
+        self._latency = None
+        self._baseline_latency = None
+        self._completed_since_change = 0
+
+    def acquire(self, resource: str = "core", credential: Optional[str] = None) -> None:
+        """Wait until a request may be sent, blocking the calling thread
+
+        Args:
+            resource: Rate limit resource the request counts against
+            credential: Optional key of the credential the request uses
+        """
+        key = _budget_key(resource, credential)
+        entered = time.monotonic()
+        with self._condition:
+            while True:
+                wait = self._wait_time(key)
+                if wait == 0:
+                    self._start(key, entered)
+                    return
+                self._condition.wait(timeout=wait)
+
+    async def acquire_async(self, resource: str = "core", credential: Optional[str] = None) -> None:
+        """Wait until a request may be sent, without blocking the event loop
+
+        Args:
+            resource: Rate limit resource the request counts against
+            credential: Optional key of the credential the request uses
+        """
+        key = _budget_key(resource, credential)
+        entered = time.monotonic()
+        while True:
+            with self._condition:
+                wait = self._wait_time(key)
+                if wait == 0:
+                    self._start(key, entered)
+                    return
+            await asyncio.sleep(POLL_INTERVAL if wait is None else wait)
+
+    def release(
+        self,
+        resource: str,
+        status: Optional[int],
+        headers,
+        latency: float,
+        body: bytes = b"",
+        credential: Optional[str] = None,
+    ) -> bool:
+        """Record the outcome of a request and free its slot
+
+        Args:
+            resource: Rate limit resource the request was acquired for
+            status: HTTP status code, or None if no response was received
+            headers: Response headers (case-insensitive mapping)
+            latency: Seconds between sending the request and the response
+            body: Response body, used to recognise secondary rate limits
+            credential: Optional key of the credential the request used
+
+        Returns:
+            True if the request was rate limited and should be retried
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+            if status is None:
+                return False
+
+            self.requests += 1
+            state = self._update_resource(resource, credential, headers)
+
+            delay = self._rate_limit_delay(status, headers, state, body)
+            if delay is not None:
+                self.rate_limited += 1
+                # An exhausted budget only holds back requests for that
+                # budget; other limits pause every request
+                if state["remaining"] != 0:
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+                self._completed_since_change = 0
+                return True
+
+            self._secondary_hits = 0
+            self._adapt_concurrency(latency)
+            return False
+
+    def record_retry(self) -> None:
+        """Count a request that is re-sent after a rate limit response"""
+        with self._condition:
+            self.retries += 1
+
+    def summary(self) -> dict:
+        """Get a report of the rate limit budget used so far
+
+        Returns:
+            Dictionary with request counts, throttling totals and the
+            per-resource budget consumed and remaining
+        """
+        with self._condition:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "concurrency": self.concurrency,
+                "resources": {
+                    name: {
+                        "limit": state["limit"],
+                        "remaining": state["remaining"],
+                        "used": state["consumed"],
+                        "reset": state["reset"],
+                    }
+                    for name, state in self.resources.items()
+                },
+            }
+
+    def _wait_time(self, key: str) -> Optional[float]:
+        """Get how long to wait before the next request may start
+
+        Must be called with the condition held.
+
+        Args:
+            key: Budget key of the request
+
+        Returns:
+            0 if the request may start now, None if it must wait for a free
+            slot, otherwise the number of seconds to wait
+        """
+        if self._in_flight >= self.concurrency:
+            return None
+
+        now = time.monotonic()
+        start = max(now, self._paused_until, self._next_start.get(key, 0.0))
+
+        state = self._state(key)
+        if state and state["remaining"] is not None and state["remaining"] <= self.reserve:
+            reset_in = state["reset"] - time.time() if state["reset"] else 0
+            if reset_in > 0:
+                start = max(start, now + reset_in + 1)
+
+        return start - now if start > now else 0
+
+    def _start(self, key: str, entered: float) -> None:
+        """Take a slot and schedule the earliest start of the next request
+
+        Must be called with the condition held.
+
+        Args:
+            key: Budget key of the request
+            entered: Monotonic time at which the caller started waiting
+        """
+        now = time.monotonic()
+        self.throttled_seconds += now - entered
+        self._in_flight += 1
+        self._next_start[key] = max(now, self._next_start.get(key, 0.0)) + self._interval(key)
+
+    def _interval(self, key: str) -> float:
+        """Get the pacing interval between requests for a budget
+
+        Args:
+            key: Budget key of the request
+
+        Returns:
+            Seconds between request starts; 0 while plenty of budget is left
+        """
+        state = self._state(key)
+        if not state or state["remaining"] is None or not state["limit"] or not state["reset"]:
+            return 0.0
+        if state["remaining"] >= state["limit"] * self.pace_below:
+            return 0.0
+
+        reset_in = state["reset"] - time.time()
+        budget = state["remaining"] - self.reserve
+        if reset_in <= 0 or budget <= 0:
+            return 0.0
+        return reset_in / budget
+
+    def _update_resource(self, resource: str, credential: Optional[str], headers) -> dict:
+        """Update the budget of a resource from response headers
+
+        Must be called with the condition held.
+
+        Args:
+            resource: Rate limit resource the request was acquired for
+            credential: Optional key of the credential the request used
+            headers: Response headers (case-insensitive mapping)
+
+        Returns:
+            State dictionary of the budget
+        """
+        key = _budget_key(resource, credential)
+        name = _budget_key(headers.get("X-RateLimit-Resource") or resource, credential)
+        state = self.resources.setdefault(name, {
+            "limit": None,
+            "remaining": None,
+            "reset": None,
+            "used": None,
+            "consumed": 0,
+        })
+
+        limit = _int_header(headers, "X-RateLimit-Limit")
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        reset = _int_header(headers, "X-RateLimit-Reset")
+        used = _int_header(headers, "X-RateLimit-Used")
+        if remaining is None:
+            return state
+
+        if reset == state["reset"] and used is not None and state["used"] is not None:
+            state["consumed"] += max(0, used - state["used"])
+        else:
+            state["consumed"] += 1
+
+        state.update(limit=limit, remaining=remaining, reset=reset, used=used)
+        if name != key:
+            self._aliases[key] = name
+        return state
+
+    def _state(self, key: str) -> Optional[dict]:
+        """Get the budget of a budget key, following aliases
+
+        Must be called with the condition held.
+
+        Args:
+            key: Budget key a request is acquired for
+
+        Returns:
+            State dictionary of the budget, or None if nothing is known yet
+        """
+        return self.resources.get(self._aliases.get(key, key))
+
+    def _rate_limit_delay(self, status: int, headers, state: dict, body: bytes) -> Optional[float]:
+        """Work out whether a response is a rate limit and how long to wait
+
+        Must be called with the condition held.
+
+        Returns:
+            Seconds to wait before retrying, or None if not rate limited
+        """
+        if status not in (403, 429):
+            return None
+
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+
+        if state["remaining"] == 0 and state["reset"]:
+            return max(0.0, state["reset"] - time.time()) + 1
+
+        if status == 429 or b"secondary rate limit" in (body or b"").lower():
+            delay = min(SECONDARY_BACKOFF * 2 ** self._secondary_hits, MAX_BACKOFF)
+            self._secondary_hits += 1
+            return delay
+
+        return None
+
+    def _adapt_concurrency(self, latency: float) -> None:
+        """Adjust the number of requests in flight from observed latency
+
+        Concurrency drops by one when the smoothed latency exceeds the
+        baseline by latency_factor, and grows by one after a full window of
+        fast responses.
+
+        Must be called with the condition held.
+        """
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency = 0.8 * self._latency + 0.2 * latency
+        if self._baseline_latency is None or self._latency < self._baseline_latency:
+            self._baseline_latency = self._latency
+
+        self._completed_since_change += 1
+        if self._completed_since_change < self.concurrency:
+            return
+
+        self._completed_since_change = 0
+        if self._latency > self._baseline_latency * self.latency_factor:
+            self.concurrency = max(self.min_concurrency, self.concurrency - 1)
+        elif self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+
+
+def _budget_key(resource: str, credential: Optional[str]) -> str:
+    """Get the key a rate limit budget is tracked under
+
+    Args:
+        resource: Rate limit resource
+        credential: Optional key of the credential
+
+    Returns:
+        Budget key
+    """
+    return resource if credential is None else f"{resource}:{credential}"
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    """Read an integer header value
+
+    Args:
+        headers: Response headers (case-insensitive mapping)
+        name: Header name
+
+    Returns:
+        Integer value, or None if the header is missing or malformed
+    """
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
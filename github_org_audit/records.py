@@ -0,0 +1,240 @@
+"""Compact record types for audited repositories, teams and permissions"""
+
+from typing import Iterable, List
+
+import yaml
+
+
+class Record:
+    """Base class of the audit record types
+
+    Fields are kept in __slots__ instead of a per-instance dictionary, which
+    makes a record several times smaller than the equivalent dictionary and
+    its fields faster to read. Records also answer the dictionary operations
+    the rest of the package uses (indexing, get, in, keys and items), so they
+    can be mixed with plain dictionaries, such as results loaded from a file.
+
+    Fields listed in optional are left out of the record until they are set.
+    """
+
+    __slots__ = ()
+    optional = ()
+
+    def __init__(self, *args, **kwargs):
+        """Create a record
+
+        Args:
+            *args: Field values in field order
+            **kwargs: Field values by name; required fields not given are None
+
+        Raises:
+            TypeError: If a field is unknown or given twice
+        """
+        if len(args) > len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes at most {len(self.__slots__)} fields")
+        for field, value in zip(self.__slots__, args):
+            if field in kwargs:
+                raise TypeError(f"{type(self).__name__} got field {field} twice")
+            kwargs[field] = value
+
+        unknown = set(kwargs).difference(self.__slots__)
+        if unknown:
+            raise TypeError(f"{type(self).__name__} has no field {sorted(unknown)[0]}")
+
+        for field in self.__slots__:
+            if field in kwargs:
+                setattr(self, field, kwargs[field])
+            elif field not in self.optional:
+                setattr(self, field, None)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Record":
+        """Create a record from a dictionary with the same keys
+
+        Args:
+            data: Dictionary, or a record which is returned unchanged
+
+        Returns:
+            Record of this type
+        """
+        if isinstance(data, cls):
+            return data
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    def to_dict(self) -> dict:
+        """Convert the record to a dictionary, including nested records
+
+        Returns:
+            Dictionary of the set fields in field order
+        """
+        return {key: _plain(getattr(self, key)) for key in self.keys()}
+
+    def keys(self) -> List[str]:
+        """Get the names of the set fields"""
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def items(self) -> list:
+        """Get (name, value) pairs of the set fields"""
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def values(self) -> list:
+        """Get the values of the set fields"""
+        return [getattr(self, key) for key in self.keys()]
+
+    def get(self, key: str, default=None):
+        """Get a field like dict.get"""
+        if key in self.__slots__:
+            return getattr(self, key, default)
+        return default
+
+    def __getitem__(self, key: str):
+        if key in self.__slots__:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in self.__slots__:
+            raise KeyError(f"{type(self).__name__} has no field {key}")
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__slots__ and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == _plain(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value!r}" for key, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+    __hash__ = None
+
+
+class RepositoryRecord(Record):
+    """Audited settings of one repository"""
+
+    __slots__ = (
+        "name",
+        "full_name",
+        "description",
+        "private",
+        "archived",
+        "disabled",
+        "default_branch",
+        "visibility",
+        "allow_merge_commit",
+        "allow_squash_merge",
+        "allow_rebase_merge",
+        "delete_branch_on_merge",
+        "has_issues",
+        "has_projects",
+        "has_wiki",
+        "has_downloads",
+        "updated_at",
+        "pushed_at",
+    )
+
+
+class TeamRecord(Record):
+    """Audited settings of one team
+
+    Members and the team hierarchy are only present when they were fetched.
+    """
+
+    __slots__ = (
+        "name",
+        "slug",
+        "description",
+        "privacy",
+        "permission",
+        "members_count",
+        "repos_count",
+        "parent",
+        "child_teams",
+        "members",
+    )
+    optional = ("parent", "child_teams", "members")
+
+
+class TeamMember(Record):
+    """Membership of one user in a team"""
+
+    __slots__ = ("login", "name", "role")
+
+
+class CollaboratorGrant(Record):
+    """Access of one collaborator to a repository"""
+
+    __slots__ = ("login", "permissions", "role_name")
+
+
+class TeamGrant(Record):
+    """Access of one team to a repository"""
+
+    __slots__ = ("name", "permission")
+
+
+class PermissionsRecord(Record):
+    """Collaborators and teams with access to one repository"""
+
+    __slots__ = ("repository", "collaborators", "teams")
+
+
+def as_records(cls, items: Iterable) -> list:
+    """Convert dictionaries to records, keeping records as they are
+
+    Args:
+        cls: Record type to convert to
+        items: Dictionaries or records
+
+    Returns:
+        List of records
+    """
+    return [cls.from_dict(item) for item in items]
+
+
+def to_builtin(value):
+    """Convert a value json cannot serialize, for use as json's default
+
+    Args:
+        value: Value to convert
+
+    Returns:
+        Dictionary of a record, otherwise the value as a string
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    return str(value)
+
+
+def _plain(value):
+    """Convert records nested in a value to dictionaries"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def _represent_record(dumper, record: Record):
+    """Represent a record as a YAML mapping"""
+    return dumper.represent_dict(record.to_dict())
+
+
+yaml.add_multi_representer(Record, _represent_record)
+yaml.add_multi_representer(Record, _represent_record, Dumper=yaml.SafeDumper)
+if hasattr(yaml, "CDumper"):
+    yaml.add_multi_representer(Record, _represent_record, Dumper=yaml.CDumper)
@@ -0,0 +1,275 @@
+"""Serialization of audit results to and from files"""
+
+import gzip
+import json
+import os
+from typing import Callable, Dict, NamedTuple
+
+import yaml
+
+from .records import to_builtin
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is an optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is an optional dependency
+    zstandard = None
+
+
+# File extensions that compress the file, and the compression they select
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+# Leading bytes of compressed files, used to decompress files regardless of their name
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class Serializer(NamedTuple):
+    """Format audit results can be written in
+
+    dump turns results into bytes and load turns bytes back into plain
+    dictionaries and lists. Text formats are UTF-8 encoded.
+    """
+
+    name: str
+    dump: Callable[[object], bytes]
+    load: Callable[[bytes], object]
+    binary: bool = False
+
+
+def dump_json(value) -> bytes:
+    """Serialize a value as indented JSON
+
+    orjson is used when it is installed. Its output is the same as that of
+    json.dumps with indent=2, except that non-ASCII characters are written
+    as UTF-8 instead of escape sequences.
+
+    Args:
+        value: Value to serialize; records are converted with to_builtin
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            value,
+            default=to_builtin,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(value, indent=2, default=to_builtin).encode("utf-8")
+
+
+def dump_json_line(value) -> bytes:
+    """Serialize a value as one line of JSON, without the line ending
+
+    Args:
+        value: Value to serialize; records are converted with to_builtin
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            value,
+            default=to_builtin,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(value, default=to_builtin).encode("utf-8")
+
+
+def load_json(data: bytes):
+    """Parse JSON, with orjson when it is installed
+
+    Raises:
+        ValueError: If the data is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_yaml(value) -> bytes:
+    """Serialize a value as block-style YAML, with libyaml when available"""
+    return yaml.dump(value, Dumper=YAML_DUMPER, default_flow_style=False).encode("utf-8")
+
+
+def load_yaml(data: bytes):
+    """Parse YAML safely, with libyaml when available"""
+    return yaml.load(data, Loader=YAML_LOADER)
+
+
+def dump_msgpack(value) -> bytes:
+    """Serialize a value as MessagePack
+
+    Raises:
+        ImportError: If msgpack is not installed
+    """
+    return _require_msgpack().packb(value, default=to_builtin, use_bin_type=True)
+
+
+def load_msgpack(data: bytes):
+    """Parse MessagePack
+
+    Raises:
+        ImportError: If msgpack is not installed
+    """
+    return _require_msgpack().unpackb(data, raw=False, strict_map_key=False)
+
+
+SERIALIZERS: Dict[str, Serializer] = {
+    "json": Serializer("json", dump_json, load_json),
+    "yaml": Serializer("yaml", dump_yaml, load_yaml),
+    "msgpack": Serializer("msgpack", dump_msgpack, load_msgpack, binary=True),
+}
+
+
+def register_serializer(serializer: Serializer) -> None:
+    """Add a format, or replace the one with the same name
+
+    Args:
+        serializer: Serializer to register
+    """
+    SERIALIZERS[serializer.name] = serializer
+
+
+def get_serializer(name: str) -> Serializer:
+    """Get a registered format by name
+
+    Raises:
+        ValueError: If no format of that name is registered
+    """
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown output format {name}") from None
+
+
+def compression_of(path: str):
+    """Get the compression a file name selects
+
+    Args:
+        path: File path
+
+    Returns:
+        "gzip", "zstd", or None for an uncompressed file
+    """
+    return COMPRESSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def open_output(path: str):
+    """Open a file for writing bytes, compressed as its extension says
+
+    Args:
+        path: File path; ending in .gz writes gzip, .zst writes zstd
+
+    Returns:
+        Binary file object; closing it finishes the compressed stream
+
+    Raises:
+        ImportError: If zstd is requested but zstandard is not installed
+    """
+    compression = compression_of(path)
+    if compression == "gzip":
+        # Level 6 writes files about as small as level 9 in a fraction of the time
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        compressor = _require_zstandard().ZstdCompressor(level=3)
+        return compressor.stream_writer(open(path, "wb"))
+    return open(path, "wb")
+
+
+def read_bytes(path: str) -> bytes:
+    """Read a file, decompressing gzip and zstd content
+
+    Compression is detected from the content, so renamed files are read
+    correctly too.
+
+    Args:
+        path: File path
+
+    Returns:
+        Decompressed content
+
+    Raises:
+        ImportError: If the file is zstd compressed but zstandard is not
+            installed
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(ZSTD_MAGIC):
+        reader = _require_zstandard().ZstdDecompressor().stream_reader(data)
+        with reader:
+            return reader.read()
+    return data
+
+
+def is_msgpack(data: bytes) -> bool:
+    """Whether data looks like a MessagePack map, as written for results
+
+    JSON and YAML results start with printable text, while a MessagePack
+    map starts with a byte between 0x80 and 0x8f or with 0xde or 0xdf.
+    """
+    return bool(data) and (0x80 <= data[0] <= 0x8F or data[0] in (0xDE, 0xDF))
+
+
+def check_available(output: str, path=None) -> None:
+    """Check that the dependencies of a format and a file's compression are installed
+
+    Args:
+        output: Name of a format
+        path: Optional file path whose extension selects the compression
+
+    Raises:
+        ImportError: If an optional dependency is missing
+    """
+    if output == "msgpack":
+        _require_msgpack()
+    if path and compression_of(path) == "zstd":
+        _require_zstandard()
+
+
+def write_results(results, path: str, output: str = "json") -> None:
+    """Write results to a file in a format, compressed by the file extension
+
+    Args:
+        results: Results to write
+        path: File path
+        output: Name of a registered format
+    """
+    data = get_serializer(output).dump(results)
+    with open_output(path) as f:
+        f.write(data)
+
+
+def _require_msgpack():
+    """Get the msgpack module, which is an optional dependency"""
+    if msgpack is None:
+        raise ImportError(
+            "MessagePack output requires msgpack; "
+            "install it with: pip install 'github-org-audit[msgpack]'"
+        )
+    return msgpack
+
+
+def _require_zstandard():
+    """Get the zstandard module, which is an optional dependency"""
+    if zstandard is None:
+        raise ImportError(
+            "zstd compression requires zstandard; "
+            "install it with: pip install 'github-org-audit[zstd]'"
+        )
+    return zstandard
@@ -0,0 +1,749 @@
+"""Long-running audit daemon answering queries from memory"""
+
+import http.client
+import os
+import re
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, Optional
+from urllib.parse import parse_qs, quote, urlencode, urlparse
+
+from .auditor import GitHubOrgAuditor
+from .metrics import AuditMetrics
+from .records import PermissionsRecord, RepositoryRecord, TeamRecord, as_records
+from .serializers import dump_json_line, load_json, read_bytes, write_results
+
+
+# Address the server listens on and clients connect to by default
+DEFAULT_ADDRESS = "127.0.0.1:8787"
+
+# Seconds between two audits of an organization
+DEFAULT_INTERVAL = 900
+
+# Seconds between two full audits of an organization, which do not reuse
+# earlier results and so also see changed collaborator and team grants
+DEFAULT_FULL_INTERVAL = 86400
+
+# Number of repositories per page of the repository listing
+PAGE_SIZE = 1000
+
+
+class QueryError(Exception):
+    """Raised when the server cannot answer a query
+
+    Attributes:
+        status: HTTP status of the error response
+    """
+
+    def __init__(self, message: str, status: int = 404):
+        super().__init__(message)
+        self.status = status
+
+
+class AuditServerError(Exception):
+    """Raised by AuditServerClient when a query fails or the server is unreachable"""
+
+
+class OrgModel:
+    """Results of one audit of an organization, indexed for queries
+
+    Models are never changed after they are built; a refresh replaces the
+    whole model, so queries running during a refresh read either the old
+    or the new results, never a mix.
+    """
+
+    def __init__(self, results: Dict, refreshed_at: float):
+        """Index audit results
+
+        Args:
+            results: Results from GitHubOrgAuditor.audit
+            refreshed_at: Time the audit finished, in seconds since the epoch
+        """
+        self.results = results
+        self.refreshed_at = refreshed_at
+        self.repositories = {r["name"]: r for r in results.get("repositories") or []}
+        self.permissions = {p["repository"]: p for p in results.get("permissions") or []}
+
+    def section(self, name: str):
+        """Get one section of the results
+
+        Raises:
+            QueryError: If the section was not audited
+        """
+        if name not in self.results:
+            raise QueryError(f"The server does not audit {name}")
+        return self.results[name]
+
+
+class AuditService:
+    """Keeps the audit results of organizations in memory and refreshes them
+
+    A background thread audits every organization once per interval,
+    passing the previous results as snapshot, so only repositories that
+    changed since the last refresh have their permissions and CODEOWNERS
+    fetched again. Granting a collaborator or team access does not change
+    a repository's timestamps, so once per full interval the audit runs
+    without a snapshot instead. With a snapshot directory, the latest
+    results of every organization are also written to disk and loaded on
+    start, so a restarted server answers queries at once and its first
+    refresh is incremental.
+    """
+
+    def __init__(
+        self,
+        client,
+        organizations: Dict[str, Dict],
+        interval: float = DEFAULT_INTERVAL,
+        full_interval: float = DEFAULT_FULL_INTERVAL,
+        snapshot_dir: Optional[str] = None,
+        metrics: Optional[AuditMetrics] = None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        """Initialize the service
+
+        Args:
+            client: Client shared by the audits of all organizations
+            organizations: Mapping of organization names to their audit
+                configuration
+            interval: Seconds between two audits of an organization
+            full_interval: Seconds between two full audits of an
+                organization; 0 makes every audit a full one
+            snapshot_dir: Optional directory to keep the latest results in
+            metrics: Optional metrics the client records requests in
+            log: Optional function called with a message after each audit
+        """
+        self.client = client
+        self.organizations = organizations
+        self.interval = interval
+        self.full_interval = full_interval
+        self.snapshot_dir = snapshot_dir
+        self.metrics = metrics
+        self.log = log
+        self.models: Dict[str, OrgModel] = {}
+        self.states = {
+            name: {"state": "loading", "refreshed_at": None, "seconds": None, "error": None}
+            for name in organizations
+        }
+        self._due = {name: 0.0 for name in organizations}
+        self._full_due = {name: 0.0 for name in organizations}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def snapshot_path(self, org_name: str) -> str:
+        """Get the path of an organization's results in the snapshot directory"""
+        return os.path.join(self.snapshot_dir, f"{org_name}.json.gz")
+
+    def full_marker_path(self, org_name: str) -> str:
+        """Get the path of the file whose mtime is the last full audit of an organization"""
+        return os.path.join(self.snapshot_dir, f"{org_name}.full")
+
+    def load_snapshots(self) -> None:
+        """Load the results kept in the snapshot directory
+
+        Organizations loaded this way are refreshed when their results
+        become older than the interval rather than at once, and audited in
+        full when their last full audit becomes older than the full
+        interval.
+        """
+        if not self.snapshot_dir:
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        for org_name in self.organizations:
+            path = self.snapshot_path(org_name)
+            if not os.path.exists(path):
+                continue
+            try:
+                results = load_json(read_bytes(path))
+            except (OSError, EOFError, ValueError):
+                continue
+            if not isinstance(results, dict) or results.get("organization") != org_name:
+                continue
+            refreshed_at = os.path.getmtime(path)
+            self._install(org_name, OrgModel(results, refreshed_at), None)
+            age = max(0.0, time.time() - refreshed_at)
+            self._due[org_name] = time.monotonic() + max(0.0, self.interval - age)
+            marker = self.full_marker_path(org_name)
+            if os.path.exists(marker):
+                full_age = max(0.0, time.time() - os.path.getmtime(marker))
+                full_wait = max(0.0, self.full_interval - full_age)
+                self._full_due[org_name] = time.monotonic() + full_wait
+
+    def refresh(self, org_name: str, full: bool = False) -> OrgModel:
+        """Audit an organization and replace its model
+
+        Args:
+            org_name: Name of the organization
+            full: Whether to audit without reusing the previous results;
+                the first audit of an organization is always full
+
+        Returns:
+            New model of the organization
+        """
+        previous = None if full else self.models.get(org_name)
+        auditor = GitHubOrgAuditor(
+            self.client,
+            self.organizations[org_name],
+            snapshot=previous.results if previous is not None else None,
+            metrics=self.metrics,
+        )
+        started = time.monotonic()
+        results = auditor.audit(org_name)
+        model = OrgModel(results, time.time())
+        self._install(org_name, model, time.monotonic() - started)
+        if self.snapshot_dir:
+            # Written under another name first, so a server stopped while
+            # writing keeps the previous results
+            path = self.snapshot_path(org_name)
+            write_results(results, path + ".tmp.gz")
+            os.replace(path + ".tmp.gz", path)
+        if previous is None:
+            self._full_due[org_name] = time.monotonic() + self.full_interval
+            if self.snapshot_dir:
+                with open(self.full_marker_path(org_name), "w"):
+                    pass
+        return model
+
+    def request_refresh(self, org_name: str) -> None:
+        """Audit an organization as soon as the refresh thread is idle
+
+        Raises:
+            QueryError: If the organization is not served
+        """
+        self.state(org_name)
+        self._due[org_name] = 0.0
+        self._wake.set()
+
+    def start(self) -> None:
+        """Start refreshing in a background thread"""
+        self._thread = threading.Thread(target=self._run, name="audit-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = False) -> None:
+        """Stop refreshing
+
+        Args:
+            wait: Whether to wait for a running audit to finish; otherwise
+                it is abandoned when the process exits
+        """
+        self._stopping.set()
+        self._wake.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Audit every organization that is due, then sleep until the next one is"""
+        while not self._stopping.is_set():
+            self._wake.clear()
+            for org_name in self.organizations:
+                if self._stopping.is_set():
+                    return
+                if self._due[org_name] > time.monotonic():
+                    continue
+                self._due[org_name] = time.monotonic() + self.interval
+                self._refresh_logged(org_name, full=self._full_due[org_name] <= time.monotonic())
+            self._wake.wait(max(0.0, min(self._due.values()) - time.monotonic()))
+
+    def _refresh_logged(self, org_name: str, full: bool = False) -> None:
+        """Refresh an organization, keeping its previous model if the audit fails"""
+        with self._lock:
+            self.states[org_name]["state"] = "refreshing" if org_name in self.models else "loading"
+        try:
+            model = self.refresh(org_name, full=full)
+        except Exception as e:
+            with self._lock:
+                state = self.states[org_name]
+                state["state"] = "ready" if org_name in self.models else "failed"
+                state["error"] = str(e)
+            if self.log is not None:
+                self.log(f"Audit of {org_name} failed: {e}")
+            return
+        if self.log is not None:
+            kind = "in full" if full else "incrementally"
+            self.log(
+                f"Audited {org_name} {kind}: {len(model.repositories)} repositories "
+                f"in {self.states[org_name]['seconds']:.1f}s"
+            )
+
+    def _install(self, org_name: str, model: OrgModel, seconds: Optional[float]) -> None:
+        """Make a model the one queries are answered from"""
+        with self._lock:
+            self.models[org_name] = model
+            self.states[org_name].update(
+                state="ready",
+                refreshed_at=_timestamp(model.refreshed_at),
+                seconds=round(seconds, 3) if seconds is not None else None,
+                error=None,
+            )
+
+    def state(self, org_name: str) -> Dict:
+        """Get the refresh state of an organization
+
+        Raises:
+            QueryError: If the organization is not served
+        """
+        with self._lock:
+            if org_name not in self.states:
+                raise QueryError(f"The server does not audit organization {org_name}")
+            return dict(self.states[org_name], organization=org_name)
+
+    def model(self, org_name: str) -> OrgModel:
+        """Get the current model of an organization
+
+        Raises:
+            QueryError: If the organization is not served or its first
+                audit has not finished yet
+        """
+        state = self.state(org_name)
+        model = self.models.get(org_name)
+        if model is None:
+            detail = f": {state['error']}" if state["error"] else ""
+            raise QueryError(f"The first audit of {org_name} has not finished yet{detail}", 503)
+        return model
+
+
+class AuditRequestHandler(BaseHTTPRequestHandler):
+    """Handler of the query API
+
+    Every JSON response has the form
+    {"organization": ..., "refreshed_at": ..., "data": ...} and errors
+    have the form {"error": ...}.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "github-org-audit"
+
+    ROUTES = [
+        ("GET", re.compile(r"/status"), "get_status"),
+        ("GET", re.compile(r"/metrics"), "get_metrics"),
+        ("GET", re.compile(r"/orgs/(?P<org>[^/]+)"), "get_state"),
+        ("POST", re.compile(r"/orgs/(?P<org>[^/]+)/refresh"), "post_refresh"),
+        ("GET", re.compile(r"/orgs/(?P<org>[^/]+)/results"), "get_results"),
+        ("GET", re.compile(r"/orgs/(?P<org>[^/]+)/settings"), "get_settings"),
+        ("GET", re.compile(r"/orgs/(?P<org>[^/]+)/teams"), "get_teams"),
+        ("GET", re.compile(r"/orgs/(?P<org>[^/]+)/repositories"), "get_repositories"),
+        ("GET", re.compile(r"/orgs/(?P<org>[^/]+)/repositories/(?P<repo>[^/]+)"), "get_repository"),
+        (
+            "GET",
+            re.compile(r"/orgs/(?P<org>[^/]+)/repositories/(?P<repo>[^/]+)/permissions"),
+            "get_permissions",
+        ),
+        (
+            "GET",
+            re.compile(r"/orgs/(?P<org>[^/]+)/repositories/(?P<repo>[^/]+)/codeowners"),
+            "get_repository_codeowners",
+        ),
+        ("GET", re.compile(r"/orgs/(?P<org>[^/]+)/codeowners"), "get_codeowners"),
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        """Route a request to its handler method and send the response"""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        url = urlparse(self.path)
+        self.params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+
+        allowed = []
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed.append(route_method)
+                continue
+            try:
+                getattr(self, name)(**match.groupdict())
+            except QueryError as e:
+                self._send_json({"error": str(e)}, e.status)
+            except ValueError as e:
+                self._send_json({"error": str(e)}, 400)
+            return
+
+        if allowed:
+            self._send_json({"error": f"{method} is not allowed on {path}"}, 405)
+        else:
+            self._send_json({"error": f"No such endpoint {path}"}, 404)
+
+    def get_status(self):
+        service = self.server.service
+        status = {"organizations": [service.state(name) for name in service.organizations]}
+        scheduler = getattr(service.client, "scheduler", None)
+        if scheduler is not None:
+            status["api"] = scheduler.summary()
+        self._send_json(status)
+
+    def get_metrics(self):
+        metrics = self.server.service.metrics
+        if metrics is None:
+            raise QueryError("The server does not collect metrics")
+        self._send(metrics.to_openmetrics().encode("utf-8"), "application/openmetrics-text")
+
+    def get_state(self, org):
+        self._send_json(self.server.service.state(org))
+
+    def post_refresh(self, org):
+        self.server.service.request_refresh(org)
+        self._send_json(self.server.service.state(org), 202)
+
+    def get_results(self, org):
+        model = self.server.service.model(org)
+        self._send_data(org, model, model.results)
+
+    def get_settings(self, org):
+        model = self.server.service.model(org)
+        self._send_data(org, model, model.section("settings"))
+
+    def get_teams(self, org):
+        model = self.server.service.model(org)
+        teams = model.section("teams")
+        # Teams whose members could not be listed have an error instead
+        failed = {e.get("team") for e in model.results.get("errors", []) if e["section"] == "teams"}
+        if self._flag("members") and any(
+            "members" not in t and t["slug"] not in failed for t in teams
+        ):
+            raise QueryError(
+                "The server does not audit team members; start it with --team-members", 409
+            )
+        self._send_data(org, model, teams)
+
+    def get_repositories(self, org):
+        model = self.server.service.model(org)
+        repos = model.section("repositories")
+        if not self._flag("include_archived"):
+            repos = [r for r in repos if not r["archived"]]
+        page = int(self.params.get("page", 1))
+        per_page = min(int(self.params.get("per_page", PAGE_SIZE)), PAGE_SIZE)
+        if page < 1 or per_page < 1:
+            raise ValueError("page and per_page must be positive")
+        start = (page - 1) * per_page
+        self._send_data(org, model, repos[start:start + per_page])
+
+    def get_repository(self, org, repo):
+        model = self.server.service.model(org)
+        model.section("repositories")
+        if repo not in model.repositories:
+            raise QueryError(f"No repository {repo} in {org}")
+        self._send_data(org, model, model.repositories[repo])
+
+    def get_permissions(self, org, repo):
+        model = self.server.service.model(org)
+        model.section("permissions")
+        if repo not in model.permissions:
+            raise QueryError(f"No permissions of repository {repo} in {org}")
+        self._send_data(org, model, model.permissions[repo])
+
+    def get_repository_codeowners(self, org, repo):
+        model = self.server.service.model(org)
+        self._send_data(org, model, model.section("codeowners").get(repo))
+
+    def get_codeowners(self, org):
+        model = self.server.service.model(org)
+        self._send_data(org, model, model.section("codeowners"))
+
+    def _flag(self, name: str) -> bool:
+        """Read a boolean query parameter"""
+        return self.params.get(name, "").lower() in ("1", "true", "yes")
+
+    def _send_data(self, org: str, model: OrgModel, data) -> None:
+        """Send query results in the response envelope"""
+        self._send_json({
+            "organization": org,
+            "refreshed_at": _timestamp(model.refreshed_at),
+            "data": data,
+        })
+
+    def _send_json(self, value, status: int = 200) -> None:
+        """Send a JSON response"""
+        self._send(dump_json_line(value), "application/json", status)
+
+    def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+        """Send a response with a body"""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "30")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Clients of a Unix socket have no address
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "access_log", False):
+            super().log_message(format, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a Unix socket, removing the socket file when closed"""
+
+    daemon_threads = True
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def create_server(service: AuditService, address: str = DEFAULT_ADDRESS, access_log: bool = False):
+    """Create the HTTP server of the query API
+
+    Args:
+        service: Service to answer queries from
+        address: "HOST:PORT", or "unix:PATH" for a Unix socket that only
+            the current user can connect to
+        access_log: Whether to log every request to stderr
+
+    Returns:
+        Server; call serve_forever() to answer requests
+
+    Raises:
+        OSError: If the address is in use
+    """
+    path = _unix_path(address)
+    if path is not None:
+        if os.path.exists(path):
+            _remove_stale_socket(path)
+        server = _UnixHTTPServer(path, AuditRequestHandler)
+        os.chmod(path, 0o600)
+    else:
+        host, port = _host_port(address)
+        server = ThreadingHTTPServer((host, port), AuditRequestHandler)
+    server.service = service
+    server.access_log = access_log
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket"""
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class AuditServerClient:
+    """Client of the query API of an audit server
+
+    Provides the query methods of GitHubAuditClient that the CLI commands
+    use, answered from the server's memory instead of the GitHub API.
+    Repositories, teams and permissions are returned as records, like the
+    API clients return them. One connection is kept open and reused.
+    """
+
+    def __init__(self, url: str = DEFAULT_ADDRESS, timeout: float = 30.0):
+        """Initialize the client
+
+        Args:
+            url: "http://HOST:PORT", "HOST:PORT" or "unix:PATH"
+            timeout: Seconds to wait for a response
+        """
+        self.url = url
+        self.timeout = timeout
+        self._connection = None
+
+    def close(self) -> None:
+        """Close the connection to the server"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def request(self, method: str, path: str, **params) -> Dict:
+        """Send a request to the server
+
+        Args:
+            method: HTTP method
+            path: Path of the endpoint
+            **params: Query parameters
+
+        Returns:
+            Decoded JSON response
+
+        Raises:
+            AuditServerError: If the server cannot be reached or answers
+                with an error
+        """
+        if params:
+            path += "?" + urlencode(params)
+        # A kept-alive connection the server has closed fails once; retry
+        # on a new connection before giving up
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = self._connect()
+            try:
+                self._connection.request(method, path)
+                response = self._connection.getresponse()
+                body = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if attempt:
+                    raise AuditServerError(
+                        f"Cannot reach the audit server at {self.url}: {e}"
+                    ) from e
+
+        try:
+            payload = load_json(body)
+        except ValueError:
+            raise AuditServerError(f"{self.url} is not an audit server") from None
+        if response.status >= 400:
+            raise AuditServerError(payload.get("error", f"HTTP {response.status}"))
+        return payload
+
+    def query(self, path: str, **params):
+        """Get the data of a query endpoint
+
+        Raises:
+            AuditServerError: If the query fails
+        """
+        return self.request("GET", path, **params)["data"]
+
+    def status(self) -> list:
+        """Get the refresh state of every organization the server audits"""
+        return self.request("GET", "/status")["organizations"]
+
+    def refresh(self, org_name: str) -> Dict:
+        """Ask the server to audit an organization again soon
+
+        Returns:
+            Refresh state of the organization
+        """
+        return self.request("POST", f"/orgs/{_segment(org_name)}/refresh")
+
+    def get_results(self, org_name: str) -> Dict:
+        """Get the latest audit results of an organization"""
+        return self.query(f"/orgs/{_segment(org_name)}/results")
+
+    def get_org_settings(self, org_name: str) -> Dict:
+        """Get organization settings"""
+        return self.query(f"/orgs/{_segment(org_name)}/settings")
+
+    def get_teams(self, org_name: str, include_members: bool = False) -> list:
+        """Get the teams of an organization
+
+        Args:
+            org_name: Name of the organization
+            include_members: Whether members are needed; the server must
+                have been started with --team-members
+
+        Returns:
+            List of TeamRecord
+        """
+        params = {"members": "true"} if include_members else {}
+        return as_records(TeamRecord, self.query(f"/orgs/{_segment(org_name)}/teams", **params))
+
+    def iter_repositories(self, org_name: str) -> Iterator[RepositoryRecord]:
+        """Iterate over all repositories of an organization, including archived ones
+
+        Pages are requested as the iterator is consumed.
+
+        Yields:
+            RepositoryRecord per repository
+        """
+        page = 1
+        while True:
+            repos = self.query(
+                f"/orgs/{_segment(org_name)}/repositories",
+                include_archived="true",
+                page=page,
+                per_page=PAGE_SIZE,
+            )
+            yield from as_records(RepositoryRecord, repos)
+            if len(repos) < PAGE_SIZE:
+                return
+            page += 1
+
+    def get_repositories(self, org_name: str) -> list:
+        """Get all repositories of an organization, including archived ones"""
+        return list(self.iter_repositories(org_name))
+
+    def get_repository_permissions(self, org_name: str, repo_name: str) -> PermissionsRecord:
+        """Get the collaborators and teams with access to a repository"""
+        return PermissionsRecord.from_dict(
+            self.query(f"/orgs/{_segment(org_name)}/repositories/{_segment(repo_name)}/permissions")
+        )
+
+    def get_codeowners(self, org_name: str, repo_name: str) -> Optional[str]:
+        """Get the CODEOWNERS file of a repository, or None if it has none"""
+        return self.query(
+            f"/orgs/{_segment(org_name)}/repositories/{_segment(repo_name)}/codeowners"
+        )
+
+    def get_all_codeowners(self, org_name: str) -> Dict:
+        """Get the CODEOWNERS files of all repositories that have one"""
+        return self.query(f"/orgs/{_segment(org_name)}/codeowners")
+
+    def _connect(self) -> http.client.HTTPConnection:
+        """Open a connection to the server"""
+        path = _unix_path(self.url)
+        if path is not None:
+            return _UnixHTTPConnection(path, self.timeout)
+        host, port = _host_port(self.url.split("://", 1)[-1].rstrip("/"))
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+
+def _unix_path(address: str) -> Optional[str]:
+    """Get the socket path of a "unix:PATH" address, or None for other addresses"""
+    if not address.startswith("unix:"):
+        return None
+    path = address[len("unix:"):]
+    # Accept unix:///path as well as unix:/path
+    return "/" + path.lstrip("/") if path.startswith("//") else path
+
+
+def _host_port(address: str):
+    """Split "HOST:PORT" or "PORT" into a host and port
+
+    Raises:
+        ValueError: If the port is not a number
+    """
+    host, _, port = address.rpartition(":")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Remove the socket file of a server that is no longer running
+
+    Raises:
+        OSError: If a server is still listening on the socket
+    """
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError(f"An audit server is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def _segment(value: str) -> str:
+    """Quote a value for use as one path segment"""
+    return quote(value, safe="")
+
+
+def _timestamp(seconds: float) -> str:
+    """Format seconds since the epoch as an ISO 8601 UTC timestamp"""
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat(timespec="seconds")
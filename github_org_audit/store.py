@@ -0,0 +1,505 @@
+"""Local SQLite store of audit snapshots"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .auditor import RECORD_TYPES
+from .codeowners import parse_codeowners
+from .records import to_builtin
+
+
+# Repository fields that change with every push and are not reported as
+# configuration changes
+VOLATILE_REPOSITORY_FIELDS = ("updated_at", "pushed_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    organization TEXT NOT NULL,
+    audit_timestamp TEXT,
+    created_at TEXT,
+    sections TEXT NOT NULL DEFAULT '[]',
+    settings TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_organization ON snapshots (organization, id);
+CREATE TABLE IF NOT EXISTS repositories (
+    snapshot_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    private INTEGER,
+    archived INTEGER,
+    visibility TEXT,
+    default_branch TEXT,
+    updated_at TEXT,
+    pushed_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS teams (
+    snapshot_id INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT,
+    privacy TEXT,
+    permission TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, slug)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS grants (
+    snapshot_id INTEGER NOT NULL,
+    repository TEXT NOT NULL,
+    principal_type TEXT NOT NULL,
+    principal TEXT NOT NULL,
+    permission TEXT,
+    role_name TEXT,
+    PRIMARY KEY (snapshot_id, repository, principal_type, principal)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS codeowners (
+    snapshot_id INTEGER NOT NULL,
+    repository TEXT NOT NULL,
+    pattern TEXT NOT NULL,
+    owners TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_id, repository, pattern)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS errors (
+    snapshot_id INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    error TEXT,
+    PRIMARY KEY (snapshot_id, section, repository)
+) WITHOUT ROWID;
+"""
+
+
+class SnapshotStore:
+    """SQLite database of audit results
+
+    Every audit saved to the store becomes a snapshot, with one row per
+    repository, team, collaborator or team grant and CODEOWNERS rule. All
+    tables are keyed by snapshot, so two snapshots can be compared with
+    indexed joins instead of loading both audits into memory.
+    """
+
+    def __init__(self, path: str):
+        """Open or create the store
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(snapshots)")}
+        if "created_at" not in columns:
+            # Stores written before snapshots had a creation time
+            self._db.execute("ALTER TABLE snapshots ADD COLUMN created_at TEXT")
+
+    def close(self) -> None:
+        """Close the store"""
+        with self._lock:
+            self._db.close()
+
+    def save(self, results: Dict) -> int:
+        """Store the results of an audit as a new snapshot
+
+        Args:
+            results: Results from GitHubOrgAuditor.audit
+
+        Returns:
+            ID of the new snapshot
+        """
+        with self._lock:
+            try:
+                snapshot_id = None
+                for record in results_records(results):
+                    snapshot_id = self._apply(snapshot_id, record)
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return snapshot_id
+
+    def record(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Store streamed audit records as a new snapshot while passing them on
+
+        The snapshot is committed once the records are exhausted and
+        discarded if the stream ends with an exception.
+
+        Args:
+            records: Records from GitHubOrgAuditor.iter_audit
+
+        Yields:
+            The records, unchanged
+        """
+        with self._lock:
+            try:
+                snapshot_id = None
+                for record in records:
+                    snapshot_id = self._apply(snapshot_id, record)
+                    yield record
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+
+    def snapshots(self, organization: Optional[str] = None) -> List[Dict]:
+        """List the stored snapshots
+
+        Args:
+            organization: Only list snapshots of this organization
+
+        Returns:
+            Snapshot descriptions, oldest first, with the time each was
+            saved as created_at
+        """
+        query = "SELECT id, organization, audit_timestamp, sections, created_at FROM snapshots"
+        params = ()
+        if organization:
+            query += " WHERE organization = ?"
+            params = (organization,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", params).fetchall()
+        return [_snapshot_description(row) for row in rows]
+
+    def snapshot(self, snapshot_id: int) -> Dict:
+        """Get the description of a snapshot
+
+        Args:
+            snapshot_id: ID of the snapshot
+
+        Returns:
+            Snapshot description
+
+        Raises:
+            KeyError: If there is no such snapshot
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, organization, audit_timestamp, sections, created_at FROM snapshots "
+                "WHERE id = ?",
+                (snapshot_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"No snapshot {snapshot_id}")
+        return _snapshot_description(row)
+
+    def diff(self, old_id: int, new_id: int) -> Dict:
+        """Compare two snapshots
+
+        Only sections audited in both snapshots are compared. Grants and
+        CODEOWNERS rules of repositories whose section failed in either
+        snapshot are left out, so a failed request is not reported as lost
+        access.
+
+        Args:
+            old_id: ID of the earlier snapshot
+            new_id: ID of the later snapshot
+
+        Returns:
+            Dictionary with the added, removed and changed entries per section
+
+        Raises:
+            KeyError: If either snapshot does not exist
+        """
+        old, new = self.snapshot(old_id), self.snapshot(new_id)
+        sections = [s for s in old["sections"] if s in new["sections"]]
+        diff = {"old": old, "new": new}
+
+        with self._lock:
+            if "settings" in sections:
+                diff["settings"] = self._diff_settings(old_id, new_id)
+            if "repositories" in sections:
+                diff["repositories"] = self._diff_rows(
+                    "repositories", ("name",), old_id, new_id, changes=True
+                )
+            if "teams" in sections:
+                diff["teams"] = self._diff_rows("teams", ("slug",), old_id, new_id, changes=True)
+            if "permissions" in sections:
+                diff["permissions"] = self._diff_rows(
+                    "grants", ("repository", "principal_type", "principal"), old_id, new_id,
+                    values=("permission", "role_name"), errors="permissions",
+                )
+            if "codeowners" in sections:
+                diff["codeowners"] = self._diff_rows(
+                    "codeowners", ("repository", "pattern"), old_id, new_id,
+                    values=("owners",), errors="codeowners",
+                )
+        return diff
+
+    def _apply(self, snapshot_id: Optional[int], record: Dict) -> Optional[int]:
+        """Write one audit record
+
+        Must be called with the lock held.
+
+        Args:
+            snapshot_id: ID of the snapshot being written, or None before the
+                record that opens the audit
+            record: Audit record
+
+        Returns:
+            ID of the snapshot being written
+        """
+        if record["type"] == "audit":
+            return self._db.execute(
+                "INSERT INTO snapshots (organization, audit_timestamp, sections, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    record["organization"],
+                    record["data"].get("audit_timestamp"),
+                    json.dumps(record["data"].get("sections", [])),
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                ),
+            ).lastrowid
+        if snapshot_id is not None:
+            self._insert(snapshot_id, record["type"], record["data"])
+        return snapshot_id
+
+    def _insert(self, snapshot_id: int, record_type: str, data: Dict) -> None:
+        """Insert the rows of one audit record
+
+        Must be called with the lock held.
+
+        Args:
+            snapshot_id: ID of the snapshot being written
+            record_type: Type of the audit record
+            data: Record payload
+        """
+        if record_type == "settings":
+            self._db.execute(
+                "UPDATE snapshots SET settings = ? WHERE id = ?",
+                (canonical_json(data), snapshot_id),
+            )
+        elif record_type == "repository":
+            fields = {k: v for k, v in data.items() if k not in VOLATILE_REPOSITORY_FIELDS}
+            self._db.execute(
+                "INSERT OR REPLACE INTO repositories VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    snapshot_id, data["name"], data.get("private"), data.get("archived"),
+                    data.get("visibility"), data.get("default_branch"),
+                    data.get("updated_at"), data.get("pushed_at"), canonical_json(fields),
+                ),
+            )
+        elif record_type == "team":
+            self._db.execute(
+                "INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    snapshot_id, data["slug"], data.get("name"), data.get("privacy"),
+                    data.get("permission"), canonical_json(data),
+                ),
+            )
+        elif record_type == "permissions":
+            rows = [
+                (snapshot_id, data["repository"], "user", c["login"], c.get("permissions"),
+                 c.get("role_name"))
+                for c in data.get("collaborators", [])
+            ] + [
+                (snapshot_id, data["repository"], "team", t["name"], t.get("permission"), None)
+                for t in data.get("teams", [])
+            ]
+            self._db.executemany("INSERT OR REPLACE INTO grants VALUES (?, ?, ?, ?, ?, ?)", rows)
+        elif record_type == "codeowners":
+            # Later rules for the same pattern take precedence, as in GitHub
+            rows = [
+                (snapshot_id, data["repository"], rule.pattern, " ".join(rule.owners), rule.line)
+                for rule in parse_codeowners(data["content"] or "")
+            ]
+            self._db.executemany("INSERT OR REPLACE INTO codeowners VALUES (?, ?, ?, ?, ?)", rows)
+        elif record_type == "error" and data.get("repository"):
+            self._db.execute(
+                "INSERT OR REPLACE INTO errors VALUES (?, ?, ?, ?)",
+                (snapshot_id, data.get("section"), data["repository"], data.get("error")),
+            )
+
+    def _diff_settings(self, old_id: int, new_id: int) -> Dict:
+        """Compare the organization settings of two snapshots
+
+        Must be called with the lock held.
+
+        Returns:
+            Dictionary mapping changed settings to their old and new values
+        """
+        rows = self._db.execute(
+            "SELECT id, settings FROM snapshots WHERE id IN (?, ?)", (old_id, new_id)
+        ).fetchall()
+        settings = {r[0]: json.loads(r[1]) if r[1] else {} for r in rows}
+        return changed_fields(settings[old_id], settings[new_id])
+
+    def _diff_rows(
+        self,
+        table: str,
+        keys: tuple,
+        old_id: int,
+        new_id: int,
+        values: tuple = ("data",),
+        changes: bool = False,
+        errors: Optional[str] = None,
+    ) -> Dict:
+        """Compare the rows of a table between two snapshots
+
+        Must be called with the lock held.
+
+        Args:
+            table: Table name
+            keys: Columns identifying a row within a snapshot
+            old_id: ID of the earlier snapshot
+            new_id: ID of the later snapshot
+            values: Columns compared between matching rows
+            changes: Whether values hold JSON objects to report field by field
+            errors: Audit section whose failed repositories are left out
+
+        Returns:
+            Dictionary with "added", "removed" and "changed" lists
+        """
+        key_columns = ", ".join(keys)
+        value_columns = ", ".join(values)
+        join = " AND ".join(f"o.{k} = n.{k}" for k in keys)
+        skip = ""
+        params = {"old": old_id, "new": new_id, "section": errors}
+        if errors:
+            skip = (
+                " AND {alias}.repository NOT IN (SELECT repository FROM errors "
+                "WHERE snapshot_id IN (:old, :new) AND section = :section)"
+            )
+
+        def one_sided(present, other, alias, other_alias):
+            return self._db.execute(
+                f"SELECT {key_columns}, {value_columns} FROM {table} {alias} "
+                f"WHERE {alias}.snapshot_id = :{present}" + skip.format(alias=alias) +
+                f" AND NOT EXISTS (SELECT 1 FROM {table} {other_alias} "
+                f"WHERE {other_alias}.snapshot_id = :{other} AND {join}) "
+                f"ORDER BY {key_columns}",
+                params,
+            ).fetchall()
+
+        columns = keys + values
+        added = [self._row(columns, r, changes) for r in one_sided("new", "old", "n", "o")]
+        removed = [self._row(columns, r, changes) for r in one_sided("old", "new", "o", "n")]
+
+        differs = " OR ".join(f"o.{v} IS NOT n.{v}" for v in values)
+        rows = self._db.execute(
+            f"SELECT {', '.join('n.' + k for k in keys)}, "
+            f"{', '.join('o.' + v for v in values)}, {', '.join('n.' + v for v in values)} "
+            f"FROM {table} o JOIN {table} n ON {join} "
+            f"WHERE o.snapshot_id = :old AND n.snapshot_id = :new AND ({differs})"
+            + skip.format(alias="n") + f" ORDER BY {', '.join('n.' + k for k in keys)}",
+            params,
+        ).fetchall()
+
+        changed = []
+        for row in rows:
+            entry = dict(zip(keys, row))
+            old_values = row[len(keys):len(keys) + len(values)]
+            new_values = row[len(keys) + len(values):]
+            if changes:
+                entry["changes"] = changed_fields(
+                    json.loads(old_values[0]), json.loads(new_values[0])
+                )
+            else:
+                entry["old"] = dict(zip(values, old_values))
+                entry["new"] = dict(zip(values, new_values))
+            changed.append(entry)
+
+        return {"added": added, "removed": removed, "changed": changed}
+
+    @staticmethod
+    def _row(columns: tuple, row: tuple, changes: bool) -> Dict:
+        """Build the report entry of an added or removed row
+
+        Args:
+            columns: Names of the selected columns
+            row: Selected values
+            changes: Whether the last column holds a JSON object, which is
+                left out of the report
+
+        Returns:
+            Dictionary of the row's values
+        """
+        entry = dict(zip(columns, row))
+        if changes:
+            del entry["data"]
+        return entry
+
+
+def _snapshot_description(row: tuple) -> Dict:
+    """Describe a snapshot from its row in the snapshots table
+
+    Args:
+        row: id, organization, audit_timestamp, sections and created_at
+
+    Returns:
+        Snapshot description
+    """
+    return {
+        "id": row[0],
+        "organization": row[1],
+        "audit_timestamp": row[2],
+        "sections": json.loads(row[3]),
+        "created_at": row[4],
+    }
+
+
+def canonical_json(value) -> str:
+    """Serialize a value so that equal values give equal strings
+
+    Args:
+        value: JSON-serializable value
+
+    Returns:
+        JSON text with sorted keys
+    """
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=to_builtin)
+
+
+def changed_fields(old: Dict, new: Dict) -> Dict:
+    """Get the fields that differ between two dictionaries
+
+    Args:
+        old: Earlier values
+        new: Later values
+
+    Returns:
+        Dictionary mapping each differing field to its old and new value
+    """
+    return {
+        field: {"old": old.get(field), "new": new.get(field)}
+        for field in sorted(set(old) | set(new))
+        if old.get(field) != new.get(field)
+    }
+
+
+def results_records(results: Dict) -> Iterator[Dict]:
+    """Turn audit results into the records streamed by the auditor
+
+    Args:
+        results: Results from GitHubOrgAuditor.audit
+
+    Yields:
+        Audit records, starting with the one that opens the audit
+    """
+    org_name = results["organization"]
+    sections = [s for s in RECORD_TYPES if s in results]
+    yield {"type": "audit", "organization": org_name, "data": {
+        "audit_timestamp": results.get("audit_timestamp"),
+        "sections": sections,
+    }}
+    for section in sections:
+        record_type, many = RECORD_TYPES[section]
+        if section == "codeowners":
+            for name, content in results[section].items():
+                yield {"type": record_type, "organization": org_name,
+                       "data": {"repository": name, "content": content}}
+        elif many:
+            for data in results[section]:
+                yield {"type": record_type, "organization": org_name, "data": data}
+        else:
+            yield {"type": record_type, "organization": org_name, "data": results[section]}
+    for error in results.get("errors", []):
+        yield {"type": "error", "organization": org_name, "data": error}
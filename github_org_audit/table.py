@@ -0,0 +1,132 @@
+"""Grid tables written row by row"""
+
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+
+# Number of leading rows column widths and alignment are derived from
+DEFAULT_SAMPLE_SIZE = 100
+
+# Marks the end of a cell cut to fit its column
+ELLIPSIS = "..."
+
+
+def iter_grid(
+    rows: Iterable[Sequence],
+    headers: Sequence[str],
+    widths: Optional[Sequence[Optional[int]]] = None,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+) -> Iterator[str]:
+    """Render rows as a grid table, one line at a time
+
+    The output looks like tabulate's "grid" format. tabulate measures
+    every cell before it returns anything, but this function only
+    measures the first sample_size rows. Lines are then yielded as rows
+    are consumed, so a table of a lazily fetched listing starts printing
+    once its first rows arrive, and memory does not grow with the number
+    of rows. Later cells that are wider than their column are cut and end
+    in "...". Numeric columns are aligned right, all others left.
+
+    Args:
+        rows: Rows of cell values; may be a generator
+        headers: Column headers
+        widths: Optional fixed width of each column, e.g. from a known
+            schema; columns given as None are measured from the sample
+        sample_size: Number of leading rows to measure
+
+    Yields:
+        Lines of the table, without line endings
+    """
+    rows = iter(rows)
+    sample = [[_cell_lines(value) for value in row] for row in islice(rows, max(1, sample_size))]
+    columns = _measure(headers, sample, widths)
+    numeric = [
+        _is_numeric([row[index].value for row in sample if index < len(row)])
+        for index in range(len(headers))
+    ]
+    border = "+" + "+".join("-" * (width + 2) for width in columns) + "+"
+
+    yield border
+    yield from _row_lines([_cell_lines(header) for header in headers], columns, numeric)
+    yield border.replace("-", "=")
+
+    for row in chain(sample, ([_cell_lines(value) for value in row] for row in rows)):
+        yield from _row_lines(row, columns, numeric)
+        yield border
+    if not sample:
+        yield border
+
+
+def paginate(rows: Iterable, limit: Optional[int] = None, page: int = 1) -> Iterator:
+    """Select one page of rows without reading past it
+
+    Args:
+        rows: Rows; may be a generator
+        limit: Number of rows per page, or None for all rows
+        page: Number of the page to select, starting at 1
+
+    Returns:
+        Iterator of the rows on the page
+    """
+    if limit is None:
+        return iter(rows)
+    start = (page - 1) * limit
+    return islice(rows, start, start + limit)
+
+
+class _Cell:
+    """Text lines of a cell, with the value they were rendered from"""
+
+    __slots__ = ("value", "lines")
+
+    def __init__(self, value, lines: List[str]):
+        self.value = value
+        self.lines = lines
+
+
+def _cell_lines(value) -> _Cell:
+    """Render a cell value as text lines"""
+    if value is None:
+        text = ""
+    elif isinstance(value, float):
+        text = format(value, "g")
+    else:
+        text = str(value)
+    return _Cell(value, text.split("\n"))
+
+
+def _measure(headers: Sequence[str], sample: List[List[_Cell]], widths) -> List[int]:
+    """Get the width of every column like tabulate's grid format does"""
+    columns = []
+    for index, header in enumerate(headers):
+        fixed = widths[index] if widths is not None and index < len(widths) else None
+        if fixed is not None:
+            columns.append(max(fixed, len(ELLIPSIS)))
+            continue
+        width = len(header) + 2
+        for row in sample:
+            if index < len(row):
+                width = max(width, max(len(line) for line in row[index].lines))
+        columns.append(width)
+    return columns
+
+
+def _is_numeric(values: list) -> bool:
+    """Whether a column's values are all numbers, ignoring missing ones"""
+    present = [value for value in values if value is not None]
+    return bool(present) and all(
+        isinstance(value, (int, float)) and not isinstance(value, bool) for value in present
+    )
+
+
+def _row_lines(row: List[_Cell], columns: List[int], numeric: List[bool]) -> Iterator[str]:
+    """Render one row, which spans several lines if a cell has line breaks"""
+    cells = [cell.lines for cell in row] + [[""]] * (len(columns) - len(row))
+    for line in range(max(len(lines) for lines in cells)):
+        parts = []
+        for lines, width, right in zip(cells, columns, numeric):
+            text = lines[line] if line < len(lines) else ""
+            if len(text) > width:
+                text = text[: width - len(ELLIPSIS)] + ELLIPSIS
+            parts.append(text.rjust(width) if right else text.ljust(width))
+        yield "| " + " | ".join(parts) + " |"
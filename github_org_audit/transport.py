@@ -0,0 +1,236 @@
+"""HTTP transport shared by the GitHub API clients"""
+
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .cache import HTTPCache, cache_key, replay_headers
+from .credentials import CredentialPool
+from .metrics import AuditMetrics
+from .ratelimit import RateLimitScheduler
+
+
+def rate_limit_resource(url: str) -> str:
+    """Get the rate limit resource a request URL counts against
+
+    Args:
+        url: Request URL
+
+    Returns:
+        "graphql" for the GraphQL endpoint, otherwise "core"
+    """
+    return "graphql" if urlparse(url).path.endswith("/graphql") else "core"
+
+
+class AuditTransportAdapter(HTTPAdapter):
+    """requests adapter that routes every request through a scheduler
+
+    Each attempt is authenticated with the credential from the pool that has
+    the most remaining budget. Rate-limited responses are retried once the
+    scheduler allows it, possibly with another credential, up to
+    max_rate_limit_retries times, after which the response is returned to
+    the caller unchanged. With a cache, GET requests are sent as
+    conditional requests and 304 answers are replayed from the cache.
+    With metrics, every attempt is recorded there.
+    """
+
+    def __init__(
+        self,
+        scheduler: RateLimitScheduler,
+        credentials: CredentialPool,
+        cache: Optional[HTTPCache] = None,
+        max_rate_limit_retries: int = 5,
+        metrics: Optional[AuditMetrics] = None,
+        **kwargs,
+    ):
+        """Initialize the adapter
+
+        Args:
+            scheduler: Scheduler consulted before and after every request
+            credentials: Pool of credentials used to authenticate requests
+            cache: Optional HTTP cache for conditional GET requests
+            max_rate_limit_retries: Maximum retries of a rate-limited request
+            metrics: Optional metrics to record requests in
+            **kwargs: Passed to requests.adapters.HTTPAdapter
+        """
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+        self.credentials = credentials
+        self.cache = cache
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.metrics = metrics
+
+    def send(self, request, stream=False, **kwargs):
+        """Send a request once the scheduler allows it
+
+        Args:
+            request: Prepared request
+            stream: Whether to stream the response body
+            **kwargs: Passed to requests.adapters.HTTPAdapter.send
+
+        Returns:
+            requests.Response
+        """
+        resource = rate_limit_resource(request.url)
+        attempt = 0
+
+        key = entry = None
+
+        while True:
+            credential = self.credentials.select(resource)
+            request.headers["Authorization"] = credential.authorization()
+            if self.cache is not None and not stream:
+                key, entry = self._make_conditional(request, credential.key)
+            self.scheduler.acquire(resource, credential.key)
+            started = time.monotonic()
+            try:
+                response = super().send(request, stream=stream, **kwargs)
+            except Exception:
+                elapsed = time.monotonic() - started
+                self.scheduler.release(resource, None, {}, elapsed, credential=credential.key)
+                if self.metrics is not None:
+                    self.metrics.record_request(request.method, request.url, None, elapsed)
+                raise
+
+            elapsed = time.monotonic() - started
+            if self.metrics is not None:
+                self.metrics.record_request(
+                    request.method, request.url, response.status_code, elapsed
+                )
+            self.credentials.record(credential, resource, response.headers)
+            body = b""
+            if response.status_code in (403, 429) and not stream:
+                body = response.content
+            retry = self.scheduler.release(
+                resource,
+                response.status_code,
+                response.headers,
+                elapsed,
+                body,
+                credential=credential.key,
+            )
+
+            if not retry or attempt >= self.max_rate_limit_retries:
+                return self._apply_cache(key, entry, response)
+
+            attempt += 1
+            self.scheduler.record_retry()
+            response.close()
+
+    def _make_conditional(self, request, credential: str):
+        """Look up a request's cached response for a credential
+
+        The request is made conditional on that response. Conditional
+        headers of an earlier attempt with another credential are dropped.
+
+        Args:
+            request: Prepared request
+            credential: Key of the credential the attempt is sent with
+
+        Returns:
+            Tuple of (cache key or None, cached entry or None)
+        """
+        request.headers.pop("If-None-Match", None)
+        request.headers.pop("If-Modified-Since", None)
+        key = cache_key(request.method, request.url, request.headers.get("Accept"), credential)
+        entry = self.cache.lookup(key) if key else None
+        if entry:
+            request.headers.update(self.cache.conditional_headers(entry))
+        return key, entry
+
+    def _apply_cache(self, key, entry, response):
+        """Replay a cached body on 304 and store fresh cacheable responses
+
+        Args:
+            key: Cache key of the request, or None if not cacheable
+            entry: Cached entry sent as a conditional request, or None
+            response: Response received from the API
+
+        Returns:
+            requests.Response
+        """
+        if key is None:
+            return response
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.hit(key)
+            response.status_code = 200
+            response.reason = "OK"
+            response._content = entry["body"]
+            response.headers = CaseInsensitiveDict(
+                replay_headers(entry["headers"], response.headers)
+            )
+        elif response.status_code == 200:
+            self.cache.store(key, response.headers, response.content)
+
+        return response
+
+
+def create_session(adapter: HTTPAdapter) -> requests.Session:
+    """Create a requests session that sends everything through an adapter
+
+    Args:
+        adapter: Transport adapter to mount
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def mount_on_github(github, adapter: HTTPAdapter) -> None:
+    """Send a PyGithub client's requests through an adapter
+
+    PyGithub 2.1 keeps one persistent requests session per Github instance
+    but has no public hook for it, so the adapter is mounted on the
+    requester's connection directly.
+
+    Every object fetched through the instance shares that connection, which
+    stores a request in request() and sends it in getresponse(). The
+    connection is therefore made to keep the pending request per thread, so
+    threads sharing the instance cannot send each other's requests.
+
+    Args:
+        github: github.Github instance
+        adapter: Transport adapter to mount
+    """
+    requester = github._Github__requester
+    connection = requester._Requester__createConnection()
+    connection.session.mount("https://", adapter)
+    connection.session.mount("http://", adapter)
+    connection._pending = threading.local()
+    connection.__class__ = type(
+        connection.__class__.__name__, (_PerThreadRequest, connection.__class__), {}
+    )
+
+
+class _PerThreadRequest:
+    """Mixin keeping the pending request of a PyGithub connection per thread
+
+    The connection classes of PyGithub 2.1 store the request in the verb,
+    url, input and headers attributes; these properties keep them in the
+    thread-local _pending of the connection instead.
+    """
+
+    def _pending_attribute(name):
+        def get(self):
+            return getattr(self._pending, name)
+
+        def set(self, value):
+            setattr(self._pending, name, value)
+
+        return property(get, set)
+
+    verb = _pending_attribute("verb")
+    url = _pending_attribute("url")
+    input = _pending_attribute("input")
+    headers = _pending_attribute("headers")
+    del _pending_attribute
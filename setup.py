@@ -6,10 +6,18 @@ setup(
     packages=find_packages(),
     install_requires=[
         "PyGithub==2.1.1",
+        "PyJWT[crypto]==2.8.0",
         "click==8.1.7",
         "pyyaml==6.0.1",
+        "requests==2.31.0",
         "tabulate==0.9.0",
     ],
+    extras_require={
+        "async": ["aiohttp==3.9.1"],
+        "fast": ["orjson==3.9.10"],
+        "msgpack": ["msgpack==1.0.7"],
+        "zstd": ["zstandard==0.22.0"],
+    },
     entry_points={
         "console_scripts": [
             "github-org-audit=github_org_audit.cli:main",